@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark of tool response serialization on a 10k-row Resource Graph payload.
+Compares the previous recursive ensure_serializable + json.dumps with the
+single-pass encoder in utils.serialization, on every installed JSON backend.
+
+Usage: python benchmark_serialization.py [rows]
+"""
+
+import datetime
+import json
+import os
+import sys
+import time
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.serialization import BACKENDS, dumps, set_backend
+
+ROUNDS = 5
+
+
+def legacy_ensure_serializable(obj):
+    """The recursive converter the tools used before utils.serialization (pandas branches omitted)."""
+    if isinstance(obj, datetime.datetime):
+        return obj.isoformat()
+    elif isinstance(obj, datetime.date):
+        return obj.isoformat()
+    elif hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    elif hasattr(obj, '__dict__'):
+        return {k: legacy_ensure_serializable(v) for k, v in obj.__dict__.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [legacy_ensure_serializable(item) for item in obj]
+    elif isinstance(obj, dict):
+        return {k: legacy_ensure_serializable(v) for k, v in obj.items()}
+    else:
+        try:
+            json.dumps(obj)
+            return obj
+        except (TypeError, OverflowError):
+            return str(obj)
+
+
+def build_payload(rows):
+    """Build rows shaped like patchassessmentresources results with nested properties."""
+    published = datetime.datetime(2025, 7, 8, tzinfo=datetime.UTC)
+    return {
+        "data": [
+            {
+                "ServerName": f"server-{i:05d}",
+                "MissedPatch": {
+                    "patchName": f"2025-07 Cumulative Update (KB50{i % 1000:04d})",
+                    "kbId": f"50{i % 1000:04d}",
+                    "classifications": ["Security", "Critical"],
+                    "msrcSeverity": "Critical",
+                    "rebootBehavior": "CanRequestReboot",
+                    "publishedDateTime": published,
+                    "lastModifiedDateTime": published,
+                    "properties": {"version": "10.0.17763", "sizes": [i, i * 2, i * 3]},
+                },
+            }
+            for i in range(rows)
+        ],
+        "count": rows,
+        "total_records": rows,
+        "skip_token": None,
+    }
+
+
+def measure(label, function, payload):
+    best = None
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        output = function(payload)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<40} {best * 1000:8.1f} ms  ({len(output) / 1024:.0f} KiB)")
+    return best, output
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    payload = build_payload(rows)
+
+    print(f"Serializing {rows} Resource Graph rows (best of {ROUNDS})")
+    print("=" * 60)
+    legacy_time, legacy_output = measure(
+        "ensure_serializable + json.dumps", lambda p: json.dumps(legacy_ensure_serializable(p)), payload
+    )
+    timings = {}
+    expected = json.loads(legacy_output)
+    for name in BACKENDS:
+        if set_backend(name) != name:
+            continue
+        timings[name], output = measure(f"utils.serialization.dumps ({name})", dumps, payload)
+        assert json.loads(output) == expected, f"{name} produced different JSON"
+    set_backend()
+    print("=" * 60)
+
+    for name, elapsed in timings.items():
+        print(f"Speedup with {name}: {legacy_time / elapsed:.1f}x")
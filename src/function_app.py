@@ -1,13 +1,25 @@
-import json
 import logging
-import os
 
-import azure.functions as func
-from mcp_tools import (
-    GetServerMetadata, GetSqlBpAssessment, GetSqlMetadata, GetPatchingLevel, GetAnomalies,
-    GetSwChangesList, GetSwConfig, GetWinBpAssessment
-)
-from utils.log_config import setup_timestamped_logging, cleanup_old_logs, is_azure_function_environment
+from utils.lazy_imports import log_import_report, timed_import
+
+# Time each startup import so cold-start regressions show up in the startup report
+with timed_import("azure.functions"):
+    import azure.functions as func
+with timed_import("mcp_tools"):
+    from mcp_tools import (
+        GetAnomaliesAsync,
+        GetLogAnalyticsBatchAsync,
+        GetPatchingLevelAsync,
+        GetServerHealthSnapshotAsync,
+        GetServerMetadataAsync,
+        GetSqlBpAssessmentAsync,
+        GetSqlMetadataAsync,
+        GetSwChangesListAsync,
+        GetSwConfigAsync,
+        GetWinBpAssessmentAsync,
+    )
+from utils.log_config import cleanup_old_logs, setup_timestamped_logging
+from utils.tool_registry import build_tool_spec
 
 # Initialize logging - custom logging only for local development
 log_file_path = setup_timestamped_logging(logging.INFO)
@@ -21,285 +33,125 @@ else:
 app = func.FunctionApp(http_auth_level=func.AuthLevel.FUNCTION)
 
 
-class ToolProperty:
-    def __init__(self, property_name: str, property_type: str, description: str, items_type: str = None):
-        self.propertyName = property_name
-        self.propertyType = property_type
-        self.description = description
-        self.itemsType = items_type
-
-    def to_dict(self):
-        result = {
-            "propertyName": self.propertyName,
-            "propertyType": self.propertyType,
-            "description": self.description,
-        }
-        
-        # For array types, we need to specify the items property
-        if self.propertyType == "array" and self.itemsType:
-            result["items"] = {
-                "type": self.itemsType
-            }
-        
-        return result
-
-
-# Tool properties for agent functions
-tool_properties_subscription_id = [
-    ToolProperty("subscription_id", "string", "Azure subscription ID to query Azure Resource Manager against"),
-]
-
-tool_properties_log_analytics = [
-    ToolProperty("workspace_id", "string", "The workspace ID for the Log Analytics query."),
-    ToolProperty("timespan", "string", "The timespan for the query (e.g., '30d' for 30 days)"),
-]
-
-tool_properties_log_analytics_with_server = [
-    ToolProperty("workspace_id", "string", "The workspace ID for the Log Analytics query."),
-    ToolProperty("ServerName", "string", "The name of the Windows Server to query"),
-    ToolProperty("timespan", "string", "The timespan for the query (e.g., '30d' for 30 days)"),
-]
-
-# Convert agent function tool properties to JSON
-tool_properties_subscription_id_json = json.dumps([prop.to_dict() for prop in tool_properties_subscription_id])
-tool_properties_log_analytics_json = json.dumps([prop.to_dict() for prop in tool_properties_log_analytics])
-tool_properties_log_analytics_with_server_json = json.dumps([prop.to_dict() for prop in tool_properties_log_analytics_with_server])
-
-
-@app.generic_trigger(
-    arg_name="context",
-    type="mcpToolTrigger",
-    toolName="GetServerMetadata",
-    description="Retrieve the server infrastructure configuration",
-    toolProperties=tool_properties_subscription_id_json,
-)
-def get_server_metadata_function(context) -> str:
-    """
-    Azure Function wrapper for GetServerMetadata.
-    
-    Args:
-        context: The trigger context containing the input arguments.
-        
-    Returns:
-        str: JSON string with server metadata.
-    """
-    try:
-        content = json.loads(context)
-        subscription_id = content["arguments"]["subscription_id"]
-        
-        # Call the agent function
-        result = GetServerMetadata(subscription_id)
-        return result
-    except Exception as e:
-        logging.error(f"Error in get_server_metadata_function: {str(e)}")
-        return json.dumps({"error": str(e)})
-
-
-@app.generic_trigger(
-    arg_name="context",
-    type="mcpToolTrigger",
-    toolName="GetSqlMetadata",
-    description="Retrieve the SQL infrastructure configuration",
-    toolProperties=tool_properties_subscription_id_json,
+# Descriptions of the tool arguments shown to agents; the property types come from the tool signatures
+ARGUMENT_DESCRIPTIONS = {
+    "subscription_id": (
+        "Azure subscription ID to query Azure Resource Manager against. "
+        "Multiple subscriptions can be passed as a comma-separated list"
+    ),
+    "management_group_id": "Optional management group ID to query instead of individual subscriptions",
+    "workspace_id": "The workspace ID for the Log Analytics query.",
+    "ServerName": (
+        "The Windows Server to query. Several servers can be passed as a comma-separated list, "
+        "or a name prefix ending in * (e.g. web-*)"
+    ),
+    "timespan": "The timespan for the query (e.g., '30d' for 30 days)",
+    "bypass_cache": "Set to true to ignore cached results and run the query again",
+    "output_format": (
+        "Result layout: 'records' (default) for one object per row, "
+        "or 'columnar' for column names plus row arrays"
+    ),
+    "tools": (
+        "Tools to run in one batch: GetSqlBpAssessment, GetWinBpAssessment, GetAnomalies, GetSwConfig, "
+        "GetSwChangesList. Defaults to all tools the other arguments allow"
+    ),
+    # Result shaping and paging arguments accepted by every single-query tool
+    "columns": (
+        "Optional comma-separated list of columns to return (e.g. 'name, OsVersion'). "
+        "Fields inside object columns can be selected with a dotted path such as MissedPatch.kbId"
+    ),
+    "filter": (
+        "Optional row predicates joined with 'and', e.g. \"location == westeurope and coreCount > 4\". "
+        "Operators: ==, !=, >, >=, <, <=, =~, !~, contains, !contains, has, !has, startswith, endswith"
+    ),
+    "top": "Optional maximum number of rows to return",
+    "order_by": (
+        "Optional comma-separated columns to sort by, each followed by asc or desc (e.g. 'coreCount desc')"
+    ),
+    "page_size": "Optional rows per page for large results; 0 returns all rows",
+    "cursor": (
+        "paging.next_cursor from a previous response, to get the next page without running the query again"
+    ),
+    "metrics": (
+        "Optional metrics for GetAnomalies: Processor, LogicalDisk, Memory, Network, or any InsightsMetrics "
+        "namespace, optionally as Namespace/Name. Defaults to Processor and LogicalDisk"
+    ),
+    "anomaly_threshold": "Optional minimum AnomalyScore of the anomalies reported by GetAnomalies (default 3.5)",
+    "include_expected": "Set to false to leave the ExpectedUsage column out of the GetAnomalies results",
+    "delta": (
+        "Set to true to only query the records added since the previous delta call and merge them into its "
+        "cached result"
+    ),
+}
+
+# Every MCP tool trigger: (tool name, async tool function, description, argument descriptions specific to the tool)
+TOOLS = (
+    ("GetServerMetadata", GetServerMetadataAsync, "Retrieve the server infrastructure configuration", None),
+    ("GetSqlMetadata", GetSqlMetadataAsync, "Retrieve the SQL infrastructure configuration", None),
+    ("GetPatchingLevel", GetPatchingLevelAsync, "Retrieve the missed patches list for the ServeName", None),
+    ("GetSqlBpAssessment", GetSqlBpAssessmentAsync, "Retrieve the SQL Server best practices assessment", None),
+    ("GetAnomalies", GetAnomaliesAsync, "Detect anomalies on the metrics behavior for your servers", None),
+    ("GetSwChangesList", GetSwChangesListAsync, "Find the software configuration changes for a specific server",
+     None),
+    ("GetSwConfig", GetSwConfigAsync, "Find the software configuration for servers", None),
+    ("GetWinBpAssessment", GetWinBpAssessmentAsync,
+     "Retrieve the Windows Server infrastructure issues and remediations", None),
+    ("GetLogAnalyticsBatch", GetLogAnalyticsBatchAsync,
+     "Run several Log Analytics tools for the same workspace in a single call", {
+         "ServerName": "The name of the Windows Server to query (required by GetSwConfig and GetSwChangesList)",
+     }),
+    ("GetServerHealthSnapshot", GetServerHealthSnapshotAsync,
+     "Retrieve inventory, missing patches, metric anomalies and Windows best practice issues for every server "
+     "in one call, as one document per server", {
+         "workspace_id": "The workspace ID for the Log Analytics queries.",
+         "subscription_id": (
+             "Azure subscription ID for the inventory and patching queries. "
+             "Multiple subscriptions can be passed as a comma-separated list"
+         ),
+         "ServerName": (
+             "Optional servers to include, as a comma-separated list or a name prefix ending in * (e.g. web-*). "
+             "Defaults to all servers"
+         ),
+         "timespan": "The timespan for the Log Analytics queries (e.g., '30d' for 30 days)",
+         "bypass_cache": "Set to true to ignore cached results and run the queries again",
+     }),
 )
-def get_sql_metadata_function(context) -> str:
-    """
-    Azure Function wrapper for GetSqlMetadata.
-    
-    Args:
-        context: The trigger context containing the input arguments.
-        
-    Returns:
-        str: JSON string with SQL metadata.
-    """
-    try:
-        content = json.loads(context)
-        subscription_id = content["arguments"]["subscription_id"]
-        
-        # Call the agent function
-        result = GetSqlMetadata(subscription_id)
-        return result
-    except Exception as e:
-        logging.error(f"Error in get_sql_metadata_function: {str(e)}")
-        return json.dumps({"error": str(e)})
 
+# MCP property names of the tool keywords that are not sent under their own name
+PROPERTY_NAMES = {"row_filter": "filter"}
 
-@app.generic_trigger(
-    arg_name="context",
-    type="mcpToolTrigger",
-    toolName="GetPatchingLevel",
-    description="Retrieve the missed patches list for the ServeName",
-    toolProperties=tool_properties_subscription_id_json,
+# Tool properties JSON and argument parsers, built once at startup from the tool signatures
+TOOL_SPECS = tuple(
+    build_tool_spec(name, function, description, ARGUMENT_DESCRIPTIONS, overrides, PROPERTY_NAMES)
+    for name, function, description, overrides in TOOLS
 )
-def get_patching_level_function(context) -> str:
-    """
-    Azure Function wrapper for GetPatchingLevel.
-    
-    Args:
-        context: The trigger context containing the input arguments.
-        
-    Returns:
-        str: JSON string with patching information.
-    """
-    try:
-        content = json.loads(context)
-        subscription_id = content["arguments"]["subscription_id"]
-        
-        # Call the agent function
-        result = GetPatchingLevel(subscription_id)
-        return result
-    except Exception as e:
-        logging.error(f"Error in get_patching_level_function: {str(e)}")
-        return json.dumps({"error": str(e)})
 
 
-@app.generic_trigger(
-    arg_name="context",
-    type="mcpToolTrigger",
-    toolName="GetSqlBpAssessment",
-    description="Retrieve the SQL Server best practices assessment",
-    toolProperties=tool_properties_log_analytics_json,
-)
-def get_sql_bp_assessment_function(context) -> str:
-    """
-    Azure Function wrapper for GetSqlBpAssessment.
-    
-    Args:
-        context: The trigger context containing the input arguments.
-        
-    Returns:
-        str: JSON string with SQL best practices assessment.
+def register_tool_trigger(spec):
     """
-    try:
-        content = json.loads(context)
-        workspace_id = content["arguments"]["workspace_id"]
-        timespan = content["arguments"].get("timespan")
-        
-        # Call the agent function
-        result = GetSqlBpAssessment(workspace_id, timespan)
-        return result
-    except Exception as e:
-        logging.error(f"Error in get_sql_bp_assessment_function: {str(e)}")
-        return json.dumps({"error": str(e)})
+    Register the MCP tool trigger for a tool spec.
 
-
-@app.generic_trigger(
-    arg_name="context",
-    type="mcpToolTrigger",
-    toolName="GetAnomalies",
-    description="Detect anomalies on the metrics behavior for your servers",
-    toolProperties=tool_properties_log_analytics_json,
-)
-def get_anomalies_function(context) -> str:
+    The trigger parses its arguments with the spec's precomputed parsers and awaits the tool.
     """
-    Azure Function wrapper for GetAnomalies.
-    
-    Args:
-        context: The trigger context containing the input arguments.
-        
-    Returns:
-        str: JSON string with detected anomalies.
-    """
-    try:
-        content = json.loads(context)
-        workspace_id = content["arguments"]["workspace_id"]
-        timespan = content["arguments"].get("timespan")
-        
-        # Call the agent function
-        result = GetAnomalies(workspace_id, timespan)
-        return result
-    except Exception as e:
-        logging.error(f"Error in get_anomalies_function: {str(e)}")
-        return json.dumps({"error": str(e)})
+    async def trigger(context) -> str:
+        return await spec.handle(context)
 
+    trigger.__name__ = trigger.__qualname__ = spec.function_name
+    trigger.__doc__ = f"Azure Function wrapper for {spec.name}."
 
-@app.generic_trigger(
-    arg_name="context",
-    type="mcpToolTrigger",
-    toolName="GetSwChangesList",
-    description="Find the software configuration changes for a specific server",
-    toolProperties=tool_properties_log_analytics_with_server_json,
-)
-def get_sw_changes_list_function(context) -> str:
-    """
-    Azure Function wrapper for GetSwChangesList.
-    
-    Args:
-        context: The trigger context containing the input arguments.
-        
-    Returns:
-        str: JSON string with software configuration changes.
-    """
-    try:
-        content = json.loads(context)
-        workspace_id = content["arguments"]["workspace_id"]
-        server_name = content["arguments"]["ServerName"]
-        timespan = content["arguments"].get("timespan")
-        
-        # Call the agent function
-        result = GetSwChangesList(workspace_id, server_name, timespan)
-        return result
-    except Exception as e:
-        logging.error(f"Error in get_sw_changes_list_function: {str(e)}")
-        return json.dumps({"error": str(e)})
+    trigger = app.generic_trigger(
+        arg_name="context",
+        type="mcpToolTrigger",
+        toolName=spec.name,
+        description=spec.description,
+        toolProperties=spec.properties_json,
+    )(trigger)
+    return app.function_name(name=spec.function_name)(trigger)
 
 
-@app.generic_trigger(
-    arg_name="context",
-    type="mcpToolTrigger",
-    toolName="GetSwConfig",
-    description="Find the software configuration for servers",
-    toolProperties=tool_properties_log_analytics_with_server_json,
-)
-def get_sw_config_function(context) -> str:
-    """
-    Azure Function wrapper for GetSwConfig.
-    
-    Args:
-        context: The trigger context containing the input arguments.
-        
-    Returns:
-        str: JSON string with software configuration.
-    """
-    try:
-        content = json.loads(context)
-        workspace_id = content["arguments"]["workspace_id"]
-        server_name = content["arguments"]["ServerName"]
-        timespan = content["arguments"].get("timespan")
-        
-        # Call the agent function
-        result = GetSwConfig(workspace_id, server_name, timespan)
-        return result
-    except Exception as e:
-        logging.error(f"Error in get_sw_config_function: {str(e)}")
-        return json.dumps({"error": str(e)})
+for tool_spec in TOOL_SPECS:
+    register_tool_trigger(tool_spec)
 
 
-@app.generic_trigger(
-    arg_name="context",
-    type="mcpToolTrigger",
-    toolName="GetWinBpAssessment",
-    description="Retrieve the Windows Server infrastructure issues and remediations",
-    toolProperties=tool_properties_log_analytics_json,
-)
-def get_win_bp_assessment_function(context) -> str:
-    """
-    Azure Function wrapper for GetWinBpAssessment.
-    
-    Args:
-        context: The trigger context containing the input arguments.
-        
-    Returns:
-        str: JSON string with Windows best practices assessment.
-    """
-    try:
-        content = json.loads(context)
-        workspace_id = content["arguments"]["workspace_id"]
-        timespan = content["arguments"].get("timespan")
-        
-        # Call the agent function
-        result = GetWinBpAssessment(workspace_id, timespan)
-        return result
-    except Exception as e:
-        logging.error(f"Error in get_win_bp_assessment_function: {str(e)}")
-        return json.dumps({"error": str(e)})
+# Azure SDKs and pandas are loaded when a tool first needs them; their cost is reported as they load
+log_import_report()
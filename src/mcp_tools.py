@@ -9,14 +9,18 @@ import sys
 import os
 import logging
 import json
-import pandas as pd
-from typing import Annotated, List
+import asyncio
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Annotated
 
 # Import utilities first to set up logging
 from utils.log_config import setup_function_specific_logging, is_azure_function_environment
 from utils.logging_decorators import log_function_call
-from utils.log_analytics_tool import LogAnalyticsTool
-from utils.resource_graph_tool import ResourceGraphTool
+from utils.log_analytics_tool import LogAnalyticsTool, AsyncLogAnalyticsTool
+from utils.resource_graph_tool import ResourceGraphTool, AsyncResourceGraphTool
 
 # Early logging suppression check - if not suppressed, use timestamped logging for local only
 if os.getenv('SUPPRESS_MCP_LOGGING', 'false').lower() == 'true':
@@ -37,23 +41,108 @@ else:
         mcp_logger.info("MCP Tools using Azure Functions built-in logging")
 
 
-# Add Azure Identity imports for credential handling
-from azure.identity import DefaultAzureCredential, ManagedIdentityCredential, EnvironmentCredential, AzureCliCredential, ChainedTokenCredential
+from utils.lazy_imports import lazy_import
+from utils.credential_cache import CachedTokenCredential, AsyncCachedTokenCredential
+from utils.client_registry import ClientRegistry, AsyncClientRegistry
+from utils.result_cache import ResultCache, FileCacheBackend, TieredResultCache, make_cache_key, normalize_timespan
+from utils.server_filter import build_computer_filter, chunk_server_names, is_multi_server, quote_kql_string
+from utils.table_encoding import RECORDS, COLUMNAR, ResultTable, encode_tables, normalize_output_format
+from utils.serialization import dumps as serialize
+from utils.concurrent_runner import run_concurrently, run_concurrently_async
+from utils.single_flight import SingleFlight, AsyncSingleFlight
+from utils.health_snapshot import build_health_snapshot
+from utils.query_shaping import MAX_TOP, shape_query, shape_rows
+from utils.anomaly_detection import DEFAULT_ANOMALY_THRESHOLD, detect_anomalies, read_series
+from utils.metric_catalogue import choose_bin_seconds, kql_timespan, metric_label_expression, parse_metrics
+from utils.delta_cache import delta_since, high_water_mark, merge_rows, parse_timespan
+from utils.metric_rollups import HOUR, DAY, MetricRollupStore, format_bin_time, read_rollup_rows, rollup_window
+from utils.result_paging import (
+    DEFAULT_PAGE_SIZE, build_page, count_rows, decode_cursor, fits_in_page, parse_page_size, result_token
+)
+
+# Azure Identity is imported on first use to keep cold starts short
+azure_identity = lazy_import("azure.identity")
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Resource Graph paging configuration
+RESOURCE_GRAPH_PAGE_SIZE = int(os.getenv('RESOURCE_GRAPH_PAGE_SIZE', '1000'))
+RESOURCE_GRAPH_MAX_ROWS = int(os.getenv('RESOURCE_GRAPH_MAX_ROWS', '50000'))
+# Subscription chunks queried concurrently when a tool spans many subscriptions
+RESOURCE_GRAPH_MAX_WORKERS = int(os.getenv('RESOURCE_GRAPH_MAX_WORKERS', '4'))
+
+# Concurrent tool jobs (run_tools / run_tools_async)
+TOOL_MAX_CONCURRENCY = int(os.getenv('MCP_TOOL_MAX_CONCURRENCY', '4'))
+TOOL_TIMEOUT_SECONDS = float(os.getenv('MCP_TOOL_TIMEOUT_SECONDS', '120'))
+
+# Result cache configuration
+RESULT_CACHE_ENABLED = os.getenv('MCP_RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv('MCP_RESULT_CACHE_MAX_ENTRIES', '256'))
+RESULT_CACHE_MAX_BYTES = int(os.getenv('MCP_RESULT_CACHE_MAX_MB', '64')) * 1024 * 1024
+# Second cache tier on disk; point MCP_CACHE_DIR at a share mounted on every instance to share results
+DISK_CACHE_ENABLED = os.getenv('MCP_DISK_CACHE_ENABLED', 'true').lower() == 'true'
+DISK_CACHE_DIR = os.getenv('MCP_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'mcp_result_cache'))
+DISK_CACHE_MAX_BYTES = int(os.getenv('MCP_DISK_CACHE_MAX_MB', '256')) * 1024 * 1024
+
+# Large results are returned one page at a time; the full result stays cached for the cursor calls
+PAGE_SIZE = int(os.getenv('MCP_PAGE_SIZE', str(DEFAULT_PAGE_SIZE)))
+CURSOR_TTL = int(os.getenv('MCP_CURSOR_TTL_SECONDS', '1800'))
+# Row counts remembered per response, so a cached response is paged without parsing it again
+ROW_COUNT_ENTRIES = 1024
+
+# Delta mode keeps a baseline per tool, workspace and servers; after this long it is rebuilt with a full query
+DELTA_BASELINE_TTL = int(os.getenv('MCP_DELTA_BASELINE_TTL_SECONDS', '21600'))
+
+# Row limits of the software inventory queries (per computer when several servers are queried)
+SW_CHANGES_MAX_RESULTS = 500
+SW_CONFIG_MAX_RESULTS = 1000
+
+# GetAnomalies: the highest scores returned when the caller sets no top
+ANOMALY_MAX_RESULTS = 100
+
+# GetAnomalies keeps metric rollups per workspace (hourly, or finer for short windows) and only fetches the
+# newest bins on each call. They hold the longest window asked for, at least ROLLUP_RETENTION_BINS bins
+# (31 days of hourly bins), and are rebuilt after ROLLUP_TTL unused. They live outside the result cache,
+# with their own disk budget under DISK_CACHE_DIR
+ROLLUP_RETENTION_BINS = 31 * 24
+ROLLUP_TTL = int(os.getenv('MCP_ROLLUP_TTL_SECONDS', '86400'))
+ROLLUP_DISK_MAX_BYTES = int(os.getenv('MCP_ROLLUP_DISK_MAX_MB', '256')) * 1024 * 1024
+
+# Seconds a tool result stays cached; inventory changes slowly, metrics and changes faster
+DEFAULT_CACHE_TTL = 300
+TOOL_CACHE_TTLS = {
+    "GetServerMetadata": 900,
+    "GetSqlMetadata": 900,
+    "GetPatchingLevel": 900,
+    "GetSqlBpAssessment": 1800,
+    "GetWinBpAssessment": 1800,
+    "GetSwConfig": 600,
+    "GetSwChangesList": 300,
+    "GetAnomalies": 300,
+}
+
+# Inventory tools served stale-while-revalidate: for MCP_STALE_GRACE_SECONDS after their TTL a cached
+# result is still returned at once, while a background thread runs the query again and replaces it
+STALE_WHILE_REVALIDATE_ENABLED = os.getenv('MCP_STALE_WHILE_REVALIDATE', 'true').lower() == 'true'
+STALE_GRACE_SECONDS = int(os.getenv('MCP_STALE_GRACE_SECONDS', '3600'))
+STALE_WHILE_REVALIDATE_TOOLS = {"GetServerMetadata", "GetSqlMetadata", "GetPatchingLevel"}
+
 # ----------------------------------------------------------
 # Helper function for credential management
 
+# Process-wide credential shared by every tool call
+_credential = None
+_credential_lock = threading.Lock()
 
-def get_credential():
+
+def _create_credential():
     """
-    Get the appropriate credential for Azure authentication with fallbacks.
+    Create the credential chain for Azure authentication with fallbacks.
     This function prioritizes user authentication methods over managed identity.
 
     Returns:
-        An Azure credential object that can be used for authentication
+        CachedTokenCredential: A caching credential wrapping the chain links
     """
     logger.info("Attempting to create credential chain for Azure authentication")
 
@@ -62,11 +151,11 @@ def get_credential():
         # 1. Azure CLI credentials (user logged in)
         # 2. Environment variables (user-provided)
         # 3. Managed Identity as fallback
-        credential = ChainedTokenCredential(
-            AzureCliCredential(),
-            EnvironmentCredential(),
-            ManagedIdentityCredential()
-        )
+        credential = CachedTokenCredential([
+            azure_identity.AzureCliCredential(),
+            azure_identity.EnvironmentCredential(),
+            azure_identity.ManagedIdentityCredential()
+        ])
         logger.info("Successfully created user-prioritized credential chain")
         return credential
     except Exception as e:
@@ -75,7 +164,9 @@ def get_credential():
 
         # If chained credential fails, try DefaultAzureCredential with user auth enabled
         try:
-            credential = DefaultAzureCredential(exclude_managed_identity_credential=False)
+            credential = CachedTokenCredential([
+                azure_identity.DefaultAzureCredential(exclude_managed_identity_credential=False)
+            ])
             logger.info(
                 "Successfully created DefaultAzureCredential with user auth priority")
             return credential
@@ -85,46 +176,576 @@ def get_credential():
 
             # Last resort - try CLI only
             logger.info("Falling back to AzureCliCredential only")
-            return AzureCliCredential()
+            return CachedTokenCredential([azure_identity.AzureCliCredential()])
+
+
+def get_credential():
+    """
+    Get the shared credential for Azure authentication.
+    The credential chain is built once per worker process; access tokens are cached
+    and refreshed before expiry, and the chain link that worked last is tried first.
+
+    Returns:
+        An Azure credential object that can be used for authentication
+    """
+    global _credential
+
+    if _credential is None:
+        with _credential_lock:
+            if _credential is None:
+                _credential = _create_credential()
+    return _credential
+
+
+def reset_credential():
+    """Close the shared credential so the next call to get_credential() builds a new one."""
+    global _credential
+
+    with _credential_lock:
+        # Clients are bound to the credential, so they have to be rebuilt as well
+        close_clients()
+        if _credential is not None:
+            _credential.close()
+        _credential = None
+
+
+# Credential shared by every async tool call; built on the .aio identity credentials
+_async_credential = None
+
+
+def _create_async_credential():
+    """
+    Create the async credential chain, with the same link order as _create_credential().
+
+    Returns:
+        AsyncCachedTokenCredential: A caching credential wrapping the async chain links
+    """
+    from azure.identity.aio import (
+        AzureCliCredential as AsyncAzureCliCredential,
+        EnvironmentCredential as AsyncEnvironmentCredential,
+        ManagedIdentityCredential as AsyncManagedIdentityCredential,
+    )
+
+    logger.info("Creating async credential chain for Azure authentication")
+    return AsyncCachedTokenCredential([
+        AsyncAzureCliCredential(),
+        AsyncEnvironmentCredential(),
+        AsyncManagedIdentityCredential()
+    ])
+
+
+def get_async_credential():
+    """
+    Get the shared async credential for Azure authentication.
+    Only call this from the event loop that runs the async tools.
+
+    Returns:
+        AsyncCachedTokenCredential: The credential used by the async tool path
+    """
+    global _async_credential
+
+    # No lock needed: the credential is only created from the single event loop thread
+    if _async_credential is None:
+        _async_credential = _create_async_credential()
+    return _async_credential
+
+
+async def reset_async_credential():
+    """Close the shared async credential and clients so they are rebuilt on next use."""
+    global _async_credential
+
+    await close_async_clients()
+    if _async_credential is not None:
+        await _async_credential.close()
+    _async_credential = None
+
 
 # ----------------------------------------------------------
-# Helper function to ensure objects are JSON serializable
-
-
-def ensure_serializable(obj):
-    """Recursively convert any non-serializable objects to serializable ones."""
-    import pandas as pd
-    import datetime
-
-    if isinstance(obj, pd.DataFrame):
-        return obj.to_dict(orient="records")
-    elif isinstance(obj, (pd.Series, pd.Index)):
-        return obj.tolist()
-    elif isinstance(obj, pd.Timestamp):
-        # Convert pandas Timestamp objects to ISO format string
-        return obj.isoformat()
-    elif isinstance(obj, datetime.datetime):
-        # Convert datetime objects to ISO format string
-        return obj.isoformat()
-    elif isinstance(obj, datetime.date):
-        # Convert date objects to ISO format string
-        return obj.isoformat()
-    elif hasattr(obj, 'to_dict'):
-        return obj.to_dict()
-    elif hasattr(obj, '__dict__'):
-        return {k: ensure_serializable(v) for k, v in obj.__dict__.items()}
-    elif isinstance(obj, (list, tuple)):
-        return [ensure_serializable(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {k: ensure_serializable(v) for k, v in obj.items()}
-    else:
+# Helper functions for shared SDK clients
+
+# Long-lived SDK clients shared by every tool call in this worker
+_client_registry = ClientRegistry()
+
+
+def get_client_registry():
+    """Get the registry holding the shared LogsQueryClient and ResourceGraphClient instances."""
+    return _client_registry
+
+
+def close_clients():
+    """Close all shared SDK clients and their connection pool; they are recreated on next use."""
+    _client_registry.close()
+
+
+# Long-lived .aio SDK clients shared by every async tool call
+_async_client_registry = AsyncClientRegistry()
+
+
+def get_async_client_registry():
+    """Get the registry holding the shared async LogsQueryClient and ResourceGraphClient instances."""
+    return _async_client_registry
+
+
+async def close_async_clients():
+    """Close all shared async SDK clients and their aiohttp session."""
+    await _async_client_registry.close()
+
+# ----------------------------------------------------------
+# Helper functions for JSON serialization
+
+
+class _ResourceGraphPageWriter:
+    """
+    Serialize Resource Graph result pages to a JSON string one page at a time,
+    so only the current page is held as Python objects while the next one is fetched.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.count = 0
+        self.total_records = None
+        self.skip_token = None
+
+    def add(self, page):
+        for row in page["data"]:
+            self.chunks.append(serialize(row))
+        self.count += page["count"]
+        self.total_records = page["total_records"]
+        self.skip_token = page["skip_token"]
+
+    def getvalue(self):
+        metadata = json.dumps({
+            "count": self.count, "total_records": self.total_records, "skip_token": self.skip_token
+        })
+        return '{"data": [' + ", ".join(self.chunks) + "], " + metadata[1:]
+
+
+def _serialize_resource_graph_pages(pages):
+    """Serialize an iterable of Resource Graph result pages to a JSON string."""
+    writer = _ResourceGraphPageWriter()
+    for page in pages:
+        writer.add(page)
+    return writer.getvalue()
+
+
+async def _serialize_resource_graph_pages_async(pages):
+    """Serialize an async iterable of Resource Graph result pages to a JSON string."""
+    writer = _ResourceGraphPageWriter()
+    async for page in pages:
+        writer.add(page)
+    return writer.getvalue()
+
+
+# ----------------------------------------------------------
+# Helper functions for the result cache
+
+def _create_result_cache():
+    """Create the result cache, backed by the on-disk tier when it is enabled and usable."""
+    memory_cache = ResultCache(max_entries=RESULT_CACHE_MAX_ENTRIES, max_bytes=RESULT_CACHE_MAX_BYTES)
+    if not DISK_CACHE_ENABLED:
+        return memory_cache
+
+    try:
+        backend = FileCacheBackend(DISK_CACHE_DIR, max_bytes=DISK_CACHE_MAX_BYTES)
+    except OSError as e:
+        logger.warning(f"Disk cache unavailable, using memory cache only: {str(e)}")
+        return memory_cache
+    return TieredResultCache(memory_cache, backend)
+
+
+# Tool results shared by every tool call in this worker (and by other workers through the disk tier)
+_result_cache = _create_result_cache()
+
+
+# Identical cache misses running at the same time share one backend query (keyed by the result cache key)
+_single_flight = SingleFlight()
+_async_single_flight = AsyncSingleFlight()
+
+
+def get_result_cache():
+    """Get the cache holding recent tool results."""
+    return _result_cache
+
+
+def get_cache_stats():
+    """Return hit/miss counters and memory usage of the result cache, and how many calls shared a query."""
+    stats = _result_cache.stats()
+    stats["coalesced"] = _single_flight.coalesced + _async_single_flight.coalesced
+    return stats
+
+
+def _is_error_response(response):
+    """Check whether a tool response is an error that must not be cached."""
+    return not response or response.startswith('{"error"')
+
+
+def _get_cached_response(tool_name, cache_key, bypass_cache):
+    """Look up a tool response in the result cache unless the caller bypasses it."""
+    entry = _get_cached_entry(tool_name, cache_key, bypass_cache)
+    return None if entry is None else entry[0]
+
+
+def _get_cached_entry(tool_name, cache_key, bypass_cache):
+    """Look up a tool response and whether it is still fresh, as (response, fresh), or None."""
+    if not RESULT_CACHE_ENABLED or bypass_cache:
+        return None
+
+    entry = _result_cache.get_entry(cache_key)
+    if entry is not None:
+        logger.info(f"{tool_name}: served from result cache")
+    return entry
+
+
+async def _get_cached_response_async(tool_name, cache_key, bypass_cache):
+    """Async version of _get_cached_response; a read from the disk tier runs off the event loop."""
+    entry = await _get_cached_entry_async(tool_name, cache_key, bypass_cache)
+    return None if entry is None else entry[0]
+
+
+async def _get_cached_entry_async(tool_name, cache_key, bypass_cache):
+    """Async version of _get_cached_entry."""
+    if not RESULT_CACHE_ENABLED or bypass_cache:
+        return None
+
+    entry = await _result_cache.get_entry_async(cache_key)
+    if entry is not None:
+        logger.info(f"{tool_name}: served from result cache")
+    return entry
+
+
+def _cache_ttls(tool_name):
+    """
+    The (ttl, fresh_ttl) a tool response is cached for. Stale-while-revalidate tools keep it through
+    the grace window, but it is only fresh for the tool's TTL.
+    """
+    ttl = TOOL_CACHE_TTLS.get(tool_name, DEFAULT_CACHE_TTL)
+    if _serves_stale(tool_name):
+        return ttl + STALE_GRACE_SECONDS, ttl
+    return ttl, None
+
+
+def _store_cached_response(tool_name, cache_key, response):
+    """Store a successful tool response in the result cache."""
+    if RESULT_CACHE_ENABLED and not _is_error_response(response):
+        ttl, fresh_ttl = _cache_ttls(tool_name)
+        _result_cache.set(cache_key, response, ttl=ttl, fresh_ttl=fresh_ttl)
+
+
+async def _store_cached_response_async(tool_name, cache_key, response):
+    """Async version of _store_cached_response; the write to the disk tier runs off the event loop."""
+    if RESULT_CACHE_ENABLED and not _is_error_response(response):
+        ttl, fresh_ttl = _cache_ttls(tool_name)
+        await _result_cache.set_async(cache_key, response, ttl=ttl, fresh_ttl=fresh_ttl)
+
+
+def _serves_stale(tool_name):
+    return STALE_WHILE_REVALIDATE_ENABLED and STALE_GRACE_SECONDS > 0 and tool_name in STALE_WHILE_REVALIDATE_TOOLS
+
+
+# Cache keys being refreshed in the background, so a burst of stale hits starts a single refresh
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _revalidate_if_stale(tool_name, cache_key, fresh, execute, *args):
+    """
+    After serving a cached response, refresh it in a background thread if it is past its TTL.
+    The refreshed response replaces the cache entry for the next caller.
+    """
+    if fresh or not _serves_stale(tool_name):
+        return
+    with _refreshing_lock:
+        if cache_key in _refreshing:
+            return
+        _refreshing.add(cache_key)
+
+    def refresh():
         try:
-            # Try to see if it's JSON serializable as-is
-            json.dumps(obj)
-            return obj
-        except (TypeError, OverflowError):
-            # If not serializable, convert to string
-            return str(obj)
+            response = _run_and_store(tool_name, cache_key, execute, *args)
+            if _is_error_response(response):
+                logger.warning(f"{tool_name}: background refresh failed, keeping the cached result")
+            else:
+                logger.info(f"{tool_name}: cached result refreshed in the background")
+        except Exception as e:
+            logger.error(f"{tool_name}: background refresh failed: {str(e)}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(cache_key)
+
+    logger.info(f"{tool_name}: served a stale result, refreshing it in the background")
+    threading.Thread(target=refresh, name=f"refresh-{tool_name}", daemon=True).start()
+
+
+def _run_and_store(tool_name, cache_key, execute, *args):
+    """
+    Run a cache miss and store its response.
+    Identical calls arriving while it runs wait for this execution instead of querying again.
+    """
+    def run():
+        response = execute(*args)
+        _store_cached_response(tool_name, cache_key, response)
+        return response
+    return _single_flight.do(cache_key, run)
+
+
+async def _run_and_store_async(tool_name, cache_key, execute, *args):
+    """Async version of _run_and_store."""
+    async def run():
+        response = await execute(*args)
+        await _store_cached_response_async(tool_name, cache_key, response)
+        return response
+    return await _async_single_flight.do(cache_key, run)
+
+
+# Row counts by result token: the first _paginate of a response (the call that ran and cached it) counts
+# its rows, and the cache hits after it only hash the response instead of parsing it
+_row_counts = OrderedDict()
+_row_counts_lock = threading.Lock()
+
+
+def _remember_row_count(token, total_rows):
+    with _row_counts_lock:
+        _row_counts[token] = total_rows
+        while len(_row_counts) > ROW_COUNT_ENTRIES:
+            _row_counts.popitem(last=False)
+
+
+def _paginate(tool_name, response, page_size=None):
+    """
+    Return the first page of a large tool response plus a cursor for the next one.
+    The full response is kept in the result cache so the cursor calls do not run the query again.
+    """
+    if _is_error_response(response):
+        return response
+    try:
+        page_size = parse_page_size(page_size, PAGE_SIZE)
+    except ValueError as e:
+        return json.dumps({"error": str(e)})
+    if fits_in_page(response, page_size):
+        return response
+
+    token = result_token(response)
+    result = None
+    with _row_counts_lock:
+        known = token in _row_counts
+        total_rows = _row_counts.get(token)
+        if known:
+            _row_counts.move_to_end(token)
+    if not known:
+        result = json.loads(response)
+        total_rows = count_rows(result)
+        _remember_row_count(token, total_rows)
+    if total_rows is None or total_rows <= page_size:
+        return response
+
+    _result_cache.set(("cursor", token), response, ttl=CURSOR_TTL)
+    logger.info(f"{tool_name}: returning {page_size} of {total_rows} rows, the rest by cursor")
+    result = json.loads(response) if result is None else result
+    return serialize(build_page(result, tool_name, token, 0, page_size))
+
+
+def _next_page(tool_name, cursor, page_size=None):
+    """Serve the page a cursor points to from the cached full response."""
+    try:
+        position = decode_cursor(cursor)
+        if position["tool"] != tool_name:
+            raise ValueError(f"Cursor belongs to {position['tool']}, not {tool_name}")
+        page_size = parse_page_size(page_size, position["page_size"]) or position["page_size"]
+    except ValueError as e:
+        logger.error(f"{tool_name}: {str(e)}")
+        return json.dumps({"error": str(e)})
+
+    response = _result_cache.get(("cursor", position["token"]))
+    if response is None:
+        logger.warning(f"{tool_name}: cursor expired")
+        return json.dumps({"error": "Cursor expired, run the tool again without a cursor"})
+    logger.info(f"{tool_name}: serving rows from {position['offset']} from the cursor cache")
+    return serialize(build_page(json.loads(response), tool_name, position["token"], position["offset"], page_size))
+
+
+async def _paginate_async(tool_name, response, page_size=None):
+    """
+    Async version of _paginate; responses too short to page are returned on the event loop,
+    counting, parsing and caching a larger one for the cursor run off it.
+    """
+    try:
+        if _is_error_response(response) or fits_in_page(response, parse_page_size(page_size, PAGE_SIZE)):
+            return response
+    except ValueError:
+        pass  # _paginate reports the invalid page_size
+    return await asyncio.to_thread(_paginate, tool_name, response, page_size)
+
+
+async def _next_page_async(tool_name, cursor, page_size=None):
+    """Async version of _next_page; the cursor cache read and page encoding run off the event loop."""
+    return await asyncio.to_thread(_next_page, tool_name, cursor, page_size)
+
+
+def parse_id_list(value):
+    """
+    Normalize a subscription or management group argument into a list of IDs.
+    Accepts a single ID, a comma-separated string of IDs, or a list of IDs.
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [item.strip() for item in value if item and item.strip()]
+
+
+# ----------------------------------------------------------
+# Resource Graph queries used by the inventory tools
+
+PATCHING_LEVEL_QUERY = "patchassessmentresources | where type == 'microsoft.hybridcompute/machines/patchassessmentresults/softwarepatches'| project ServerName= extract(@'/machines/([^/]+)/', 1, id), MissedPatch=properties"
+
+SQL_METADATA_QUERY = "resources | where type =~ 'microsoft.azurearcdata/sqlserverinstances' | project id, SrvName=name, SrvVersion=tostring(properties['version']), SrvLicenseType=tostring(properties['licenseType']), SrvEdition=tostring(properties['edition']), SrvvCore=toint(properties['vCore']) | join kind=leftouter (resources | where type =~'microsoft.azurearcdata/sqlserverinstances/databases' | project id,DbName=name, DatabaseOptions=properties['databaseOptions'], DbBackupInformation=properties['backupInformation'],DbSpaceAvailableMB=toint(properties['spaceAvailableMB']), DbSizeMB=toint(properties['sizeMB']) | extend ServerId=tostring(parse_path(tostring(parse_path(['id'])['DirectoryPath'])) ['DirectoryPath']) ) on $left.id == $right.ServerId | project-away id, id1"
+
+SERVER_METADATA_QUERY = "resources | where type == 'microsoft.hybridcompute/machines' | project name, type, location, resourceGroup, OsVersion=properties.osSku, processor=properties.detectedProperties.processorNames , coreCount=properties.detectedProperties.logicalCoreCount, RamGB=properties.detectedProperties.totalPhysicalMemoryInGigabytes, subnet=properties.networkProfile.networkInterfaces[0].ipAddresses[0].address, mssqlDiscovered=properties.mssqlDiscovered"
+
+
+# ----------------------------------------------------------
+# Log Analytics query builders
+# Each builder returns the KQL for one tool, so queries can run on their own or in a batch
+
+
+def build_sql_bp_assessment_query(timespan: str = "30d") -> str:
+    """Build the SQL Server best practices assessment query."""
+    return f"let selectedCategories = dynamic([]);let selectedTotSev = dynamic([]); SqlAssessment_CL| where TimeGenerated > ago({timespan}) | extend asmt = parse_csv(RawData) | where asmt[11] =~ 'MSSQLSERVER' | extend AsmtId=tostring(asmt[1]), CheckId=tostring(asmt[2]), DisplayString=asmt[3], Description=tostring(asmt[4]), HelpLink=asmt[5], TargetType=case(asmt[6] == 1, 'Server', asmt[6] == 2, 'Database', ''), TargetName=tostring(asmt[7]), Severity=case(asmt[8] == 30, 'High', asmt[8] == 20, 'Medium', asmt[8] == 10, 'Low', asmt[8] == 0, 'Information', asmt[8] == 1, 'Warning', asmt[8] == 2, 'Critical', 'Passed'), Message=tostring(asmt[9]), TagsArr=split(tostring(asmt[10]), ','), Sev = toint(asmt[8]) | where (set_has_element(dynamic(['*']), CheckId) or '*' == '*') and (set_has_element(dynamic(['*']), TargetName) or '*' == '*') and set_has_element(dynamic([30, 20, 10, 0]), Sev) and (array_length(set_intersect(TagsArr, dynamic(['*']))) > 0 or '*' == '*') and (CheckId == '' and Sev == 0 or '' == '') | extend Category = case(array_length(set_intersect(TagsArr, dynamic(['CPU', 'IO', 'Storage']))) > 0, '0', array_length(set_intersect(TagsArr, dynamic(['TraceFlag', 'Backup', 'DBCC', 'DBConfiguration', 'SystemHealth', 'Traces', 'DBFileConfiguration', 'Configuration', 'Replication', 'Agent', 'Security', 'DataIntegrity', 'MaxDOP', 'PageFile', 'Memory', 'Performance', 'Statistics']))) > 0, '1', array_length(set_intersect(TagsArr, dynamic(['UpdateIssues', 'Index', 'Naming', 'Deprecated', 'masterDB', 'QueryOptimizer', 'QueryStore', 'Indexes']))) > 0, '2', '3') | where (Sev >= 0 and array_length(selectedTotSev) == 0 or Sev in (selectedTotSev)) and (Category in (selectedCategories) or array_length(selectedCategories) == 0) | project TargetType, TargetName, Severity, Message, Tags=strcat_array(array_slice(TagsArr, 1, -1), ', '), CheckId, Description, HelpLink = tostring(HelpLink), SeverityCode = toint(Sev) | order by SeverityCode desc, TargetType desc, TargetName asc | project-away SeverityCode | extend PackedRecord = pack_all() | summarize Result = make_list(PackedRecord)"
+
+
+def _limit_rows(max_results, order_by, per_computer):
+    """Limit a query to max_results rows, or to max_results rows per computer for multi-server queries."""
+    if per_computer:
+        return f"| partition hint.strategy=native by Computer (top {max_results} by {order_by})"
+    return f"| top {max_results} by {order_by}"
+
+
+def _since_filter(since):
+    """Extra time filter of delta queries, which only read records newer than the cached baseline."""
+    return f"| where TimeGenerated > datetime({since})\n" if since else ""
+
+
+def build_sw_changes_list_query(ServerName, timespan: str = "30d", since: str = None) -> str:
+    """Build the software configuration changes query for one server, a list of servers or a prefix."""
+    server_names = parse_id_list(ServerName)
+    # Use default tool configuration
+    max_results = SW_CHANGES_MAX_RESULTS
+    include_system_changes = False
+
+    # Build system change filter
+    system_filter = ""
+    if not include_system_changes:
+        system_filter = "| where SoftwareType !in ('Security Update', 'Update', 'Hotfix')"
+
+    # Construct the optimized query with proper time filtering and result limiting
+    query = f"""ConfigurationChange 
+| where TimeGenerated > datetime_utc_to_local(now(2h)-{timespan}, 'Europe/Rome') 
+{_since_filter(since)}| where ConfigChangeType == 'Software' and {build_computer_filter(server_names)}
+{system_filter}
+| project TimeGenerated, Computer, ChangeCategory, SoftwareType, SoftwareName, Previous, Publisher
+{_limit_rows(max_results, "TimeGenerated desc", is_multi_server(server_names))}"""
+
+    logger.info(
+        f"GetSwChangesList: Query optimized with timespan {timespan} and max results {max_results}")
+    return query
+
+
+def build_sw_config_query(ServerName, timespan: str = "30d", since: str = None) -> str:
+    """Build the installed software query for one server, a list of servers or a prefix."""
+    server_names = parse_id_list(ServerName)
+    # Use default tool configuration
+    max_results = SW_CONFIG_MAX_RESULTS
+    include_system_software = False
+
+    # Build the optimized query with proper time filtering and result limiting
+    system_filter = ""
+    if not include_system_software:
+        system_filter = "| where SoftwareType !in ('Security Update', 'Update', 'Hotfix', 'Definition Update')"
+
+    query = f"""ConfigurationData 
+| where TimeGenerated > ago({timespan})
+{_since_filter(since)}| where {build_computer_filter(server_names)} and SoftwareName != '' and SoftwareName !~ 'unknown'
+{system_filter}
+| summarize arg_max(TimeGenerated, *) by SoftwareName, Publisher, Computer, SoftwareType, CurrentVersion
+| project SoftwareName, Publisher, Computer, TimeGenerated, SoftwareType, CurrentVersion
+{_limit_rows(max_results, "SoftwareName asc", is_multi_server(server_names))}"""
+
+    logger.info(
+        f"GetSwConfig: Query optimized with timespan {timespan} and max results {max_results}")
+    return query
+
+
+def build_win_bp_assessment_query(timespan: str = "30d") -> str:
+    """Build the Windows Server best practices assessment query."""
+    # Use default tool configuration
+    weight_threshold = 5.0
+    max_results = 500
+
+    # Construct the optimized query with proper time filtering and result limiting
+    query = f"""WindowsServerAssessmentRecommendation 
+| where TimeGenerated > ago({timespan})
+| where FocusArea != 'EnvironementFilter' and RecommendationResult == 'Failed' and Computer != ''
+| extend Weight = (RecommendationScore/10)
+| where Weight >= {weight_threshold}
+| summarize by Computer, Recommendation, ActionArea, AffectedObjectType, FocusArea, RecommendationId, Description, Weight
+| top {max_results} by Weight desc"""
+
+    logger.info(
+        f"GetWinBpAssessment: Query optimized with timespan {timespan}, weight threshold {weight_threshold}, and max results {max_results}")
+    return query
+
+
+def _metric_rows_filter(metrics):
+    """Lines selecting the InsightsMetrics rows of the requested metrics and naming their metric in Metric."""
+    specs = parse_metrics(metrics)
+    namespaces = ", ".join(sorted({quote_kql_string(spec.namespace) for spec in specs}))
+    return f"""| where Namespace in ({namespaces})
+| extend Metric = {metric_label_expression(specs)}
+| where isnotempty(Metric) and isnotempty(Val) and isfinite(Val)"""
+
+
+def build_anomalies_query(timespan: str = "30d", metrics=None, bin_seconds: int = HOUR) -> str:
+    """
+    Build the metrics query behind GetAnomalies: one series per computer and metric, with one point per bin.
+    The anomalies are scored locally from these series (see utils.anomaly_detection).
+    """
+    step = kql_timespan(bin_seconds)
+    query = f"""InsightsMetrics 
+| where TimeGenerated >= ago({timespan})
+{_metric_rows_filter(metrics)}
+| make-series AvgValue = avg(Val) default = real(null) on TimeGenerated
+    from bin(ago({timespan}), {step}) to bin(now(), {step}) step {step} by Computer, Namespace = Metric
+| project Computer, Namespace, TimeGenerated, AvgValue"""
+    return query
+
+
+def build_anomalies_rollup_query(since: str, metrics=None, bin_seconds: int = HOUR) -> str:
+    """
+    Build the query filling the GetAnomalies metric rollups: sum and sample count per computer, metric
+    and bin, from the since bin onwards.
+    """
+    query = f"""InsightsMetrics 
+| where TimeGenerated >= datetime({since})
+{_metric_rows_filter(metrics)}
+| summarize Total = sum(Val), Samples = count()
+    by Computer, Namespace = Metric, TimeGenerated = bin(TimeGenerated, {kql_timespan(bin_seconds)})"""
+    return query
+
+
+def _anomaly_resolution(timespan, metrics=None):
+    """
+    Resolve the GetAnomalies metrics and pick the bin size that keeps the points per series bounded.
+
+    Returns:
+        dict: specs, window (seconds), bin_seconds, period (bins per day) and low_is_bad (metric labels)
+    """
+    window = parse_timespan(normalize_timespan(timespan))
+    if window is None:
+        raise ValueError(f"Unsupported timespan for GetAnomalies: {timespan}; use a value such as 7d or 12h")
+    specs = parse_metrics(metrics)
+    bin_seconds = choose_bin_seconds(window.total_seconds())
+    return {"specs": specs, "window": window.total_seconds(), "bin_seconds": bin_seconds,
+            "period": DAY // bin_seconds, "low_is_bad": {spec.label for spec in specs if spec.low_is_bad}}
 
 
 # ----------------------------------------------------------
@@ -132,44 +753,102 @@ def ensure_serializable(obj):
 # Note: These functions need to be registered with an MCP server instance
 
 @log_function_call
-def resource_graph_tool(query: str, subscription_id: str = None):
-    """Run a KQL query on Azure Resource Graph."""
+def resource_graph_tool(query: str, subscription_id: str = None, paginate: bool = True, max_rows: int = None,
+                        management_group_id: str = None, tool_name: str = "resource_graph_tool",
+                        bypass_cache: bool = False):
+    """
+    Run a KQL query on Azure Resource Graph.
+
+    Args:
+        query (str): The KQL query to execute
+        subscription_id (str or list, optional): One or more subscriptions to query, as a list or
+            comma-separated string; defaults to SUBSCRIPTION_ID
+        paginate (bool): Follow skip tokens so results are not truncated at the first page
+        max_rows (int, optional): Maximum rows to return when paginating (default RESOURCE_GRAPH_MAX_ROWS)
+        management_group_id (str or list, optional): Management group(s) to query instead of subscriptions
+        tool_name (str): Name of the calling tool, used for the cache key and TTL
+        bypass_cache (bool): Run the query even if a cached result exists
+
+    Returns:
+        str: JSON string with the results of the query
+    """
     logger.debug(f"Running Resource Graph query: {query}")
     # sys.stderr.write("🔧 TOOL CALL: resource_graph_tool\n")
     # sys.stderr.flush()
 
     try:
-        # If subscription_id not provided, use the one from environment variables
-        if not subscription_id:
-            subscription_id = os.getenv("SUBSCRIPTION_ID")
-            logger.info(
-                f"Using subscription ID from environment: {subscription_id}")
+        subscription_ids, management_groups = _resolve_resource_graph_scope(subscription_id, management_group_id)
+        cache_key = make_cache_key(
+            tool_name, query, management_groups or subscription_ids, paginate=paginate, max_rows=max_rows
+        )
+        entry = _get_cached_entry(tool_name, cache_key, bypass_cache)
+        if entry is None:
+            return _run_and_store(tool_name, cache_key, _execute_resource_graph_query,
+                                  query, subscription_ids, management_groups, paginate, max_rows)
+        response, fresh = entry
+        _revalidate_if_stale(tool_name, cache_key, fresh, _execute_resource_graph_query,
+                             query, subscription_ids, management_groups, paginate, max_rows)
+        return response
+    except Exception as e:
+        logger.error(f"Exception in resource_graph_tool: {str(e)}")
+        return json.dumps({"error": str(e)})
 
-        # Convert single subscription_id to list for the ResourceGraphTool
+
+def _resolve_resource_graph_scope(subscription_id, management_group_id):
+    """Turn the tool arguments into (subscription_ids, management_groups) for a Resource Graph request."""
+    subscription_ids = parse_id_list(subscription_id)
+    management_groups = parse_id_list(management_group_id) or None
+
+    if management_groups:
+        # A management group covers its subscriptions, so the subscription list is not needed
+        logger.info(f"Querying management groups: {management_groups}")
+        return None, management_groups
+    if not subscription_ids:
+        # If subscription_id not provided, use the one from environment variables
+        subscription_id = os.getenv("SUBSCRIPTION_ID")
+        logger.info(
+            f"Using subscription ID from environment: {subscription_id}")
         subscription_ids = [subscription_id]
+    return subscription_ids, None
+
 
+def _execute_resource_graph_query(query, subscription_ids, management_groups, paginate, max_rows):
+    """Run a Resource Graph query with the shared client and return the JSON response."""
+    try:
         # Get the appropriate credential for the environment
         credential = get_credential()
         logger.debug("Obtained credential for Resource Graph query")
 
-        # Create a new ResourceGraphTool instance with our credential
-        graph_tool = ResourceGraphTool(credential=credential)
-        logger.debug("Created ResourceGraphTool with credential")
+        # Create a ResourceGraphTool on top of the shared client for this credential
+        client = _client_registry.resource_graph_client(credential)
+        graph_tool = ResourceGraphTool(credential=credential, client=client)
+        logger.debug("Created ResourceGraphTool with shared client")
+
+        if paginate:
+            # Stream every page straight into JSON
+            pages = graph_tool.iter_pages_concurrent(
+                query, subscription_ids,
+                page_size=RESOURCE_GRAPH_PAGE_SIZE,
+                max_rows=max_rows or RESOURCE_GRAPH_MAX_ROWS,
+                management_groups=management_groups,
+                max_workers=RESOURCE_GRAPH_MAX_WORKERS
+            )
+            return _serialize_resource_graph_pages(pages)
 
         # Execute the query
-        response = graph_tool.run_query(query, subscription_ids)
+        response = graph_tool.run_query(query, subscription_ids, management_groups=management_groups)
         logger.debug(f"Query response received with type: {type(response)}")
 
-        # Make sure all objects are JSON serializable
-        serializable_response = ensure_serializable(response)
-        return json.dumps(serializable_response)
+        # Convert SDK and datetime values while encoding
+        return serialize(response)
     except Exception as e:
         logger.error(f"Exception in resource_graph_tool: {str(e)}")
         return json.dumps({"error": str(e)})
 
 
 @log_function_call
-def log_analytics_tool(query: str, workspace_id: str, timespan: str = None):
+def log_analytics_tool(query: str, workspace_id: str, timespan: str = None, tool_name: str = "log_analytics_tool",
+                       bypass_cache: bool = False, output_format: str = RECORDS):
     """
     Run a KQL query on Azure Log Analytics.
 
@@ -177,6 +856,10 @@ def log_analytics_tool(query: str, workspace_id: str, timespan: str = None):
         query (str): The KQL query to execute
         workspace_id (str): The Log Analytics workspace ID
         timespan (str, optional): The timespan for the query (e.g., "30d" for 30 days)
+        tool_name (str): Name of the calling tool, used for the cache key and TTL
+        bypass_cache (bool): Run the query even if a cached result exists
+        output_format (str): "records" for a list of row objects per table, or "columnar"
+            for {"name", "columns", "rows"} per table
 
     Returns:
         str: JSON string with the results of the query
@@ -184,6 +867,11 @@ def log_analytics_tool(query: str, workspace_id: str, timespan: str = None):
     logger.debug(f"Running Log Analytics query on workspace: {workspace_id}")
     logger.debug(f"Query: {query}")
 
+    try:
+        output_format = normalize_output_format(output_format)
+    except ValueError as e:
+        return json.dumps({"error": str(e)})
+
     # Log the tool call for telemetry
     # sys.stderr.write("🔧 TOOL CALL: log_analytics_tool\n")
     # sys.stderr.flush()
@@ -195,41 +883,326 @@ def log_analytics_tool(query: str, workspace_id: str, timespan: str = None):
     else:
         logger.info(f"Using provided timespan: {timespan}")
 
+    cache_key = make_cache_key(tool_name, query, workspace_id, timespan, output_format=output_format)
+    response = _get_cached_response(tool_name, cache_key, bypass_cache)
+    if response is None:
+        response = _run_and_store(tool_name, cache_key, _execute_log_analytics_query,
+                                  query, workspace_id, timespan, output_format)
+    return response
+
+
+def _execute_log_analytics_query(query, workspace_id, timespan, output_format=RECORDS):
+    """Run a Log Analytics query with the shared client and return the JSON response."""
     try:
         # Get the appropriate credential for the environment
         credential = get_credential()
         logger.debug("Obtained credential for Log Analytics query")
 
-        # Create a new LogAnalyticsTool instance with our credential
-        analytics_tool = LogAnalyticsTool(credential=credential)
-        logger.debug("Created LogAnalyticsTool with credential")
+        # Create a LogAnalyticsTool on top of the shared client for this credential
+        client = _client_registry.logs_client(credential)
+        analytics_tool = LogAnalyticsTool(credential=credential, client=client, output_format=output_format)
+        logger.debug("Created LogAnalyticsTool with shared client")
+
+        # Execute the query; the tables come back already encoded as JSON
+        response = analytics_tool.run_query(query, workspace_id, timespan)
+        logger.info(f"Query response type: {type(response)}")
+        return _encode_log_analytics_result(response)
+    except Exception as e:
+        logger.error(f"Exception in log_analytics_tool: {str(e)}")
+        return json.dumps({"error": str(e)})
+
+
+@log_function_call
+def log_analytics_batch_tool(queries: dict, workspace_id: str, timespan: str = None, bypass_cache: bool = False,
+                             output_format: str = RECORDS):
+    """
+    Run several KQL queries on one Log Analytics workspace in a single batch request.
+
+    Args:
+        queries (dict): Mapping of a tool name to its KQL query
+        workspace_id (str): The Log Analytics workspace ID
+        timespan (str, optional): The timespan for the queries (e.g., "30d" for 30 days)
+        bypass_cache (bool): Run every query even if cached results exist
+        output_format (str): "records" or "columnar", as for log_analytics_tool
+
+    Returns:
+        str: JSON string {"results": {name: result}, "errors": {name: message}}; queries that
+             failed are listed in "errors" while the other results are still returned
+    """
+    logger.debug(f"Running Log Analytics batch of {len(queries)} queries on workspace: {workspace_id}")
+
+    try:
+        output_format = normalize_output_format(output_format)
+    except ValueError as e:
+        return json.dumps({"error": str(e)})
+
+    # Use default timespan, the same way log_analytics_tool does so cache entries are shared
+    if not timespan:
+        timespan = "30d"
+
+    cache_keys = {
+        name: make_cache_key(_batch_tool_name(name), query, workspace_id, timespan, output_format=output_format)
+        for name, query in queries.items()
+    }
+    results, pending = _get_cached_batch_responses(queries, cache_keys, bypass_cache)
+
+    batch_results = {}
+    if pending:
+        batch_results = _single_flight.do(_batch_flight_key(pending, cache_keys), _execute_log_analytics_batch,
+                                          pending, workspace_id, timespan, output_format)
+
+    return _assemble_batch_response(results, pending, batch_results, cache_keys)
+
+
+def _execute_log_analytics_batch(queries, workspace_id, timespan, output_format):
+    """Run a Log Analytics batch with the shared client; returns {name: result}."""
+    try:
+        credential = get_credential()
+        client = _client_registry.logs_client(credential)
+        analytics_tool = LogAnalyticsTool(credential=credential, client=client, output_format=output_format)
+        return analytics_tool.run_batch(queries, workspace_id, timespan)
+    except Exception as e:
+        logger.error(f"Exception in log_analytics_batch_tool: {str(e)}")
+        return {name: {"error": str(e)} for name in queries}
+
+
+def _batch_flight_key(pending, cache_keys):
+    """Single-flight key of a batch: the cache keys of the queries it runs."""
+    return ("batch",) + tuple(sorted((cache_keys[name] for name in pending), key=repr))
+
+
+def _encode_log_analytics_result(result):
+    """Turn a LogAnalyticsTool result (JSON tables, partial result or error dict) into a JSON string."""
+    if isinstance(result, str):
+        return result
+    if isinstance(result, dict) and isinstance(result.get("tables"), str):
+        return '{"tables": ' + result["tables"] + ', "partial_error": ' + json.dumps(result["partial_error"]) + "}"
+    return serialize(result)
+
+
+def _get_cached_batch_responses(queries, cache_keys, bypass_cache):
+    """Serve what we can from the cache; returns (cached results, queries still to run)."""
+    cached = {name: _get_cached_response(_batch_tool_name(name), cache_keys[name], bypass_cache) for name in queries}
+    return _split_cached_batch(queries, cached)
+
+
+async def _get_cached_batch_responses_async(queries, cache_keys, bypass_cache):
+    """Async version of _get_cached_batch_responses."""
+    cached = {
+        name: await _get_cached_response_async(_batch_tool_name(name), cache_keys[name], bypass_cache)
+        for name in queries
+    }
+    return _split_cached_batch(queries, cached)
+
+
+def _split_cached_batch(queries, cached):
+    results = {name: response for name, response in cached.items() if response is not None}
+    pending = {name: query for name, query in queries.items() if cached[name] is None}
+    return results, pending
+
+
+def _collect_batch_results(results, pending, batch_results):
+    """
+    Encode the new batch results into results.
+
+    Returns:
+        tuple: (errors by name, names of the complete results to cache); partial results are returned but not cached
+    """
+    errors = {}
+    complete = []
+    for name in pending:
+        result = batch_results.get(name, {"error": "No result returned for query"})
+        if isinstance(result, dict) and "error" in result:
+            errors[name] = result["error"]
+            continue
+
+        results[name] = _encode_log_analytics_result(result)
+        if not (isinstance(result, dict) and "partial_error" in result):
+            complete.append(name)
+    return errors, complete
+
+
+def _batch_envelope(results, errors):
+    # Results are already JSON strings, so assemble the envelope without re-parsing them
+    results_json = ", ".join(f"{json.dumps(name)}: {response}" for name, response in results.items())
+    return '{"results": {' + results_json + '}, "errors": ' + json.dumps(errors) + "}"
+
+
+def _assemble_batch_response(results, pending, batch_results, cache_keys):
+    """Serialize and cache the batch results, then build the {"results", "errors"} envelope."""
+    errors, complete = _collect_batch_results(results, pending, batch_results)
+    for name in complete:
+        _store_cached_response(_batch_tool_name(name), cache_keys[name], results[name])
+    return _batch_envelope(results, errors)
+
+
+async def _assemble_batch_response_async(results, pending, batch_results, cache_keys):
+    """Async version of _assemble_batch_response."""
+    errors, complete = _collect_batch_results(results, pending, batch_results)
+    for name in complete:
+        await _store_cached_response_async(_batch_tool_name(name), cache_keys[name], results[name])
+    return _batch_envelope(results, errors)
+
+
+# ----------------------------------------------------------
+# Async MCP tool functions
+# Same behavior and cache as the functions above, but built on the .aio SDK clients so a
+# single worker can keep many tool calls in flight while they wait on HTTP
+
+async def resource_graph_tool_async(query: str, subscription_id: str = None, paginate: bool = True,
+                                    max_rows: int = None, management_group_id: str = None,
+                                    tool_name: str = "resource_graph_tool", bypass_cache: bool = False):
+    """Async version of resource_graph_tool."""
+    logger.debug(f"Running Resource Graph query: {query}")
+
+    try:
+        subscription_ids, management_groups = _resolve_resource_graph_scope(subscription_id, management_group_id)
+        cache_key = make_cache_key(
+            tool_name, query, management_groups or subscription_ids, paginate=paginate, max_rows=max_rows
+        )
+        entry = await _get_cached_entry_async(tool_name, cache_key, bypass_cache)
+        if entry is None:
+            return await _run_and_store_async(tool_name, cache_key, _execute_resource_graph_query_async,
+                                              query, subscription_ids, management_groups, paginate, max_rows)
+        response, fresh = entry
+        # The refresh runs on its own thread with the sync client, off the event loop
+        _revalidate_if_stale(tool_name, cache_key, fresh, _execute_resource_graph_query,
+                             query, subscription_ids, management_groups, paginate, max_rows)
+        return response
+    except Exception as e:
+        logger.error(f"Exception in resource_graph_tool_async: {str(e)}")
+        return json.dumps({"error": str(e)})
+
+
+async def _execute_resource_graph_query_async(query, subscription_ids, management_groups, paginate, max_rows):
+    """Run a Resource Graph query with the shared async client and return the JSON response."""
+    try:
+        credential = get_async_credential()
+        client = _async_client_registry.resource_graph_client(credential)
+        graph_tool = AsyncResourceGraphTool(credential=credential, client=client)
+
+        if paginate:
+            pages = graph_tool.iter_pages_concurrent(
+                query, subscription_ids,
+                page_size=RESOURCE_GRAPH_PAGE_SIZE,
+                max_rows=max_rows or RESOURCE_GRAPH_MAX_ROWS,
+                management_groups=management_groups,
+                max_workers=RESOURCE_GRAPH_MAX_WORKERS
+            )
+            return await _serialize_resource_graph_pages_async(pages)
+
+        response = await graph_tool.run_query(query, subscription_ids, management_groups=management_groups)
+        return serialize(response)
+    except Exception as e:
+        logger.error(f"Exception in resource_graph_tool_async: {str(e)}")
+        return json.dumps({"error": str(e)})
+
+
+async def log_analytics_tool_async(query: str, workspace_id: str, timespan: str = None,
+                                   tool_name: str = "log_analytics_tool", bypass_cache: bool = False,
+                                   output_format: str = RECORDS):
+    """Async version of log_analytics_tool."""
+    logger.debug(f"Running Log Analytics query on workspace: {workspace_id}")
+
+    try:
+        output_format = normalize_output_format(output_format)
+    except ValueError as e:
+        return json.dumps({"error": str(e)})
+
+    # Use default timespan
+    if not timespan:
+        timespan = "30d"
+
+    cache_key = make_cache_key(tool_name, query, workspace_id, timespan, output_format=output_format)
+    response = await _get_cached_response_async(tool_name, cache_key, bypass_cache)
+    if response is None:
+        response = await _run_and_store_async(tool_name, cache_key, _execute_log_analytics_query_async,
+                                              query, workspace_id, timespan, output_format)
+    return response
+
+
+async def _execute_log_analytics_query_async(query, workspace_id, timespan, output_format=RECORDS):
+    """Run a Log Analytics query with the shared async client and return the JSON response."""
+    try:
+        credential = get_async_credential()
+        client = _async_client_registry.logs_client(credential)
+        analytics_tool = AsyncLogAnalyticsTool(credential=credential, client=client, output_format=output_format)
+
+        response = await analytics_tool.run_query(query, workspace_id, timespan)
+        return _encode_log_analytics_result(response)
+    except Exception as e:
+        logger.error(f"Exception in log_analytics_tool_async: {str(e)}")
+        return json.dumps({"error": str(e)})
+
+
+async def log_analytics_batch_tool_async(queries: dict, workspace_id: str, timespan: str = None,
+                                         bypass_cache: bool = False, output_format: str = RECORDS):
+    """Async version of log_analytics_batch_tool."""
+    logger.debug(f"Running Log Analytics batch of {len(queries)} queries on workspace: {workspace_id}")
+
+    try:
+        output_format = normalize_output_format(output_format)
+    except ValueError as e:
+        return json.dumps({"error": str(e)})
+
+    if not timespan:
+        timespan = "30d"
+
+    cache_keys = {
+        name: make_cache_key(_batch_tool_name(name), query, workspace_id, timespan, output_format=output_format)
+        for name, query in queries.items()
+    }
+    results, pending = await _get_cached_batch_responses_async(queries, cache_keys, bypass_cache)
+
+    batch_results = {}
+    if pending:
+        batch_results = await _async_single_flight.do(
+            _batch_flight_key(pending, cache_keys), _execute_log_analytics_batch_async,
+            pending, workspace_id, timespan, output_format
+        )
+
+    return await _assemble_batch_response_async(results, pending, batch_results, cache_keys)
 
-        # Execute the query
-        response = analytics_tool.run_query(query, workspace_id, timespan)
-        logger.info(f"Query response type: {type(response)}")
-        logger.debug(f"Query response: {response}")
 
-        # Make sure all objects are JSON serializable
-        serializable_response = ensure_serializable(response)
-        return json.dumps(serializable_response)
+async def _execute_log_analytics_batch_async(queries, workspace_id, timespan, output_format):
+    """Run a Log Analytics batch with the shared async client; returns {name: result}."""
+    try:
+        credential = get_async_credential()
+        client = _async_client_registry.logs_client(credential)
+        analytics_tool = AsyncLogAnalyticsTool(credential=credential, client=client, output_format=output_format)
+        return await analytics_tool.run_batch(queries, workspace_id, timespan)
     except Exception as e:
-        logger.error(f"Exception in log_analytics_tool: {str(e)}")
-        return json.dumps({"error": str(e)})
+        logger.error(f"Exception in log_analytics_batch_tool_async: {str(e)}")
+        return {name: {"error": str(e)} for name in queries}
 
 
 @log_function_call
-def GetPatchingLevel(subscription_id: str) -> str:
+def GetPatchingLevel(subscription_id: str = None, management_group_id: str = None, bypass_cache: bool = False,
+                     columns=None, row_filter=None, top: int = None, order_by=None,
+                     page_size: int = None, cursor: str = None) -> str:
     """Retrieve the missed patches list by ServeName. This action provides the following metadata for missed patches: 
     Name, KB, Classification, Published Date, Reboot Behavior and Severity.
 
     Arguments:
-    subscription_id (str): Azure subscription ID to query Azure Resource Manager against.
+    subscription_id (str or list): Azure subscription ID(s) to query Azure Resource Manager against,
+        as a list or comma-separated string.
+    management_group_id (str, optional): Management group to query instead of subscriptions.
+    bypass_cache (bool, optional): Run the query even if a cached result exists.
+    columns (str or list, optional): Columns to return, e.g. "ServerName, MissedPatch.kbId, MissedPatch.msrcSeverity";
+        dotted paths select fields of dynamic columns
+    row_filter (str or list, optional): Row predicates, e.g. "MissedPatch.msrcSeverity == Critical"
+    top (int, optional): Maximum number of rows to return
+    order_by (str or list, optional): Columns to sort by, e.g. "ServerName asc"
+    page_size (int, optional): Rows per page for large results (default MCP_PAGE_SIZE, 0 for all rows)
+    cursor (str, optional): paging.next_cursor of a previous page; returns the next page from the cache
 
     Returns (str): 
     The list of the missing patch for all the virtual machines in the environment in JSON format.
     """
+    if cursor:
+        return _next_page("GetPatchingLevel", cursor, page_size)
     # logger.info("GetServerMetadata: Starting to get the server metadata")
-    logger.debug(f"GetPatchingLevel: Subscription ID: {subscription_id}")
+    logger.debug(f"GetPatchingLevel: Subscription ID: {subscription_id}, Management group: {management_group_id}")
     sys.stderr.write("🔧 TOOL CALL: GetPatchingLevel\n")
     sys.stderr.flush()
 
@@ -237,23 +1210,32 @@ def GetPatchingLevel(subscription_id: str) -> str:
     # subscription_id = os.environ.get("SUBSCRIPTION_ID")
 
     # check if the subscription_id is provided
-    if not subscription_id:
-        logger.error("GetPatchingLevel: subscription_id is required")
-        return json.dumps({"error": "subscription_id is required"})
+    if not subscription_id and not management_group_id:
+        logger.error("GetPatchingLevel: subscription_id or management_group_id is required")
+        return json.dumps({"error": "subscription_id or management_group_id is required"})
 
-    kql_query = "patchassessmentresources | where type == 'microsoft.hybridcompute/machines/patchassessmentresults/softwarepatches'| project ServerName= extract(@'/machines/([^/]+)/', 1, id), MissedPatch=properties"
+    try:
+        query = shape_query(PATCHING_LEVEL_QUERY, columns, row_filter, top, order_by)
+    except ValueError as e:
+        logger.error(f"GetPatchingLevel: {str(e)}")
+        return json.dumps({"error": str(e)})
 
-    response = resource_graph_tool(kql_query, subscription_id)
+    response = resource_graph_tool(
+        query, subscription_id, management_group_id=management_group_id,
+        tool_name="GetPatchingLevel", bypass_cache=bypass_cache
+    )
     if not response:
         logger.error("GetPatchingLevel: No response from Resource Graph Tool")
         return json.dumps({"error": "No response from Resource Graph Tool"})
 
     logger.debug("GetPatchingLevel: Finished getting the server metadata")
-    return response
+    return _paginate("GetPatchingLevel", response, page_size)
 
 
 @log_function_call
-def GetSqlMetadata(subscription_id: str) -> str:
+def GetSqlMetadata(subscription_id: str = None, management_group_id: str = None, bypass_cache: bool = False,
+                   columns=None, row_filter=None, top: int = None, order_by=None,
+                   page_size: int = None, cursor: str = None) -> str:
     """Retrieve the SQL infrastructure configuration. 
     The infrastructure is composed by SQL Servers/instances, every SQL Server/instance could have multiple SQL databases. 
     You are able to retrieve following metadata: Database name (DbName), SQL Server name (SrvName), cores used by the server (SrvvCore), 
@@ -262,7 +1244,16 @@ def GetSqlMetadata(subscription_id: str) -> str:
     information about database backup (DbBackupInformation).
 
     Arguments:
-    subscription_id (str): Azure subscription ID to query Azure Resource Manager against.
+    subscription_id (str or list): Azure subscription ID(s) to query Azure Resource Manager against,
+        as a list or comma-separated string.
+    management_group_id (str, optional): Management group to query instead of subscriptions.
+    bypass_cache (bool, optional): Run the query even if a cached result exists.
+    columns (str or list, optional): Columns to return, e.g. "SrvName, DbName, DbSizeMB"
+    row_filter (str or list, optional): Row predicates, e.g. "SrvEdition == Enterprise and DbSizeMB > 1024"
+    top (int, optional): Maximum number of rows to return
+    order_by (str or list, optional): Columns to sort by, e.g. "DbSizeMB desc"
+    page_size (int, optional): Rows per page for large results (default MCP_PAGE_SIZE, 0 for all rows)
+    cursor (str, optional): paging.next_cursor of a previous page; returns the next page from the cache
 
     Returns (str): 
     SQL infrastructure configuration is composed by the following metadata: Database name (DbName), 
@@ -271,8 +1262,10 @@ def GetSqlMetadata(subscription_id: str) -> str:
     license type used (SrvLicenseType), license edition used (SrvEdition), 
     information about database backup (DbBackupInformation) in JSON format.
     """
+    if cursor:
+        return _next_page("GetSqlMetadata", cursor, page_size)
     # logger.info("GetServerMetadata: Starting to get the server metadata")
-    logger.debug(f"GetSqlMetadata: Subscription ID: {subscription_id}")
+    logger.debug(f"GetSqlMetadata: Subscription ID: {subscription_id}, Management group: {management_group_id}")
     sys.stderr.write("🔧 TOOL CALL: GetSqlMetadata\n")
     sys.stderr.flush()
 
@@ -280,23 +1273,32 @@ def GetSqlMetadata(subscription_id: str) -> str:
     # subscription_id = os.environ.get("SUBSCRIPTION_ID")
 
     # check if the subscription_id is provided
-    if not subscription_id:
-        logger.error("GetSqlMetadata: subscription_id is required")
-        return json.dumps({"error": "subscription_id is required"})
+    if not subscription_id and not management_group_id:
+        logger.error("GetSqlMetadata: subscription_id or management_group_id is required")
+        return json.dumps({"error": "subscription_id or management_group_id is required"})
 
-    kql_query = "resources | where type =~ 'microsoft.azurearcdata/sqlserverinstances' | project id, SrvName=name, SrvVersion=tostring(properties['version']), SrvLicenseType=tostring(properties['licenseType']), SrvEdition=tostring(properties['edition']), SrvvCore=toint(properties['vCore']) | join kind=leftouter (resources | where type =~'microsoft.azurearcdata/sqlserverinstances/databases' | project id,DbName=name, DatabaseOptions=properties['databaseOptions'], DbBackupInformation=properties['backupInformation'],DbSpaceAvailableMB=toint(properties['spaceAvailableMB']), DbSizeMB=toint(properties['sizeMB']) | extend ServerId=tostring(parse_path(tostring(parse_path(['id'])['DirectoryPath'])) ['DirectoryPath']) ) on $left.id == $right.ServerId | project-away id, id1"
+    try:
+        query = shape_query(SQL_METADATA_QUERY, columns, row_filter, top, order_by)
+    except ValueError as e:
+        logger.error(f"GetSqlMetadata: {str(e)}")
+        return json.dumps({"error": str(e)})
 
-    response = resource_graph_tool(kql_query, subscription_id)
+    response = resource_graph_tool(
+        query, subscription_id, management_group_id=management_group_id,
+        tool_name="GetSqlMetadata", bypass_cache=bypass_cache
+    )
     if not response:
         logger.error("GetSqlMetadata: No response from Resource Graph Tool")
         return json.dumps({"error": "No response from Resource Graph Tool"})
 
     logger.debug("GetSqlMetadata: Finished getting the server metadata")
-    return response
+    return _paginate("GetSqlMetadata", response, page_size)
 
 
 @log_function_call
-def GetServerMetadata(subscription_id: str) -> str:
+def GetServerMetadata(subscription_id: str = None, management_group_id: str = None, bypass_cache: bool = False,
+                      columns=None, row_filter=None, top: int = None, order_by=None,
+                      page_size: int = None, cursor: str = None) -> str:
     """Retrieve the server infrastructure configuration. 
     The infrastructure could be composed by Windows Servers and/or Linux Servers. 
     You are able to retrieve following metadata: Server name (name), hybrid or native Azure server (type), 
@@ -305,7 +1307,16 @@ def GetServerMetadata(subscription_id: str) -> str:
     subnet used by vm (subnet), Whether SQL Server is installed on the server (mssqlDiscovered). 
 
     Arguments:
-        subscription_id (str): Azure subscription ID to query Azure Resource Manager against.
+        subscription_id (str or list): Azure subscription ID(s) to query Azure Resource Manager against,
+            as a list or comma-separated string.
+        management_group_id (str, optional): Management group to query instead of subscriptions.
+        bypass_cache (bool, optional): Run the query even if a cached result exists.
+        columns (str or list, optional): Columns to return, e.g. "name, OsVersion, coreCount"
+        row_filter (str or list, optional): Row predicates, e.g. "location == westeurope and coreCount > 4"
+        top (int, optional): Maximum number of rows to return
+        order_by (str or list, optional): Columns to sort by, e.g. "coreCount desc"
+        page_size (int, optional): Rows per page for large results (default MCP_PAGE_SIZE, 0 for all rows)
+        cursor (str, optional): paging.next_cursor of a previous page; returns the next page from the cache
 
     Returns (str): 
         The server infrastructure configuration is composed by the following metadata: Server name (name), 
@@ -313,8 +1324,10 @@ def GetServerMetadata(subscription_id: str) -> str:
         processor used by vm (processor), core count used by vm (coreCount), RAM used by VM in GB (RamGB), 
         subnet used by vm (subnet), if SQL is installed on vm (mssqlDiscovered) in JSON format.
     """
+    if cursor:
+        return _next_page("GetServerMetadata", cursor, page_size)
     # logger.info("GetServerMetadata: Starting to get the server metadata")
-    logger.debug(f"GetServerMetadata: Subscription ID: {subscription_id}")
+    logger.debug(f"GetServerMetadata: Subscription ID: {subscription_id}, Management group: {management_group_id}")
     sys.stderr.write("🔧 TOOL CALL: GetServerMetadata\n")
     sys.stderr.flush()
     logger.info("TOOL: GetServerMetadata", extra={
@@ -326,24 +1339,231 @@ def GetServerMetadata(subscription_id: str) -> str:
     # subscription_id = os.environ.get("SUBSCRIPTION_ID")
 
     # check if the subscription_id is provided
-    if not subscription_id:
-        logger.error("GetServerMetadata: subscription_id is required")
-        return json.dumps({"error": "subscription_id is required"})
+    if not subscription_id and not management_group_id:
+        logger.error("GetServerMetadata: subscription_id or management_group_id is required")
+        return json.dumps({"error": "subscription_id or management_group_id is required"})
 
-    kql_query = "resources | where type == 'microsoft.hybridcompute/machines' | project name, type, location, resourceGroup, OsVersion=properties.osSku, processor=properties.detectedProperties.processorNames , coreCount=properties.detectedProperties.logicalCoreCount, RamGB=properties.detectedProperties.totalPhysicalMemoryInGigabytes, subnet=properties.networkProfile.networkInterfaces[0].ipAddresses[0].address, mssqlDiscovered=properties.mssqlDiscovered"
+    try:
+        query = shape_query(SERVER_METADATA_QUERY, columns, row_filter, top, order_by)
+    except ValueError as e:
+        logger.error(f"GetServerMetadata: {str(e)}")
+        return json.dumps({"error": str(e)})
 
-    response = resource_graph_tool(kql_query, subscription_id)
+    response = resource_graph_tool(
+        query, subscription_id, management_group_id=management_group_id,
+        tool_name="GetServerMetadata", bypass_cache=bypass_cache
+    )
     if not response:
         logger.error("GetServerMetadata: No response from Resource Graph Tool")
         return json.dumps({"error": "No response from Resource Graph Tool"})
 
     logger.debug("GetServerMetadata: Finished getting the server metadata")
-    return response
+    return _paginate("GetServerMetadata", response, page_size)
+
+
+def _server_query_chunks(builder, ServerName, timespan, shaping=None):
+    """
+    Build the queries for a per-server tool, shaped with the caller's columns, filter, top and order_by.
+    When several servers are grouped per computer, Computer is always kept and top applies per query.
+
+    Returns:
+        tuple: (list of queries, whether the rows must be grouped per computer)
+    """
+    server_names = parse_id_list(ServerName)
+    if not server_names:
+        raise ValueError("ServerName is required")
+    shaping = shaping or {}
+    if not is_multi_server(server_names):
+        return [shape_query(builder(server_names[0], timespan), **shaping)], False
+    return [
+        shape_query(builder(chunk, timespan), required_columns=("Computer",), **shaping)
+        for chunk in chunk_server_names(server_names)
+    ], True
+
+
+def _group_rows_by_computer(responses):
+    """
+    Merge the JSON responses of multi-server queries into {"servers": {computer: rows}}.
+    Columnar responses are grouped as {"servers": {computer: {"columns", "rows"}}}.
+    """
+    for response in responses:
+        if _is_error_response(response):
+            return response
+    return json.dumps(_group_tables_by_computer(json.loads(response) for response in responses))
+
+
+def _group_tables_by_computer(results):
+    """
+    Group the parsed results of multi-server queries per computer, as _group_rows_by_computer does.
+    A partial result contributes its rows and keeps its partial_error.
+    """
+    servers = {}
+    count = 0
+    partial_error = None
+    for tables in results:
+        if isinstance(tables, dict):
+            partial_error = tables["partial_error"]
+            tables = tables["tables"]
+        for table in tables:
+            if isinstance(table, dict):
+                columns = table["columns"]
+                index = columns.index("Computer")
+                for row in table["rows"]:
+                    group = servers.setdefault(row[index], {"columns": columns, "rows": []})
+                    group["rows"].append(row)
+                    count += 1
+                continue
+            for row in table:
+                servers.setdefault(row.get("Computer"), []).append(row)
+                count += 1
+    grouped = {"servers": servers, "server_count": len(servers), "count": count}
+    if partial_error is not None:
+        grouped["partial_error"] = partial_error
+    return grouped
+
+
+def _run_server_query(tool_name, builder, workspace_id, ServerName, timespan, bypass_cache, output_format=RECORDS,
+                      shaping=None):
+    """Run a per-server tool for one server, or for many servers with one query per chunk."""
+    queries, grouped = _server_query_chunks(builder, ServerName, timespan or "30d", shaping)
+    # Pass None for timespan since we've embedded it in the queries
+    responses = [
+        log_analytics_tool(query, workspace_id, None, tool_name=tool_name, bypass_cache=bypass_cache,
+                           output_format=output_format)
+        for query in queries
+    ]
+    return _group_rows_by_computer(responses) if grouped else responses[0]
+
+
+# How delta mode merges new rows into the baseline for each tool: the columns identifying a row,
+# the sort order and the row limit of the full query
+DELTA_TOOLS = {
+    "GetSwChangesList": {
+        "builder": build_sw_changes_list_query, "key_columns": None,
+        "order_by": "TimeGenerated", "descending": True, "max_rows": SW_CHANGES_MAX_RESULTS,
+    },
+    "GetSwConfig": {
+        "builder": build_sw_config_query,
+        "key_columns": ["SoftwareName", "Publisher", "Computer", "SoftwareType", "CurrentVersion"],
+        "order_by": "SoftwareName", "descending": False, "max_rows": SW_CONFIG_MAX_RESULTS,
+    },
+}
+
+
+def _delta_plan(tool_name, workspace_id, ServerName, timespan, bypass_cache, shaping=None):
+    """
+    Prepare a delta mode call: load the baseline and build the queries.
+    Without a baseline the queries are the full ones; with one they only read records after its high-water mark.
+
+    Returns:
+        tuple: (baseline key, baseline dict or None, queries, whether rows are grouped per computer)
+    """
+    if any(value not in (None, "", []) for value in (shaping or {}).values()):
+        raise ValueError("delta cannot be combined with columns, filter, top or order_by")
+    servers = tuple(sorted(name.lower() for name in parse_id_list(ServerName)))
+    key = ("delta", tool_name, workspace_id, servers, normalize_timespan(timespan))
+    cached = None if bypass_cache else _result_cache.get(key)
+    baseline = json.loads(cached) if cached else None
+    since = delta_since(baseline["high_water"]) if baseline and baseline["high_water"] else None
+
+    builder = DELTA_TOOLS[tool_name]["builder"]
+    queries, grouped = _server_query_chunks(
+        lambda names, window: builder(names, window, since=since), ServerName, timespan
+    )
+    if since:
+        logger.info(f"{tool_name}: delta query for records after {since}")
+    else:
+        logger.info(f"{tool_name}: no delta baseline, running the full query")
+    return key, baseline, queries, grouped
+
+
+def _delta_merge(tool_name, key, baseline, responses, grouped, timespan, output_format):
+    """Merge delta query results into the baseline, store it and encode the tool response."""
+    tables = []
+    for response in responses:
+        if _is_error_response(response):
+            return response
+        tables.extend(json.loads(response))
+
+    columns = baseline["columns"] if baseline else next((table["columns"] for table in tables), None)
+    if columns is None:
+        return encode_tables([], output_format)
+    new_rows = [
+        row if table["columns"] == columns else [dict(zip(table["columns"], row)).get(column) for column in columns]
+        for table in tables for row in table["rows"]
+    ]
+
+    settings = DELTA_TOOLS[tool_name]
+    rows = merge_rows(
+        columns, baseline["rows"] if baseline else [], new_rows, key_columns=settings["key_columns"],
+        timespan=timespan, order_by=settings["order_by"], descending=settings["descending"],
+        max_rows=settings["max_rows"], per_computer=grouped,
+    )
+    high_water = high_water_mark(columns, rows) or (baseline or {}).get("high_water")
+    _result_cache.set(key, serialize({"columns": columns, "rows": rows, "high_water": high_water}),
+                      ttl=DELTA_BASELINE_TTL)
+    logger.info(f"{tool_name}: merged {len(new_rows)} new rows into a baseline of {len(rows)} rows")
+
+    response = encode_tables([ResultTable("PrimaryResult", columns, rows)], output_format)
+    return _group_rows_by_computer([response]) if grouped else response
+
+
+def _run_server_query_delta(tool_name, workspace_id, ServerName, timespan, bypass_cache, output_format=RECORDS,
+                            shaping=None):
+    """
+    Run a per-server tool in delta mode: only records newer than the cached baseline are queried,
+    and the response is the baseline with the new records merged in.
+    """
+    output_format = normalize_output_format(output_format)
+    timespan = timespan or "30d"
+    key, baseline, queries, grouped = _delta_plan(tool_name, workspace_id, ServerName, timespan, bypass_cache, shaping)
+    if baseline is None:
+        responses = [
+            log_analytics_tool(query, workspace_id, None, tool_name=tool_name, bypass_cache=bypass_cache,
+                               output_format=COLUMNAR)
+            for query in queries
+        ]
+    else:
+        # Delta queries are never reused, so they skip the result cache
+        responses = [_execute_log_analytics_query(query, workspace_id, timespan, COLUMNAR) for query in queries]
+    return _delta_merge(tool_name, key, baseline, responses, grouped, timespan, output_format)
+
+
+async def _run_server_query_delta_async(tool_name, workspace_id, ServerName, timespan, bypass_cache,
+                                        output_format=RECORDS, shaping=None):
+    """
+    Async version of _run_server_query_delta; the chunk queries run concurrently, and loading, merging and
+    storing the baseline run off the event loop.
+    """
+    output_format = normalize_output_format(output_format)
+    timespan = timespan or "30d"
+    key, baseline, queries, grouped = await asyncio.to_thread(
+        _delta_plan, tool_name, workspace_id, ServerName, timespan, bypass_cache, shaping
+    )
+    if baseline is None:
+        responses = await asyncio.gather(*(
+            log_analytics_tool_async(query, workspace_id, None, tool_name=tool_name, bypass_cache=bypass_cache,
+                                     output_format=COLUMNAR)
+            for query in queries
+        ))
+    else:
+        responses = await asyncio.gather(*(
+            _execute_log_analytics_query_async(query, workspace_id, timespan, COLUMNAR) for query in queries
+        ))
+    return await asyncio.to_thread(_delta_merge, tool_name, key, baseline, responses, grouped, timespan, output_format)
 
 
 @log_function_call
-def GetSqlBpAssessment(workspace_id: str, timespan: str = None) -> str:
-    """Retrieves SQL Server Best Practices Assessment data from Azure Log Analytics."""
+def GetSqlBpAssessment(workspace_id: str, timespan: str = None, bypass_cache: bool = False,
+                       output_format: str = RECORDS, columns=None, row_filter=None, top: int = None,
+                       order_by=None, page_size: int = None, cursor: str = None) -> str:
+    """Retrieves SQL Server Best Practices Assessment data from Azure Log Analytics.
+
+    The optional columns, filter, top and order_by arguments shape the result, and page_size and cursor
+    page through large results, as in GetServerMetadata.
+    """
+    if cursor:
+        return _next_page("GetSqlBpAssessment", cursor, page_size)
     logger.info(f"GetSqlBpAssessment: Workspace ID: {workspace_id}")
     logger.info(
         f"GetSqlBpAssessment: Executing query with timespan: {timespan}")
@@ -354,30 +1574,46 @@ def GetSqlBpAssessment(workspace_id: str, timespan: str = None) -> str:
     if not timespan:
         timespan = "30d"
 
-    # Construct the query with proper timespan handling
-    query = f"let selectedCategories = dynamic([]);let selectedTotSev = dynamic([]); SqlAssessment_CL| where TimeGenerated > ago({timespan}) | extend asmt = parse_csv(RawData) | where asmt[11] =~ 'MSSQLSERVER' | extend AsmtId=tostring(asmt[1]), CheckId=tostring(asmt[2]), DisplayString=asmt[3], Description=tostring(asmt[4]), HelpLink=asmt[5], TargetType=case(asmt[6] == 1, 'Server', asmt[6] == 2, 'Database', ''), TargetName=tostring(asmt[7]), Severity=case(asmt[8] == 30, 'High', asmt[8] == 20, 'Medium', asmt[8] == 10, 'Low', asmt[8] == 0, 'Information', asmt[8] == 1, 'Warning', asmt[8] == 2, 'Critical', 'Passed'), Message=tostring(asmt[9]), TagsArr=split(tostring(asmt[10]), ','), Sev = toint(asmt[8]) | where (set_has_element(dynamic(['*']), CheckId) or '*' == '*') and (set_has_element(dynamic(['*']), TargetName) or '*' == '*') and set_has_element(dynamic([30, 20, 10, 0]), Sev) and (array_length(set_intersect(TagsArr, dynamic(['*']))) > 0 or '*' == '*') and (CheckId == '' and Sev == 0 or '' == '') | extend Category = case(array_length(set_intersect(TagsArr, dynamic(['CPU', 'IO', 'Storage']))) > 0, '0', array_length(set_intersect(TagsArr, dynamic(['TraceFlag', 'Backup', 'DBCC', 'DBConfiguration', 'SystemHealth', 'Traces', 'DBFileConfiguration', 'Configuration', 'Replication', 'Agent', 'Security', 'DataIntegrity', 'MaxDOP', 'PageFile', 'Memory', 'Performance', 'Statistics']))) > 0, '1', array_length(set_intersect(TagsArr, dynamic(['UpdateIssues', 'Index', 'Naming', 'Deprecated', 'masterDB', 'QueryOptimizer', 'QueryStore', 'Indexes']))) > 0, '2', '3') | where (Sev >= 0 and array_length(selectedTotSev) == 0 or Sev in (selectedTotSev)) and (Category in (selectedCategories) or array_length(selectedCategories) == 0) | project TargetType, TargetName, Severity, Message, Tags=strcat_array(array_slice(TagsArr, 1, -1), ', '), CheckId, Description, HelpLink = tostring(HelpLink), SeverityCode = toint(Sev) | order by SeverityCode desc, TargetType desc, TargetName asc | project-away SeverityCode | extend PackedRecord = pack_all() | summarize Result = make_list(PackedRecord)"
-
     try:
+        query = shape_query(build_sql_bp_assessment_query(timespan), columns, row_filter, top, order_by)
         # Pass None for timespan since we've embedded it in the query
-        return log_analytics_tool(query, workspace_id, None)
+        response = log_analytics_tool(query, workspace_id, None, tool_name="GetSqlBpAssessment",
+                                      bypass_cache=bypass_cache, output_format=output_format)
+        return _paginate("GetSqlBpAssessment", response, page_size)
     except Exception as e:
         logger.error(f"Error in GetSqlBpAssessment: {str(e)}")
         return json.dumps({"error": str(e)})
 
 
 @log_function_call
-def GetSwChangesList(workspace_id: str, ServerName: str, timespan: str = None) -> str:
+def GetSwChangesList(workspace_id: str, ServerName, timespan: str = None, bypass_cache: bool = False,
+                     output_format: str = RECORDS, columns=None, row_filter=None, top: int = None,
+                     order_by=None, page_size: int = None, cursor: str = None, delta: bool = False) -> str:
     """Use this tool when you need to find the software configuration changes for a specific server. Using this tool you get: 
     name of the software (SoftwareName), who publisehd/produced the software (Publisher), the name of the server using this software (Computer), 
     the time stamp when this information has been assessed (TimeGenerated), which kind of software it is (SoftwareType), the type of the change occured (ChangeCategory), the previous state of this software (Previous)
 
     Arguments:
         workspace_id (str): The workspace ID for the Log Analytics query
-        ServerName (str): The name of the Windows Server to query
-        timespan (str, optional): The timespan for the query (e.g., "30d" for 30 days)       
+        ServerName (str or list): The Windows Server to query, a list or comma-separated string of
+            servers, or a prefix ending in '*' (e.g. "web-*")
+        timespan (str, optional): The timespan for the query (e.g., "30d" for 30 days)
+        bypass_cache (bool, optional): Run the query even if a cached result exists
+        output_format (str, optional): "records" (default) or "columnar" for column names plus row arrays
+        columns (str or list, optional): Columns to return, e.g. "Computer, SoftwareName, ChangeCategory"
+        row_filter (str or list, optional): Row predicates, e.g. "Publisher contains Microsoft"
+        top (int, optional): Maximum number of rows to return
+        order_by (str or list, optional): Columns to sort by, e.g. "TimeGenerated desc"
+        page_size (int, optional): Rows per page for large results (default MCP_PAGE_SIZE, 0 for all rows)
+        cursor (str, optional): paging.next_cursor of a previous page; returns the next page from the cache
+        delta (bool, optional): Only query the changes recorded since the previous delta call and merge
+            them into its cached result; cannot be combined with columns, filter, top or order_by
     Returns (str):
-        The list of the software configuration changes for a specific server in JSON format
+        The list of the software configuration changes for a specific server in JSON format;
+        for several servers the rows are grouped per computer under "servers"
     """
+    if cursor:
+        return _next_page("GetSwChangesList", cursor, page_size)
     logger.info(f"GetSwChangesList: Workspace ID: {workspace_id}")
     logger.info(f"GetSwChangesList: Executing query with timespan: {timespan}")
     sys.stderr.write("🔧 TOOL CALL: GetSwChangesList\n")
@@ -389,47 +1625,49 @@ def GetSwChangesList(workspace_id: str, ServerName: str, timespan: str = None) -
         logger.info(
             f"GetSwChangesList: No timespan provided, using default: {timespan}")
 
-    # Use default tool configuration
-    max_results = 500
-    include_system_changes = False
-
-    # Build system change filter
-    system_filter = ""
-    if not include_system_changes:
-        system_filter = "| where SoftwareType !in ('Security Update', 'Update', 'Hotfix')"
-
-    # Construct the optimized query with proper time filtering and result limiting
-    query = f"""ConfigurationChange 
-| where TimeGenerated > datetime_utc_to_local(now(2h)-{timespan}, 'Europe/Rome') 
-| where ConfigChangeType == 'Software' and Computer == '{ServerName}'
-{system_filter}
-| project TimeGenerated, Computer, ChangeCategory, SoftwareType, SoftwareName, Previous, Publisher
-| top {max_results} by TimeGenerated desc"""
-
-    logger.info(
-        f"GetSwChangesList: Query optimized with timespan {timespan} and max results {max_results}")
-
     try:
-        # Pass None for timespan since we've embedded it in the query
-        return log_analytics_tool(query, workspace_id, None)
+        shaping = dict(columns=columns, row_filter=row_filter, top=top, order_by=order_by)
+        if delta:
+            response = _run_server_query_delta("GetSwChangesList", workspace_id, ServerName, timespan,
+                                               bypass_cache, output_format, shaping)
+        else:
+            response = _run_server_query("GetSwChangesList", build_sw_changes_list_query, workspace_id, ServerName,
+                                         timespan, bypass_cache, output_format, shaping)
+        return _paginate("GetSwChangesList", response, page_size)
     except Exception as e:
         logger.error(f"Error in GetSwChangesList: {str(e)}")
         return json.dumps({"error": str(e)})
 
 
 @log_function_call
-def GetSwConfig(workspace_id: str, ServerName: str, timespan: str = None) -> str:
+def GetSwConfig(workspace_id: str, ServerName, timespan: str = None, bypass_cache: bool = False,
+                output_format: str = RECORDS, columns=None, row_filter=None, top: int = None,
+                order_by=None, page_size: int = None, cursor: str = None, delta: bool = False) -> str:
     """Use this tool when you need to find the software configuration for servers. 
     Using this tool you get: name of the software (SoftwareName), who publisehd/produced the software (Publisher), 
     the name of the server using this software (Computer), the time stamp when this information has been assessed (TimeGenerated), 
     which kind of software it is (SoftwareType) and the version of the software (CurrentVersion)    
     Arguments:
         workspace_id (str): The workspace ID for the Log Analytics query
-        ServerName (str): The name of the Windows Server to query
-        timespan (str, optional): The timespan for the query (e.g., "30d" for 30 days)        
+        ServerName (str or list): The Windows Server to query, a list or comma-separated string of
+            servers, or a prefix ending in '*' (e.g. "web-*")
+        timespan (str, optional): The timespan for the query (e.g., "30d" for 30 days)
+        bypass_cache (bool, optional): Run the query even if a cached result exists
+        output_format (str, optional): "records" (default) or "columnar" for column names plus row arrays
+        columns (str or list, optional): Columns to return, e.g. "Computer, SoftwareName, CurrentVersion"
+        row_filter (str or list, optional): Row predicates, e.g. "Publisher contains Microsoft"
+        top (int, optional): Maximum number of rows to return
+        order_by (str or list, optional): Columns to sort by, e.g. "SoftwareName asc"
+        page_size (int, optional): Rows per page for large results (default MCP_PAGE_SIZE, 0 for all rows)
+        cursor (str, optional): paging.next_cursor of a previous page; returns the next page from the cache
+        delta (bool, optional): Only query the inventory records since the previous delta call and merge
+            them into its cached result; cannot be combined with columns, filter, top or order_by
     Returns (str):
-        The chronological list of the software installed in JSON format
+        The chronological list of the software installed in JSON format;
+        for several servers the rows are grouped per computer under "servers"
     """
+    if cursor:
+        return _next_page("GetSwConfig", cursor, page_size)
     logger.info(f"GetSwConfig: Workspace ID: {workspace_id}")
     logger.info(f"GetSwConfig: Executing query with timespan: {timespan}")
     sys.stderr.write("🔧 TOOL CALL: GetSwConfig\n")
@@ -441,36 +1679,24 @@ def GetSwConfig(workspace_id: str, ServerName: str, timespan: str = None) -> str
         logger.info(
             f"GetSwConfig: No timespan provided, using default: {timespan}")
 
-    # Use default tool configuration
-    max_results = 1000
-    include_system_software = False
-
-    # Build the optimized query with proper time filtering and result limiting
-    system_filter = ""
-    if not include_system_software:
-        system_filter = "| where SoftwareType !in ('Security Update', 'Update', 'Hotfix', 'Definition Update')"
-
-    query = f"""ConfigurationData 
-| where TimeGenerated > ago({timespan})
-| where Computer == '{ServerName}' and SoftwareName != '' and SoftwareName !~ 'unknown'
-{system_filter}
-| summarize arg_max(TimeGenerated, *) by SoftwareName, Publisher, Computer, SoftwareType, CurrentVersion
-| project SoftwareName, Publisher, Computer, TimeGenerated, SoftwareType, CurrentVersion
-| top {max_results} by SoftwareName asc"""
-
-    logger.info(
-        f"GetSwConfig: Query optimized with timespan {timespan} and max results {max_results}")
-
     try:
-        # Pass None for timespan since we've embedded it in the query
-        return log_analytics_tool(query, workspace_id, None)
+        shaping = dict(columns=columns, row_filter=row_filter, top=top, order_by=order_by)
+        if delta:
+            response = _run_server_query_delta("GetSwConfig", workspace_id, ServerName, timespan, bypass_cache,
+                                               output_format, shaping)
+        else:
+            response = _run_server_query("GetSwConfig", build_sw_config_query, workspace_id, ServerName, timespan,
+                                         bypass_cache, output_format, shaping)
+        return _paginate("GetSwConfig", response, page_size)
     except Exception as e:
         logger.error(f"Error in GetSwConfig: {str(e)}")
         return json.dumps({"error": str(e)})
 
 
 @log_function_call
-def GetWinBpAssessment(workspace_id: str, timespan: str = None) -> str:
+def GetWinBpAssessment(workspace_id: str, timespan: str = None, bypass_cache: bool = False,
+                       output_format: str = RECORDS, columns=None, row_filter=None, top: int = None,
+                       order_by=None, page_size: int = None, cursor: str = None) -> str:
     """Retrieve the Windows Server infrastructure issues and remediations. IT can retrieves: the name of the Windows Server (Computer), 
     Description of the recommendation (Recommendation), which area is impacted (ActionArea), if the server or the cluster is impacted (AffectedObjectType), 
     type of remediation (FocusArea), Description of the recommendation (Description), the score assigned to the severity of the issue (Weight)
@@ -478,19 +1704,25 @@ def GetWinBpAssessment(workspace_id: str, timespan: str = None) -> str:
     Arguments:
         workspace_id (str): The workspace ID for the Log Analytics query
         timespan (str, optional): The timespan for the query (e.g., "30d" for 30 days)
+        bypass_cache (bool, optional): Run the query even if a cached result exists
+        output_format (str, optional): "records" (default) or "columnar" for column names plus row arrays
+        columns (str or list, optional): Columns to return, e.g. "Computer, Recommendation, Weight"
+        row_filter (str or list, optional): Row predicates, e.g. "Weight >= 3"
+        top (int, optional): Maximum number of rows to return
+        order_by (str or list, optional): Columns to sort by, e.g. "Weight desc"
+        page_size (int, optional): Rows per page for large results (default MCP_PAGE_SIZE, 0 for all rows)
+        cursor (str, optional): paging.next_cursor of a previous page; returns the next page from the cache
     Returns (str):
         The Windows infrastructure configuration with remediation recommendations in JSON format
     """
+    if cursor:
+        return _next_page("GetWinBpAssessment", cursor, page_size)
     logger.info(f"GetWinBpAssessment: Workspace ID: {workspace_id}")
     logger.info(
         f"GetWinBpAssessment: Executing query with timespan: {timespan}")
     sys.stderr.write("🔧 TOOL CALL: GetWinBpAssessment\n")
     sys.stderr.flush()
 
-    # Use default tool configuration
-    weight_threshold = 5.0
-    max_results = 500
-
     # Set default timespan if not provided
     if not timespan:
         timespan = "30d"
@@ -499,35 +1731,44 @@ def GetWinBpAssessment(workspace_id: str, timespan: str = None) -> str:
     else:
         logger.info(f"GetWinBpAssessment: Using provided timespan: {timespan}")
 
-    # Construct the optimized query with proper time filtering and result limiting
-    query = f"""WindowsServerAssessmentRecommendation 
-| where TimeGenerated > ago({timespan})
-| where FocusArea != 'EnvironementFilter' and RecommendationResult == 'Failed' and Computer != ''
-| extend Weight = (RecommendationScore/10)
-| where Weight >= {weight_threshold}
-| summarize by Computer, Recommendation, ActionArea, AffectedObjectType, FocusArea, RecommendationId, Description, Weight
-| top {max_results} by Weight desc"""
-
-    logger.info(
-        f"GetWinBpAssessment: Query optimized with timespan {timespan}, weight threshold {weight_threshold}, and max results {max_results}")
-
     try:
+        query = shape_query(build_win_bp_assessment_query(timespan), columns, row_filter, top, order_by)
         # Pass None for timespan since we've embedded it in the query
-        return log_analytics_tool(query, workspace_id, None)
+        response = log_analytics_tool(query, workspace_id, None, tool_name="GetWinBpAssessment",
+                                      bypass_cache=bypass_cache, output_format=output_format)
+        return _paginate("GetWinBpAssessment", response, page_size)
     except Exception as e:
         logger.error(f"Error in GetWinBpAssessment: {str(e)}")
         return json.dumps({"error": str(e)})
 
 
 @log_function_call
-def GetAnomalies(workspace_id: str, timespan: str = None) -> str:
+def GetAnomalies(workspace_id: str, timespan: str = None, bypass_cache: bool = False,
+                 output_format: str = RECORDS, columns=None, row_filter=None, top: int = None,
+                 order_by=None, page_size: int = None, cursor: str = None, metrics: list[str] = None,
+                 anomaly_threshold: float = None, include_expected: bool = True) -> str:
     """
     Use this tool to detect anomalies on the metrics behavior of your servers. 
-    The metrics analyzed are "Processor" and "Logical Disk"
+    The metrics analyzed are "Processor" and "Logical Disk" unless others are requested. Every server and metric
+    is compared with its own time-of-day baseline, and the bins far above it (robust z-score of anomaly_threshold,
+    3.5 by default, or more; below it for available memory) are reported. The bin size grows with the timespan, from 1 minute for
+    an hour to 3 hours for 30 days, so every series has at most 240 points.
 
     Arguments:
         workspace_id (str): The workspace ID for the Log Analytics query.
         timespan (str): The timespan for the query (e.g., "30d" for 30 days).
+        bypass_cache (bool, optional): Run the query even if a cached result exists.
+        output_format (str, optional): "records" (default) or "columnar" for column names plus row arrays.
+        columns (str or list, optional): Columns to return, e.g. "Computer, Namespace, AnomalyScore".
+        row_filter (str or list, optional): Row predicates, e.g. "Namespace == Processor and AnomalyScore > 5".
+        top (int, optional): Maximum number of rows to return (default the 100 highest scores).
+        order_by (str or list, optional): Columns to sort by, e.g. "ActualUsage desc".
+        page_size (int, optional): Rows per page for large results (default MCP_PAGE_SIZE, 0 for all rows).
+        cursor (str, optional): paging.next_cursor of a previous page; returns the next page from the cache.
+        metrics (list, optional): Metrics to analyze: Processor, LogicalDisk, Memory, Network, or any
+            InsightsMetrics namespace, optionally as "Namespace/Name" for a single counter.
+        anomaly_threshold (float, optional): Minimum AnomalyScore reported (default 3.5).
+        include_expected (bool, optional): Return the ExpectedUsage column (default true).
 
 
     :return: 
@@ -536,16 +1777,13 @@ def GetAnomalies(workspace_id: str, timespan: str = None) -> str:
     the metrics experieced the anomaly (Namespace), the usage measured (ActualUsage), 
     the usage expected (ExpectedUsage) and a KPI named AnomalyScore which measure how much the anomaly is critical (higher means more critical)
     """
+    if cursor:
+        return _next_page("GetAnomalies", cursor, page_size)
 
     logger.info(f"GetAnomalies: Workspace ID: {workspace_id}")
     sys.stderr.write("🔧 TOOL CALL: GetAnomalies\n")
     sys.stderr.flush()
 
-    # Use default tool configuration
-    anomaly_threshold = 10.0
-    metrics = ["Processor", "LogicalDisk"]
-    include_expected = True
-
     # Set default timespan if not provided
     if not timespan:
         timespan = "30d"
@@ -554,35 +1792,647 @@ def GetAnomalies(workspace_id: str, timespan: str = None) -> str:
     else:
         logger.info(f"GetAnomalies: Using provided timespan: {timespan}")
 
-    # Build metrics filter based on configuration
-    metrics_filter = " or ".join(
-        [f"Namespace == '{metric}'" for metric in metrics])
+    logger.info(f"GetAnomalies: Executing query with timespan: {timespan}")
+    logger.info(f"GetAnomalies: Using anomaly threshold: {anomaly_threshold or DEFAULT_ANOMALY_THRESHOLD}")
+    logger.info(f"GetAnomalies: Monitoring metrics: {metrics or 'default'}")
 
-    # Build the query with configurable parameters - simplified to avoid validation issues
-    query = f"""InsightsMetrics 
-| where TimeGenerated >= ago({timespan})
-| where Namespace in ('Processor', 'LogicalDisk')
-| where isnotempty(Val) and isfinite(Val)
-| summarize AvgValue = avg(Val) by Computer, Namespace, bin(TimeGenerated, 1h)
-| where AvgValue > 80
-| project TimeGenerated, Computer, Namespace, AvgValue
-| sort by AvgValue desc
-| take 100"""
+    try:
+        plan = _rollup_plan(workspace_id, timespan, bypass_cache, metrics)
+    except ValueError as e:
+        logger.error(f"GetAnomalies: {str(e)}")
+        return json.dumps({"error": str(e)})
 
-    logger.info(f"GetAnomalies: Executing query with timespan: {timespan}")
-    logger.info(f"GetAnomalies: Using anomaly threshold: {anomaly_threshold}")
-    logger.info(f"GetAnomalies: Monitoring metrics: {metrics}")
-    logger.info(f"GetAnomalies: Workspace ID: {workspace_id}")
+    # The bins are always fetched columnar: they are only read by the rollup store
+    fetched = log_analytics_tool(plan["query"], workspace_id, timespan, tool_name="GetAnomalies",
+                                 bypass_cache=bypass_cache, output_format=COLUMNAR)
+    response = _anomalies_response(_rollup_series(plan, fetched), output_format,
+                                   dict(selected=columns, row_filter=row_filter, top=top, order_by=order_by), plan,
+                                   include_expected, anomaly_threshold)
+    return _paginate("GetAnomalies", response, page_size)
 
-    # Pass None for timespan since we've embedded it in the query
-    response = log_analytics_tool(query, workspace_id, None)
-    if not response:
-        logger.error("GetAnomalies: No response from Log Analytics Tool")
-        return json.dumps({"error": "No response from Log Analytics Tool"})
 
+def _rollup_plan(workspace_id, timespan, bypass_cache, metrics=None):
+    """
+    Load the metric rollups of a workspace and build the query for the bins they are missing:
+    the whole window the first time, afterwards only the newest bins.
+
+    Windows with bins of an hour or more share the hourly rollups and average several hours per point;
+    shorter windows keep rollups at their own bin size.
+    """
+    plan = _anomaly_resolution(timespan, metrics)
+    labels = tuple(sorted(spec.label for spec in plan["specs"]))
+    rollup_bin = min(plan["bin_seconds"], HOUR)
+    key = ("rollups", workspace_id, labels, rollup_bin)
+    # bypass_cache rebuilds the rollups: the new store replaces the live one once it is filled
+    store = MetricRollupStore(rollup_bin) if bypass_cache else _load_rollups(key, rollup_bin)
+    window_start, window_end = rollup_window(time.time(), plan["window"], plan["bin_seconds"])
+    with _rollups_lock:
+        since = store.fetch_start(window_start)
+        series_count = len(store)
+    logger.info(f"GetAnomalies: {kql_timespan(plan['bin_seconds'])} bins, {series_count} series in the rollups, "
+                f"fetching bins from {format_bin_time(since)}")
+    plan.update(key=key, store=store, since=since, window_start=window_start, window_end=window_end,
+                bins_per_point=plan["bin_seconds"] // rollup_bin,
+                query=build_anomalies_rollup_query(format_bin_time(since), labels, rollup_bin))
+    return plan
+
+
+def _rollup_series(plan, fetched):
+    """
+    Merge the fetched bins into the rollups and return the series of the requested window.
+    Errors are passed through; partial results are used for this call but not stored.
+    """
+    if _is_error_response(fetched):
+        return fetched
+    rows = read_rollup_rows(fetched)
+    partial = fetched.startswith('{"tables"')
+    payload = None
+    with _rollups_lock:
+        store = plan["store"].copy() if partial else plan["store"]
+        changed = store.merge(rows, plan["since"], plan["window_end"])
+        changed |= store.trim(min(plan["window_start"],
+                                  plan["window_end"] - ROLLUP_RETENTION_BINS * store.bin_seconds))
+        if not partial:
+            _rollup_stores[plan["key"]] = [store, time.monotonic()]
+            if changed and _rollup_backend is not None:
+                payload = store.to_bytes()
+        series = store.series(plan["window_start"], plan["window_end"], plan["bins_per_point"])
+    if payload is not None:
+        _rollup_backend.set_bytes(plan["key"], payload, ROLLUP_TTL)
+    return series
+
+
+# Live metric rollups by ("rollups", workspace, labels, bin seconds): [store, last used], merged in place.
+# They stay out of the result cache, and the disk tier gets a raw copy whenever a call changed them,
+# for cold starts and the other instances sharing DISK_CACHE_DIR
+_rollup_stores = {}
+_rollups_lock = threading.Lock()
+
+
+def _create_rollup_backend():
+    """Create the disk tier of the metric rollups, in its own directory so it never evicts tool results."""
+    if not DISK_CACHE_ENABLED:
+        return None
+    try:
+        return FileCacheBackend(os.path.join(DISK_CACHE_DIR, "rollups"), max_bytes=ROLLUP_DISK_MAX_BYTES)
+    except OSError as e:
+        logger.warning(f"Disk tier for metric rollups unavailable, keeping them in memory only: {str(e)}")
+        return None
+
+
+_rollup_backend = _create_rollup_backend()
+
+
+def _load_rollups(key, bin_seconds):
+    """Get the live rollups of a key, loading them from disk on first use; drops those unused for ROLLUP_TTL."""
+    now = time.monotonic()
+    with _rollups_lock:
+        for other in [other for other, (_, used) in _rollup_stores.items() if now - used > ROLLUP_TTL]:
+            del _rollup_stores[other]
+        entry = _rollup_stores.get(key)
+        if entry is not None:
+            entry[1] = now
+            return entry[0]
+
+    store = _read_rollups(key) or MetricRollupStore(bin_seconds)
+    with _rollups_lock:
+        # Another call may have loaded them meanwhile
+        return _rollup_stores.setdefault(key, [store, now])[0]
+
+
+def _read_rollups(key):
+    if _rollup_backend is None:
+        return None
+    try:
+        entry = _rollup_backend.get_bytes(key)
+        return MetricRollupStore.from_bytes(entry[0]) if entry else None
+    except Exception as e:
+        logger.warning(f"GetAnomalies: unreadable metric rollups, starting over: {str(e)}")
+        return None
+
+
+def _anomalies_response(series, output_format=RECORDS, shaping=None, resolution=None, include_expected=True,
+                        threshold=None):
+    """
+    Score metric series for GetAnomalies and encode the anomalies found.
+    The caller's columns, filter, top and order_by apply to the anomaly rows, since their columns are computed here.
+
+    Args:
+        series (list or str): Series from the rollups or read_series, or the error response of the query
+        resolution (dict, optional): From _anomaly_resolution; hourly series of increasing metrics otherwise
+        include_expected (bool): Return the ExpectedUsage column
+        threshold (float, optional): Minimum AnomalyScore reported; DEFAULT_ANOMALY_THRESHOLD by default
+    """
+    if isinstance(series, str) or series is None:
+        if not series:
+            logger.error("GetAnomalies: No response from Log Analytics Tool")
+            return json.dumps({"error": "No response from Log Analytics Tool"})
+        return series
+
+    shaping = shaping or {}
+    try:
+        output_format = normalize_output_format(output_format)
+        threshold = DEFAULT_ANOMALY_THRESHOLD if threshold is None else threshold
+        if threshold <= 0:
+            raise ValueError("anomaly_threshold must be greater than 0")
+        # Without a top of its own, the caller gets the highest scores only
+        resolution = resolution or {"period": DAY // HOUR, "low_is_bad": ()}
+        columns, rows = detect_anomalies(series, threshold,
+                                         max_results=None if shaping.get("top") else ANOMALY_MAX_RESULTS,
+                                         include_expected=include_expected, period=resolution["period"],
+                                         low_is_bad=resolution["low_is_bad"])
+        columns, rows = shape_rows(columns, rows, **shaping)
+    except ValueError as e:
+        logger.error(f"GetAnomalies: {str(e)}")
+        return json.dumps({"error": str(e)})
+    except Exception as e:
+        logger.error(f"GetAnomalies: anomaly detection failed: {str(e)}")
+        return json.dumps({"error": f"Anomaly detection failed: {str(e)}"})
+    return encode_tables([ResultTable("PrimaryResult", columns, rows)], output_format)
+
+
+# Log Analytics tools that can be combined in GetLogAnalyticsBatch, with their query builders
+BATCH_QUERY_BUILDERS = {
+    "GetSqlBpAssessment": lambda server_name, timespan: build_sql_bp_assessment_query(timespan),
+    "GetWinBpAssessment": lambda server_name, timespan: build_win_bp_assessment_query(timespan),
+    "GetAnomalies": lambda server_name, timespan: build_anomalies_query(
+        timespan, bin_seconds=_anomaly_resolution(timespan)["bin_seconds"]),
+    "GetSwConfig": build_sw_config_query,
+    "GetSwChangesList": build_sw_changes_list_query,
+}
+
+# Batch tools that need a ServerName; several servers are queried in chunks, like the tools do on their own
+SERVER_BATCH_TOOLS = {"GetSwConfig", "GetSwChangesList"}
+
+
+@log_function_call
+def GetLogAnalyticsBatch(workspace_id: str, tools: list[str] = None, ServerName: str = None, timespan: str = None,
+                         bypass_cache: bool = False, output_format: str = RECORDS) -> str:
+    """Use this tool to run several Log Analytics tools against the same workspace in one round trip,
+    e.g. GetSwConfig, GetSwChangesList and GetWinBpAssessment for a server health check.
+    The assessment and software tools return the same rows as when called on their own; for several servers
+    the software tools run one query per chunk of servers and group the rows per computer. GetAnomalies scores
+    the whole window from one make-series query with the same bin size, instead of its stored metric rollups,
+    so repeated batches read the full window every time; call GetAnomalies on its own for the cheaper tail
+    queries.
+
+    Arguments:
+        workspace_id (str): The workspace ID for the Log Analytics query
+        tools (list, optional): Tool names to run (GetSqlBpAssessment, GetWinBpAssessment, GetAnomalies,
+            GetSwConfig, GetSwChangesList); defaults to every tool the other arguments allow
+        ServerName (str or list, optional): The server, a list or comma-separated string of servers, or a
+            prefix ending in '*'; required by GetSwConfig and GetSwChangesList
+        timespan (str, optional): The timespan for the query (e.g., "30d" for 30 days)
+        bypass_cache (bool, optional): Run the queries even if cached results exist
+        output_format (str, optional): "records" (default) or "columnar" for column names plus row arrays
+    Returns (str):
+        JSON object with the result of every tool under "results" and failed tools under "errors"
+    """
+    logger.info(f"GetLogAnalyticsBatch: Workspace ID: {workspace_id}, tools: {tools}")
+    sys.stderr.write("🔧 TOOL CALL: GetLogAnalyticsBatch\n")
+    sys.stderr.flush()
+
+    if not workspace_id:
+        logger.error("GetLogAnalyticsBatch: workspace_id is required")
+        return json.dumps({"error": "workspace_id is required"})
+
+    queries, grouped, error = _build_batch_queries(tools, ServerName, timespan)
+    if error:
+        return json.dumps({"error": error})
+
+    # Pass None for timespan since we've embedded it in the queries
+    response = log_analytics_batch_tool(queries, workspace_id, None, bypass_cache=bypass_cache,
+                                        output_format=output_format)
+    return _finish_batch_response(response, output_format, timespan, grouped)
+
+
+def _build_batch_queries(tools, ServerName, timespan):
+    """
+    Build the queries for GetLogAnalyticsBatch. A software tool asked for several servers runs one
+    query per chunk of servers, named "<tool>[<n>]".
+
+    Returns:
+        tuple: (queries by name, chunk query names of each tool to group per computer, error message)
+    """
+    # Set default timespan if not provided
+    if not timespan:
+        timespan = "30d"
+
+    tool_names = parse_id_list(tools)
+    if not tool_names:
+        tool_names = [name for name in BATCH_QUERY_BUILDERS if ServerName or name not in SERVER_BATCH_TOOLS]
+
+    unknown = [name for name in tool_names if name not in BATCH_QUERY_BUILDERS]
+    if unknown:
+        return None, None, f"Unsupported tools for batch execution: {', '.join(unknown)}"
+    if not ServerName and SERVER_BATCH_TOOLS.intersection(tool_names):
+        return None, None, "ServerName is required for GetSwConfig and GetSwChangesList"
+
+    queries = {}
+    grouped = {}
+    try:
+        for name in tool_names:
+            if name not in SERVER_BATCH_TOOLS:
+                queries[name] = BATCH_QUERY_BUILDERS[name](ServerName, timespan)
+                continue
+            chunk_queries, is_grouped = _server_query_chunks(BATCH_QUERY_BUILDERS[name], ServerName, timespan)
+            if not is_grouped:
+                queries[name] = chunk_queries[0]
+                continue
+            grouped[name] = [f"{name}[{index}]" for index in range(len(chunk_queries))]
+            queries.update(zip(grouped[name], chunk_queries))
+    except ValueError as e:
+        return None, None, str(e)
+    return queries, grouped, None
+
+
+def _batch_tool_name(name):
+    """The tool a batch query belongs to, for its cache key and TTL; chunk queries are named "<tool>[<n>]"."""
+    return name.partition("[")[0]
+
+
+def _finish_batch_response(response, output_format, timespan, grouped):
+    """
+    Group the chunk results of the multi-server tools per computer, and replace the metric series
+    the batch fetched for GetAnomalies with the anomalies scored from them.
+    """
+    if _is_error_response(response):
+        return response
+    envelope = json.loads(response)
+    results, errors = envelope["results"], envelope["errors"]
+    for name, chunk_names in grouped.items():
+        # One failed chunk fails the tool, as it does when the tool runs on its own
+        failed = [errors.pop(chunk) for chunk in chunk_names if chunk in errors]
+        chunks = [results.pop(chunk) for chunk in chunk_names if chunk in results]
+        if failed:
+            errors[name] = failed[0]
+        else:
+            results[name] = _group_tables_by_computer(chunks)
+
+    series = results.pop("GetAnomalies", None)
+    if series is None:
+        return serialize(envelope) if grouped else response
+
+    anomalies = _anomalies_response(read_series(series), output_format,
+                                    resolution=_anomaly_resolution(timespan or "30d"))
+    if _is_error_response(anomalies):
+        envelope["errors"]["GetAnomalies"] = json.loads(anomalies)["error"]
+    else:
+        envelope["results"]["GetAnomalies"] = json.loads(anomalies)
+    return serialize(envelope)
+
+
+# ----------------------------------------------------------
+# Async versions of the specialized tools, used by the async Azure Function triggers.
+# They share queries, cache keys and cached results with the sync tools.
+
+async def _resource_graph_inventory_async(tool_name, query, subscription_id, management_group_id, bypass_cache,
+                                          shaping=None):
+    """Run one of the Resource Graph inventory tools on the async path."""
+    logger.debug(f"{tool_name}: Subscription ID: {subscription_id}, Management group: {management_group_id}")
+    if not subscription_id and not management_group_id:
+        logger.error(f"{tool_name}: subscription_id or management_group_id is required")
+        return json.dumps({"error": "subscription_id or management_group_id is required"})
+    try:
+        query = shape_query(query, **(shaping or {}))
+    except ValueError as e:
+        logger.error(f"{tool_name}: {str(e)}")
+        return json.dumps({"error": str(e)})
+
+    response = await resource_graph_tool_async(
+        query, subscription_id, management_group_id=management_group_id,
+        tool_name=tool_name, bypass_cache=bypass_cache
+    )
+    if not response:
+        logger.error(f"{tool_name}: No response from Resource Graph Tool")
+        return json.dumps({"error": "No response from Resource Graph Tool"})
     return response
 
 
+async def _run_server_query_async(tool_name, builder, workspace_id, ServerName, timespan, bypass_cache,
+                                  output_format=RECORDS, shaping=None):
+    """Async version of _run_server_query; the chunk queries run concurrently."""
+    queries, grouped = _server_query_chunks(builder, ServerName, timespan or "30d", shaping)
+    responses = await asyncio.gather(*(
+        log_analytics_tool_async(query, workspace_id, None, tool_name=tool_name, bypass_cache=bypass_cache,
+                                 output_format=output_format)
+        for query in queries
+    ))
+    return _group_rows_by_computer(responses) if grouped else responses[0]
+
+
+@log_function_call
+async def GetPatchingLevelAsync(subscription_id: str = None, management_group_id: str = None,
+                                bypass_cache: bool = False, columns=None, row_filter=None, top: int = None,
+                                order_by=None, page_size: int = None, cursor: str = None) -> str:
+    """Async version of GetPatchingLevel."""
+    if cursor:
+        return await _next_page_async("GetPatchingLevel", cursor, page_size)
+    response = await _resource_graph_inventory_async(
+        "GetPatchingLevel", PATCHING_LEVEL_QUERY, subscription_id, management_group_id, bypass_cache,
+        dict(columns=columns, row_filter=row_filter, top=top, order_by=order_by)
+    )
+    return await _paginate_async("GetPatchingLevel", response, page_size)
+
+
+@log_function_call
+async def GetSqlMetadataAsync(subscription_id: str = None, management_group_id: str = None,
+                              bypass_cache: bool = False, columns=None, row_filter=None, top: int = None,
+                              order_by=None, page_size: int = None, cursor: str = None) -> str:
+    """Async version of GetSqlMetadata."""
+    if cursor:
+        return await _next_page_async("GetSqlMetadata", cursor, page_size)
+    response = await _resource_graph_inventory_async(
+        "GetSqlMetadata", SQL_METADATA_QUERY, subscription_id, management_group_id, bypass_cache,
+        dict(columns=columns, row_filter=row_filter, top=top, order_by=order_by)
+    )
+    return await _paginate_async("GetSqlMetadata", response, page_size)
+
+
+@log_function_call
+async def GetServerMetadataAsync(subscription_id: str = None, management_group_id: str = None,
+                                 bypass_cache: bool = False, columns=None, row_filter=None, top: int = None,
+                                 order_by=None, page_size: int = None, cursor: str = None) -> str:
+    """Async version of GetServerMetadata."""
+    if cursor:
+        return await _next_page_async("GetServerMetadata", cursor, page_size)
+    response = await _resource_graph_inventory_async(
+        "GetServerMetadata", SERVER_METADATA_QUERY, subscription_id, management_group_id, bypass_cache,
+        dict(columns=columns, row_filter=row_filter, top=top, order_by=order_by)
+    )
+    return await _paginate_async("GetServerMetadata", response, page_size)
+
+
+@log_function_call
+async def GetSqlBpAssessmentAsync(workspace_id: str, timespan: str = None, bypass_cache: bool = False,
+                                  output_format: str = RECORDS, columns=None, row_filter=None, top: int = None,
+                                  order_by=None, page_size: int = None, cursor: str = None) -> str:
+    """Async version of GetSqlBpAssessment."""
+    if cursor:
+        return await _next_page_async("GetSqlBpAssessment", cursor, page_size)
+    try:
+        query = shape_query(build_sql_bp_assessment_query(timespan or "30d"), columns, row_filter, top, order_by)
+    except ValueError as e:
+        logger.error(f"GetSqlBpAssessment: {str(e)}")
+        return json.dumps({"error": str(e)})
+    # Pass None for timespan since we've embedded it in the query
+    response = await log_analytics_tool_async(query, workspace_id, None, tool_name="GetSqlBpAssessment",
+                                              bypass_cache=bypass_cache, output_format=output_format)
+    return await _paginate_async("GetSqlBpAssessment", response, page_size)
+
+
+@log_function_call
+async def GetSwChangesListAsync(workspace_id: str, ServerName, timespan: str = None,
+                                bypass_cache: bool = False, output_format: str = RECORDS,
+                                columns=None, row_filter=None, top: int = None, order_by=None,
+                                page_size: int = None, cursor: str = None, delta: bool = False) -> str:
+    """Async version of GetSwChangesList."""
+    if cursor:
+        return await _next_page_async("GetSwChangesList", cursor, page_size)
+    try:
+        shaping = dict(columns=columns, row_filter=row_filter, top=top, order_by=order_by)
+        if delta:
+            response = await _run_server_query_delta_async("GetSwChangesList", workspace_id, ServerName, timespan,
+                                                           bypass_cache, output_format, shaping)
+        else:
+            response = await _run_server_query_async("GetSwChangesList", build_sw_changes_list_query, workspace_id,
+                                                     ServerName, timespan, bypass_cache, output_format, shaping)
+        return await _paginate_async("GetSwChangesList", response, page_size)
+    except Exception as e:
+        logger.error(f"Error in GetSwChangesList: {str(e)}")
+        return json.dumps({"error": str(e)})
+
+
+@log_function_call
+async def GetSwConfigAsync(workspace_id: str, ServerName, timespan: str = None,
+                           bypass_cache: bool = False, output_format: str = RECORDS,
+                           columns=None, row_filter=None, top: int = None, order_by=None,
+                           page_size: int = None, cursor: str = None, delta: bool = False) -> str:
+    """Async version of GetSwConfig."""
+    if cursor:
+        return await _next_page_async("GetSwConfig", cursor, page_size)
+    try:
+        shaping = dict(columns=columns, row_filter=row_filter, top=top, order_by=order_by)
+        if delta:
+            response = await _run_server_query_delta_async("GetSwConfig", workspace_id, ServerName, timespan,
+                                                           bypass_cache, output_format, shaping)
+        else:
+            response = await _run_server_query_async("GetSwConfig", build_sw_config_query, workspace_id, ServerName,
+                                                     timespan, bypass_cache, output_format, shaping)
+        return await _paginate_async("GetSwConfig", response, page_size)
+    except Exception as e:
+        logger.error(f"Error in GetSwConfig: {str(e)}")
+        return json.dumps({"error": str(e)})
+
+
+@log_function_call
+async def GetWinBpAssessmentAsync(workspace_id: str, timespan: str = None, bypass_cache: bool = False,
+                                  output_format: str = RECORDS, columns=None, row_filter=None, top: int = None,
+                                  order_by=None, page_size: int = None, cursor: str = None) -> str:
+    """Async version of GetWinBpAssessment."""
+    if cursor:
+        return await _next_page_async("GetWinBpAssessment", cursor, page_size)
+    try:
+        query = shape_query(build_win_bp_assessment_query(timespan or "30d"), columns, row_filter, top, order_by)
+    except ValueError as e:
+        logger.error(f"GetWinBpAssessment: {str(e)}")
+        return json.dumps({"error": str(e)})
+    response = await log_analytics_tool_async(query, workspace_id, None, tool_name="GetWinBpAssessment",
+                                              bypass_cache=bypass_cache, output_format=output_format)
+    return await _paginate_async("GetWinBpAssessment", response, page_size)
+
+
+@log_function_call
+async def GetAnomaliesAsync(workspace_id: str, timespan: str = None, bypass_cache: bool = False,
+                            output_format: str = RECORDS, columns=None, row_filter=None, top: int = None,
+                            order_by=None, page_size: int = None, cursor: str = None,
+                            metrics: list[str] = None, anomaly_threshold: float = None,
+                            include_expected: bool = True) -> str:
+    """Async version of GetAnomalies."""
+    if cursor:
+        return await _next_page_async("GetAnomalies", cursor, page_size)
+    timespan = timespan or "30d"
+    try:
+        plan = await asyncio.to_thread(_rollup_plan, workspace_id, timespan, bypass_cache, metrics)
+    except ValueError as e:
+        logger.error(f"GetAnomalies: {str(e)}")
+        return json.dumps({"error": str(e)})
+    fetched = await log_analytics_tool_async(plan["query"], workspace_id, timespan, tool_name="GetAnomalies",
+                                             bypass_cache=bypass_cache, output_format=COLUMNAR)
+    series = await asyncio.to_thread(_rollup_series, plan, fetched)
+    response = _anomalies_response(series, output_format,
+                                   dict(selected=columns, row_filter=row_filter, top=top, order_by=order_by), plan,
+                                   include_expected, anomaly_threshold)
+    return await _paginate_async("GetAnomalies", response, page_size)
+
+
+@log_function_call
+async def GetLogAnalyticsBatchAsync(workspace_id: str, tools: list[str] = None, ServerName: str = None,
+                                    timespan: str = None, bypass_cache: bool = False,
+                                    output_format: str = RECORDS) -> str:
+    """Async version of GetLogAnalyticsBatch."""
+    if not workspace_id:
+        logger.error("GetLogAnalyticsBatch: workspace_id is required")
+        return json.dumps({"error": "workspace_id is required"})
+
+    queries, grouped, error = _build_batch_queries(tools, ServerName, timespan)
+    if error:
+        return json.dumps({"error": error})
+    response = await log_analytics_batch_tool_async(queries, workspace_id, None, bypass_cache=bypass_cache,
+                                                    output_format=output_format)
+    return _finish_batch_response(response, output_format, timespan, grouped)
+
+
+# ----------------------------------------------------------
+# Concurrent tool execution. Composite requests (inventory + patches + anomalies)
+# run their tool calls side by side, so they take as long as the slowest call.
+
+# Tools that can be used in a job, with their sync and async implementations
+TOOL_FUNCTIONS = {
+    "resource_graph_tool": (resource_graph_tool, resource_graph_tool_async),
+    "log_analytics_tool": (log_analytics_tool, log_analytics_tool_async),
+    "log_analytics_batch_tool": (log_analytics_batch_tool, log_analytics_batch_tool_async),
+    "GetPatchingLevel": (GetPatchingLevel, GetPatchingLevelAsync),
+    "GetSqlMetadata": (GetSqlMetadata, GetSqlMetadataAsync),
+    "GetServerMetadata": (GetServerMetadata, GetServerMetadataAsync),
+    "GetSqlBpAssessment": (GetSqlBpAssessment, GetSqlBpAssessmentAsync),
+    "GetSwChangesList": (GetSwChangesList, GetSwChangesListAsync),
+    "GetSwConfig": (GetSwConfig, GetSwConfigAsync),
+    "GetWinBpAssessment": (GetWinBpAssessment, GetWinBpAssessmentAsync),
+    "GetAnomalies": (GetAnomalies, GetAnomaliesAsync),
+    "GetLogAnalyticsBatch": (GetLogAnalyticsBatch, GetLogAnalyticsBatchAsync),
+}
+
+
+def _resolve_jobs(jobs, use_async):
+    """
+    Turn (tool, args) jobs into (name, function, kwargs) tuples for the runner.
+
+    Unknown tools are replaced by a function returning an error so the other jobs still run.
+    """
+    resolved = []
+    for tool, args in jobs:
+        functions = TOOL_FUNCTIONS.get(tool)
+        if functions is None:
+            error = json.dumps({"error": f"Unknown tool: {tool}", "tool": tool})
+            if use_async:
+                async def function(error=error):
+                    return error
+            else:
+                def function(error=error):
+                    return error
+            resolved.append((tool, function, {}))
+        else:
+            resolved.append((tool, functions[1] if use_async else functions[0], dict(args or {})))
+    return resolved
+
+
+def run_tools(jobs, max_concurrency: int = None, timeout: float = None) -> list[str]:
+    """
+    Run several tool calls concurrently on a thread pool.
+
+    Args:
+        jobs (list): (tool name, kwargs) pairs, e.g. ("GetAnomalies", {"workspace_id": "..."})
+        max_concurrency (int, optional): Jobs running at once, defaults to MCP_TOOL_MAX_CONCURRENCY
+        timeout (float, optional): Seconds per job, defaults to MCP_TOOL_TIMEOUT_SECONDS
+
+    Returns:
+        list: One JSON string per job in input order; failures and timeouts are {"error": ..., "tool": ...}
+    """
+    logger.info(f"run_tools: running {len(jobs)} jobs")
+    return run_concurrently(
+        _resolve_jobs(jobs, use_async=False),
+        max_concurrency=max_concurrency or TOOL_MAX_CONCURRENCY,
+        timeout=timeout or TOOL_TIMEOUT_SECONDS,
+    )
+
+
+async def run_tools_async(jobs, max_concurrency: int = None, timeout: float = None) -> list[str]:
+    """Async version of run_tools; awaits the async tool twins and cancels jobs that time out."""
+    logger.info(f"run_tools_async: running {len(jobs)} jobs")
+    return await run_concurrently_async(
+        _resolve_jobs(jobs, use_async=True),
+        max_concurrency=max_concurrency or TOOL_MAX_CONCURRENCY,
+        timeout=timeout or TOOL_TIMEOUT_SECONDS,
+    )
+
+
+# ----------------------------------------------------------
+# Aggregate server health snapshot
+
+# Anomalies scored for the snapshot: as many as a top allows, instead of the fleet-wide ANOMALY_MAX_RESULTS
+# highest scores, so the servers being summarized are not crowded out by the noisiest ones
+HEALTH_SNAPSHOT_ANOMALY_TOP = MAX_TOP
+
+
+def _health_snapshot_jobs(subscription_id, workspace_id, management_group_id, timespan, bypass_cache):
+    """Jobs for the four tools joined by GetServerHealthSnapshot, in build_health_snapshot argument order."""
+    # page_size=0: the snapshot joins the full results
+    inventory = {"subscription_id": subscription_id, "management_group_id": management_group_id,
+                 "bypass_cache": bypass_cache, "page_size": 0}
+    workspace = {"workspace_id": workspace_id, "timespan": timespan, "bypass_cache": bypass_cache,
+                 "output_format": COLUMNAR, "page_size": 0}
+    return [
+        ("GetServerMetadata", inventory),
+        ("GetPatchingLevel", inventory),
+        ("GetAnomalies", dict(workspace, top=HEALTH_SNAPSHOT_ANOMALY_TOP)),
+        ("GetWinBpAssessment", workspace),
+    ]
+
+
+def _health_snapshot_response(responses, ServerName):
+    snapshot = build_health_snapshot(*responses, server_names=parse_id_list(ServerName),
+                                     anomaly_limit=HEALTH_SNAPSHOT_ANOMALY_TOP)
+    logger.info(f"GetServerHealthSnapshot: {snapshot['server_count']} servers, "
+                f"{len(snapshot['errors'])} failed sources")
+    return serialize(snapshot)
+
+
+@log_function_call
+def GetServerHealthSnapshot(workspace_id: str, subscription_id: str = None, management_group_id: str = None,
+                            ServerName: str = None, timespan: str = None, bypass_cache: bool = False) -> str:
+    """
+    Retrieve a health snapshot of every server in one call: inventory, missing patches, metric anomalies and
+    Windows best practice issues, joined on the server name. Runs GetServerMetadata, GetPatchingLevel,
+    GetAnomalies and GetWinBpAssessment concurrently and returns one compact document per server.
+
+    Arguments:
+        workspace_id (str): The workspace ID for the Log Analytics queries
+        subscription_id (str, optional): Subscription(s) for the Resource Graph queries
+        management_group_id (str, optional): Management group to query instead of subscriptions
+        ServerName (str, optional): Servers to keep, as a comma-separated list or prefixes ending in *
+        timespan (str, optional): The timespan for the Log Analytics queries (e.g., "30d" for 30 days)
+        bypass_cache (bool, optional): Run the queries even if cached results exist
+    Returns (str):
+        JSON with "servers" (name, inventory columns and patches / anomalies / best_practices summaries),
+        "server_count", "errors" for any source that failed, and "anomalies_truncated" when more than
+        "anomaly_limit" anomalies were found and only the highest scores were summarized
+    """
+    logger.info(f"GetServerHealthSnapshot: Workspace ID: {workspace_id}, Subscription ID: {subscription_id}")
+    if not workspace_id:
+        return json.dumps({"error": "workspace_id is required"})
+    if not subscription_id and not management_group_id:
+        return json.dumps({"error": "subscription_id or management_group_id is required"})
+
+    jobs = _health_snapshot_jobs(subscription_id, workspace_id, management_group_id, timespan, bypass_cache)
+    return _health_snapshot_response(run_tools(jobs), ServerName)
+
+
+@log_function_call
+async def GetServerHealthSnapshotAsync(workspace_id: str, subscription_id: str = None,
+                                       management_group_id: str = None, ServerName: str = None,
+                                       timespan: str = None, bypass_cache: bool = False) -> str:
+    """Async version of GetServerHealthSnapshot."""
+    logger.info(f"GetServerHealthSnapshot: Workspace ID: {workspace_id}, Subscription ID: {subscription_id}")
+    if not workspace_id:
+        return json.dumps({"error": "workspace_id is required"})
+    if not subscription_id and not management_group_id:
+        return json.dumps({"error": "subscription_id or management_group_id is required"})
+
+    jobs = _health_snapshot_jobs(subscription_id, workspace_id, management_group_id, timespan, bypass_cache)
+    return _health_snapshot_response(await run_tools_async(jobs), ServerName)
+
+
 # ----------------------------------------------------------
 # Tool Registration Function
 
@@ -598,6 +2448,7 @@ def register_tools_with_mcp(mcp_instance):
     # Register the basic tools
     mcp_instance.tool()(resource_graph_tool)
     mcp_instance.tool()(log_analytics_tool)
+    mcp_instance.tool()(log_analytics_batch_tool)
 
     # Register the specialized tools
     mcp_instance.tool()(GetPatchingLevel)
@@ -608,6 +2459,8 @@ def register_tools_with_mcp(mcp_instance):
     mcp_instance.tool()(GetSwConfig)
     mcp_instance.tool()(GetWinBpAssessment)
     mcp_instance.tool()(GetAnomalies)
+    mcp_instance.tool()(GetLogAnalyticsBatch)
+    mcp_instance.tool()(GetServerHealthSnapshot)
 
     logger.info("All MCP tools registered successfully")
 
@@ -620,6 +2473,7 @@ if __name__ == "__main__":
     print("Available tools:")
     print("- resource_graph_tool")
     print("- log_analytics_tool")
+    print("- log_analytics_batch_tool")
     print("- GetPatchingLevel")
     print("- GetSqlMetadata")
     print("- GetServerMetadata")
@@ -628,3 +2482,5 @@ if __name__ == "__main__":
     print("- GetSwConfig")
     print("- GetWinBpAssessment")
     print("- GetAnomalies")
+    print("- GetLogAnalyticsBatch")
+    print("- GetServerHealthSnapshot")
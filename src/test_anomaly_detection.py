@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for scoring metric series locally in GetAnomalies.
+"""
+
+import importlib.util
+import json
+import math
+import os
+import sys
+
+# Add the src directory to the path so we can import our utilities
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.anomaly_detection import ANOMALY_COLUMNS, detect_anomalies, read_series
+
+# numpy is a runtime dependency of GetAnomalies, loaded lazily; the scoring tests need it installed
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+HOURS = [f"2025-08-{1 + hour // 24:02d}T{hour % 24:02d}:00:00Z" for hour in range(24 * 7)]
+
+
+def daily_cpu(spike_hour=None, spike=0.0):
+    """A week of hourly CPU usage, busy during office hours, with an optional spike."""
+    values = [60.0 + math.sin(hour) if 9 <= hour % 24 < 18 else 10.0 + math.cos(hour) for hour in range(len(HOURS))]
+    if spike_hour is not None:
+        values[spike_hour] += spike
+    return values
+
+
+def test_read_series_layouts():
+    """Series are read from columnar tables, records tables and dynamic arrays sent as JSON text."""
+    columnar = json.dumps([{"name": "PrimaryResult", "columns": ["Computer", "Namespace", "TimeGenerated", "AvgValue"],
+                            "rows": [["web-01", "Processor", HOURS[:2], [1.0, None]]]}])
+    records = json.dumps([[{"Computer": "web-01", "Namespace": "Processor", "TimeGenerated": json.dumps(HOURS[:2]),
+                            "AvgValue": "[1.0, null]"}]])
+    expected = [("web-01", "Processor", HOURS[:2], [1.0, None])]
+    assert read_series(columnar) == expected
+    assert read_series(records) == expected
+    print("✓ Metric series read from every layout")
+
+
+def test_seasonal_baseline():
+    """Busy office hours are expected; the same usage at night is an anomaly."""
+    if not HAS_NUMPY:
+        print("- numpy not installed, skipped")
+        return
+    night = 24 * 5 + 3
+    series = [
+        ("web-01", "Processor", HOURS, daily_cpu(night, 50.0)),
+        ("web-02", "Processor", HOURS, daily_cpu()),
+        ("web-03", "Processor", HOURS, [None] * len(HOURS)),
+    ]
+    columns, rows = detect_anomalies(series)
+    assert columns == ANOMALY_COLUMNS
+    assert len(rows) == 1
+    time, computer, namespace, actual, expected, score = rows[0]
+    assert (time, computer, namespace) == (HOURS[night], "web-01", "Processor")
+    assert actual > 55 and expected < 15 and score > 3.5
+    print("✓ Night-time spike scored against the hour-of-day baseline")
+
+
+def test_ranking_and_columns():
+    """Anomalies are ranked by score, limited, and ExpectedUsage can be left out."""
+    if not HAS_NUMPY:
+        print("- numpy not installed, skipped")
+        return
+    series = [(f"srv-{index}", "LogicalDisk", HOURS, daily_cpu(30 + index, 20.0 + 10 * index)) for index in range(5)]
+    columns, rows = detect_anomalies(series, max_results=3, include_expected=False)
+    assert "ExpectedUsage" not in columns and len(rows[0]) == len(columns)
+    assert [row[1] for row in rows] == ["srv-4", "srv-3", "srv-2"]
+    print("✓ Anomalies ranked by score")
+
+
+def test_tool_threshold_and_expected():
+    """GetAnomalies passes its anomaly_threshold and include_expected arguments to the scoring."""
+    if not HAS_NUMPY:
+        print("- numpy not installed, skipped")
+        return
+    import mcp_tools
+
+    series = [(f"srv-{index}", "LogicalDisk", HOURS, daily_cpu(30 + index, 20.0 + 10 * index)) for index in range(5)]
+    default = json.loads(mcp_tools._anomalies_response(series))[0]
+    strict = json.loads(mcp_tools._anomalies_response(series, include_expected=False, threshold=50.0))[0]
+    assert len(strict) < len(default) and all(row["AnomalyScore"] >= 50.0 for row in strict)
+    assert "ExpectedUsage" in default[0] and "ExpectedUsage" not in strict[0]
+    assert json.loads(mcp_tools._anomalies_response(series, threshold=0)) == {
+        "error": "anomaly_threshold must be greater than 0"}
+    print("✓ Tool threshold and ExpectedUsage column applied")
+
+
+def test_drops_and_coarse_bins():
+    """Metrics where a drop is the anomaly are scored downwards; daily points use a flat baseline."""
+    if not HAS_NUMPY:
+        print("- numpy not installed, skipped")
+        return
+    memory = [4000.0 + (index % 3) for index in range(30)]
+    memory[20] = 500.0
+    days = [f"2025-08-{day:02d}T00:00:00Z" for day in range(1, 31)]
+    columns, rows = detect_anomalies([("db-01", "Memory", days, memory)], period=1, low_is_bad={"Memory"})
+    assert [(row[0], row[3]) for row in rows] == [(days[20], 500.0)]
+    assert detect_anomalies([("db-01", "Memory", days, memory)], period=1)[1] == []
+    print("✓ Drops scored for low-is-bad metrics")
+
+
+if __name__ == "__main__":
+    print("Testing anomaly detection...")
+    print("=" * 60)
+    test_read_series_layouts()
+    test_seasonal_baseline()
+    test_ranking_and_columns()
+    test_tool_threshold_and_expected()
+    test_drops_and_coarse_bins()
+    print("=" * 60)
+    print("All anomaly detection tests completed!")
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Tests for the asyncio tool path: the async client registry, the .aio Resource Graph and
+Log Analytics tools, and the async MCP tools with their cache and single-flight.
+Uses fake async SDK clients, so no subscription, workspace or credentials are needed.
+"""
+
+import asyncio
+import json
+import os
+import sys
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+# Add the src directory to the path so we can import our utilities
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from test_log_analytics_batch import HAS_MONITOR_QUERY, FakeLogsClient, fake_table
+from utils.client_registry import LOGS_CLIENT, RESOURCE_GRAPH_CLIENT, AsyncClientRegistry
+from utils.log_analytics_tool import AsyncLogAnalyticsTool
+from utils.resource_graph_tool import AsyncResourceGraphTool
+from utils.result_cache import ResultCache
+
+
+class FakeAsyncClient:
+    def __init__(self, credential, endpoint):
+        self.credential = credential
+        self.endpoint = endpoint
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeAsyncGraphClient:
+    """Async ResourceGraphClient serving pages of `page_rows` rows out of `total`, keyed by skip token."""
+
+    def __init__(self, total, page_rows, delay=0.0):
+        self.total = total
+        self.page_rows = page_rows
+        self.delay = delay
+        self.requests = []
+
+    async def resources(self, request):
+        skip_token = request.options.skip_token
+        self.requests.append(skip_token)
+        await asyncio.sleep(self.delay)
+        start = int(skip_token or 0)
+        end = min(start + self.page_rows, self.total)
+        return SimpleNamespace(data=[{"id": index} for index in range(start, end)], count=end - start,
+                               total_records=self.total, skip_token=str(end) if end < self.total else None)
+
+
+class FakeAsyncLogsClient(FakeLogsClient):
+    """Async LogsQueryClient; query_batch behaves as FakeLogsClient, query_workspace returns one row."""
+
+    def __init__(self, fail_requests=0, delay=0.0):
+        super().__init__(fail_requests)
+        self.delay = delay
+        self.queries = []
+
+    async def query_batch(self, requests):
+        await asyncio.sleep(self.delay)
+        return super().query_batch(requests)
+
+    async def query_workspace(self, workspace_id, query, timespan=None):
+        self.queries.append(query)
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(tables=[fake_table([["web-01", len(self.queries)]])])
+
+    async def close(self):
+        pass
+
+
+@contextmanager
+def fake_async_clients(graph_client=None, logs_client=None):
+    """Point the async MCP tools at fake clients and an empty result cache."""
+    import mcp_tools
+
+    registry = AsyncClientRegistry()
+    registry.register_factory(RESOURCE_GRAPH_CLIENT, lambda cred, endpoint, reg: graph_client)
+    registry.register_factory(LOGS_CLIENT, lambda cred, endpoint, reg: logs_client)
+    saved = mcp_tools._async_client_registry, mcp_tools._async_credential, mcp_tools._result_cache
+    mcp_tools._async_client_registry, mcp_tools._async_credential = registry, object()
+    mcp_tools._result_cache = ResultCache()
+    try:
+        yield mcp_tools
+    finally:
+        mcp_tools._async_client_registry, mcp_tools._async_credential, mcp_tools._result_cache = saved
+
+
+def test_async_registry_shares_session_and_closes():
+    """Transports share one aiohttp session; rebuild() and close() close the clients and the session."""
+    async def main():
+        registry = AsyncClientRegistry()
+        registry.register_factory(LOGS_CLIENT, lambda cred, endpoint, reg: FakeAsyncClient(cred, endpoint))
+        credential = object()
+
+        first = registry.logs_client(credential)
+        assert registry.logs_client(credential) is first
+        assert first.endpoint == "https://api.loganalytics.io/v1"
+
+        session = registry.create_transport().session
+        assert registry.create_transport().session is session
+
+        new = await registry.rebuild(LOGS_CLIENT, credential)
+        assert first.closed and new is not first and registry.logs_client(credential) is new
+
+        await registry.close()
+        assert new.closed and session.closed and len(registry) == 0
+
+    asyncio.run(main())
+    print("✓ Async clients share one session and are closed on request")
+
+
+def test_async_iter_pages_follows_skip_tokens():
+    """The async tool follows skip tokens through the client and drops the token of a trimmed page."""
+    async def collect(client, **kwargs):
+        tool = AsyncResourceGraphTool(credential=object(), client=client)
+        return [page async for page in tool.iter_pages("resources", ["sub"], **kwargs)]
+
+    client = FakeAsyncGraphClient(total=25, page_rows=10)
+    pages = asyncio.run(collect(client))
+    assert [row["id"] for page in pages for row in page["data"]] == list(range(25))
+    assert [page["skip_token"] for page in pages] == [None, None, None]
+    assert client.requests == [None, "10", "20"]
+
+    client = FakeAsyncGraphClient(total=50, page_rows=10)
+    pages = asyncio.run(collect(client, max_rows=15))
+    assert [page["count"] for page in pages] == [10, 5] and pages[-1]["skip_token"] is None
+    assert client.requests == [None, "10"]
+    print("✓ Async pages followed over skip tokens")
+
+
+def test_async_run_batch_maps_each_status():
+    """The async batch maps a success, a partial result and a failure, and a failed request per query."""
+    if not HAS_MONITOR_QUERY:
+        print("- azure-monitor-query not installed, skipped")
+        return
+    tool = AsyncLogAnalyticsTool(credential=object(), client=FakeAsyncLogsClient(), output_format="records")
+    results = asyncio.run(tool.run_batch({"ok": "Ok", "partial": "partial", "failed": "fail"}, "ws", "1d"))
+    assert json.loads(results["ok"]) == [[{"Computer": "web-01", "Value": 2}]]
+    assert results["partial"]["partial_error"] == "Result truncated"
+    assert results["failed"] == {"error": "Query timed out"}
+
+    tool = AsyncLogAnalyticsTool(credential=object(), client=FakeAsyncLogsClient(fail_requests=1))
+    results = asyncio.run(tool.run_batch({"ok": "Ok"}, "ws", "1d"))
+    assert results == {"ok": {"error": "Service unavailable"}}
+    print("✓ Async batch statuses mapped")
+
+
+def test_async_resource_graph_tool_cache_and_single_flight():
+    """Concurrent identical calls share one query; the next call is served from the cache."""
+    client = FakeAsyncGraphClient(total=3, page_rows=10, delay=0.05)
+    with fake_async_clients(graph_client=client) as mcp_tools:
+        coalesced = mcp_tools._async_single_flight.coalesced
+
+        async def main():
+            responses = await asyncio.gather(*(mcp_tools.GetServerMetadataAsync(subscription_id="sub")
+                                               for _ in range(3)))
+            return responses, await mcp_tools.GetServerMetadataAsync(subscription_id="sub")
+
+        responses, cached = asyncio.run(main())
+        assert len(set(responses)) == 1 and cached == responses[0]
+        assert json.loads(cached)["count"] == 3
+        assert client.requests == [None]
+        assert mcp_tools._async_single_flight.coalesced == coalesced + 2
+    print("✓ Async Resource Graph tool coalesced and cached")
+
+
+def test_async_log_analytics_tool_cache_and_single_flight():
+    """Concurrent identical calls share one query, cache hits skip it and bypass_cache runs it again."""
+    if not HAS_MONITOR_QUERY:
+        print("- azure-monitor-query not installed, skipped")
+        return
+    client = FakeAsyncLogsClient(delay=0.05)
+    with fake_async_clients(logs_client=client) as mcp_tools:
+        async def main():
+            responses = await asyncio.gather(*(mcp_tools.GetSqlBpAssessmentAsync("ws") for _ in range(3)))
+            cached = await mcp_tools.GetSqlBpAssessmentAsync("ws")
+            bypassed = await mcp_tools.GetSqlBpAssessmentAsync("ws", bypass_cache=True)
+            return responses, cached, bypassed
+
+        responses, cached, bypassed = asyncio.run(main())
+        assert len(set(responses)) == 1 and cached == responses[0]
+        assert json.loads(cached) == [[{"Computer": "web-01", "Value": 1}]]
+        assert json.loads(bypassed) == [[{"Computer": "web-01", "Value": 2}]]
+        assert len(client.queries) == 2
+        # The bypassed call refreshed the cache for the next caller
+        assert asyncio.run(mcp_tools.GetSqlBpAssessmentAsync("ws")) == bypassed
+    print("✓ Async Log Analytics tool coalesced and cached")
+
+
+if __name__ == "__main__":
+    print("Testing the async tool path...")
+    print("=" * 60)
+    test_async_registry_shares_session_and_closes()
+    test_async_iter_pages_follows_skip_tokens()
+    test_async_run_batch_maps_each_status()
+    test_async_resource_graph_tool_cache_and_single_flight()
+    test_async_log_analytics_tool_cache_and_single_flight()
+    print("=" * 60)
+    print("All async tool tests completed!")
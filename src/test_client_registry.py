@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared SDK client registry.
+Uses fake client factories so the Azure SDK is not required.
+"""
+
+import os
+import sys
+
+# Add the src directory to the path so we can import our utilities
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.client_registry import LOGS_CLIENT, RESOURCE_GRAPH_CLIENT, ClientRegistry
+
+
+class FakeClient:
+    def __init__(self, credential, endpoint):
+        self.credential = credential
+        self.endpoint = endpoint
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def make_registry():
+    registry = ClientRegistry()
+    registry.register_factory(LOGS_CLIENT, lambda cred, endpoint, reg: FakeClient(cred, endpoint))
+    registry.register_factory(RESOURCE_GRAPH_CLIENT, lambda cred, endpoint, reg: FakeClient(cred, endpoint))
+    return registry
+
+
+def test_one_client_per_credential_and_endpoint():
+    """The same credential and endpoint always get the same client."""
+    registry = make_registry()
+    credential, other_credential = object(), object()
+
+    first = registry.logs_client(credential)
+    assert registry.logs_client(credential) is first
+    assert registry.logs_client(other_credential) is not first
+    assert registry.logs_client(credential, "https://api.loganalytics.azure.cn/v1") is not first
+    assert registry.resource_graph_client(credential) is not first
+    assert first.endpoint == "https://api.loganalytics.io/v1"
+    assert len(registry) == 4
+    print("✓ One client per (kind, credential, endpoint)")
+
+
+def test_rebuild_and_close():
+    """rebuild() replaces a single client, close() releases all of them."""
+    registry = make_registry()
+    credential = object()
+
+    old = registry.resource_graph_client(credential)
+    new = registry.rebuild(RESOURCE_GRAPH_CLIENT, credential)
+    assert old.closed and new is not old
+    assert registry.resource_graph_client(credential) is new
+
+    registry.close()
+    assert new.closed
+    assert len(registry) == 0
+    print("✓ Clients rebuilt and closed on request")
+
+
+if __name__ == "__main__":
+    print("Testing ClientRegistry...")
+    print("=" * 60)
+    test_one_client_per_credential_and_endpoint()
+    test_rebuild_and_close()
+    print("=" * 60)
+    print("All client registry tests completed!")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for running tool calls concurrently with a concurrency limit and per-job timeouts.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+# Add the src directory to the path so we can import our utilities
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.concurrent_runner import run_concurrently, run_concurrently_async
+
+
+def slow_tool(value, delay=0.0):
+    time.sleep(delay)
+    return json.dumps({"value": value})
+
+
+async def slow_tool_async(value, delay=0.0):
+    await asyncio.sleep(delay)
+    return json.dumps({"value": value})
+
+
+def failing_tool():
+    raise RuntimeError("boom")
+
+
+def test_results_in_input_order():
+    """Jobs overlap, so the batch takes about as long as the slowest job, and results keep input order."""
+    jobs = [("slow", slow_tool, {"value": 1, "delay": 0.3}), ("fast", slow_tool, {"value": 2, "delay": 0.1}),
+            ("fail", failing_tool, {})]
+    start = time.monotonic()
+    results = run_concurrently(jobs, max_concurrency=3, timeout=5)
+    elapsed = time.monotonic() - start
+    assert [json.loads(r).get("value") for r in results[:2]] == [1, 2]
+    assert json.loads(results[2]) == {"error": "fail failed: boom", "tool": "fail"}
+    assert elapsed < 0.39, elapsed
+    print("✓ Jobs run concurrently and return in input order")
+
+
+def test_concurrency_limit_and_timeout():
+    """No more than max_concurrency jobs run at once and a job over its timeout is reported."""
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def counted(value):
+        with lock:
+            running.append(value)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(value)
+        return json.dumps({"value": value})
+
+    results = run_concurrently([("counted", counted, {"value": i}) for i in range(6)], max_concurrency=2, timeout=5)
+    assert [json.loads(r)["value"] for r in results] == list(range(6))
+    assert max(peak) <= 2
+
+    results = run_concurrently([("stuck", slow_tool, {"value": 1, "delay": 1}),
+                                ("ok", slow_tool, {"value": 2})], timeout=0.1)
+    assert json.loads(results[0])["error"] == "stuck timed out after 0.1s"
+    assert json.loads(results[1]) == {"value": 2}
+    print("✓ Concurrency limit and timeouts enforced")
+
+
+def test_async_runner():
+    """The async runner keeps order and cancels jobs that time out."""
+    jobs = [("slow", slow_tool_async, {"value": 1, "delay": 0.2}), ("fast", slow_tool_async, {"value": 2}),
+            ("stuck", slow_tool_async, {"value": 3, "delay": 5})]
+    start = time.monotonic()
+    results = asyncio.run(run_concurrently_async(jobs, max_concurrency=3, timeout=0.3))
+    elapsed = time.monotonic() - start
+    assert [json.loads(r).get("value") for r in results[:2]] == [1, 2]
+    assert json.loads(results[2])["error"] == "stuck timed out after 0.3s"
+    assert elapsed < 1, elapsed
+    print("✓ Async jobs run concurrently and time out")
+
+
+if __name__ == "__main__":
+    print("Testing concurrent runner...")
+    print("=" * 60)
+    test_results_in_input_order()
+    test_concurrency_limit_and_timeout()
+    test_async_runner()
+    print("=" * 60)
+    print("All concurrent runner tests completed!")
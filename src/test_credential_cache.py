@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Tests for the process-wide CachedTokenCredential.
+Uses fake credentials so no Azure login is required.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from collections import namedtuple
+
+# Add the src directory to the path so we can import our utilities
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.credential_cache import AsyncCachedTokenCredential, CachedTokenCredential
+
+FakeToken = namedtuple("FakeToken", ["token", "expires_on"])
+
+
+class FakeCredential:
+    """Credential that counts calls and optionally fails."""
+
+    def __init__(self, name, fail=False, lifetime=3600):
+        self.name = name
+        self.fail = fail
+        self.lifetime = lifetime
+        self.calls = 0
+
+    def get_token(self, *scopes, claims=None, tenant_id=None, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError(f"{self.name} unavailable")
+        return FakeToken(f"{self.name}-{self.calls}", int(time.time()) + self.lifetime)
+
+
+def test_tokens_are_cached_per_scope_and_tenant():
+    """Repeated calls for the same scope and tenant reuse the cached token."""
+    cli = FakeCredential("cli")
+    credential = CachedTokenCredential([cli])
+
+    first = credential.get_token("https://management.azure.com/.default")
+    second = credential.get_token("https://management.azure.com/.default")
+    other_tenant = credential.get_token("https://management.azure.com/.default", tenant_id="t2")
+
+    assert first is second
+    assert other_tenant is not first
+    assert cli.calls == 2
+    print("✓ Tokens cached per scope and tenant")
+
+
+def test_remembers_working_link():
+    """Failing links are skipped once a later link has succeeded."""
+    cli = FakeCredential("cli", fail=True)
+    msi = FakeCredential("msi")
+    credential = CachedTokenCredential([cli, msi])
+
+    credential.get_token("https://api.loganalytics.io/.default")
+    credential.get_token("https://management.azure.com/.default")
+
+    assert credential.active_credential is msi
+    assert cli.calls == 1
+    assert msi.calls == 2
+    print("✓ Working chain link is tried first")
+
+
+def test_refreshes_before_expiry():
+    """Tokens inside the refresh margin are renewed proactively."""
+    cli = FakeCredential("cli", lifetime=60)
+    credential = CachedTokenCredential([cli], refresh_margin=300)
+
+    first = credential.get_token("scope")
+    second = credential.get_token("scope")
+
+    assert first is not second
+    assert cli.calls == 2
+    print("✓ Tokens refreshed before expiry")
+
+
+def test_serves_valid_token_when_refresh_fails():
+    """A still-valid token is returned if the proactive refresh fails."""
+    cli = FakeCredential("cli", lifetime=60)
+    credential = CachedTokenCredential([cli], refresh_margin=300)
+
+    first = credential.get_token("scope")
+    cli.fail = True
+
+    assert credential.get_token("scope") is first
+    print("✓ Cached token served when refresh fails")
+
+
+class FakeAsyncCredential(FakeCredential):
+    """Async credential that counts calls and optionally fails."""
+
+    async def get_token(self, *scopes, claims=None, tenant_id=None, **kwargs):
+        await asyncio.sleep(0)
+        return FakeCredential.get_token(self, *scopes, claims=claims, tenant_id=tenant_id, **kwargs)
+
+
+def test_async_credential_caches_and_falls_back():
+    """The async credential caches tokens and skips failing links like the sync one."""
+    cli = FakeAsyncCredential("cli", fail=True)
+    msi = FakeAsyncCredential("msi")
+    credential = AsyncCachedTokenCredential([cli, msi])
+
+    async def run():
+        # Concurrent callers share a single token request
+        return await asyncio.gather(*(credential.get_token("scope") for _ in range(5)))
+
+    tokens = asyncio.run(run())
+
+    assert all(token is tokens[0] for token in tokens)
+    assert credential.active_credential is msi
+    assert cli.calls == 1
+    assert msi.calls == 1
+    print("✓ Async credential caches tokens across concurrent calls")
+
+
+if __name__ == "__main__":
+    print("Testing CachedTokenCredential...")
+    print("=" * 60)
+    test_tokens_are_cached_per_scope_and_tenant()
+    test_remembers_working_link()
+    test_refreshes_before_expiry()
+    test_serves_valid_token_when_refresh_fails()
+    test_async_credential_caches_and_falls_back()
+    print("=" * 60)
+    print("All credential cache tests completed!")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for merging incremental (delta) query results into a cached baseline.
+"""
+
+import datetime
+import os
+import sys
+
+# Add the src directory to the path so we can import our utilities
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.delta_cache import delta_since, high_water_mark, merge_rows, parse_timespan
+
+NOW = datetime.datetime(2026, 3, 10, 12, 0, tzinfo=datetime.UTC)
+CHANGE_COLUMNS = ["TimeGenerated", "Computer", "SoftwareName"]
+CONFIG_COLUMNS = ["SoftwareName", "Publisher", "Computer", "TimeGenerated", "SoftwareType", "CurrentVersion"]
+CONFIG_KEY = ["SoftwareName", "Publisher", "Computer", "SoftwareType", "CurrentVersion"]
+
+
+def test_high_water_mark_and_since():
+    """The next delta query starts one overlap before the latest TimeGenerated."""
+    rows = [["2026-03-09T08:00:00Z", "a", "x"], ["2026-03-10T09:30:00.500000Z", "a", "y"], [None, "a", "z"]]
+    high_water = high_water_mark(CHANGE_COLUMNS, rows)
+    assert high_water == "2026-03-10T09:30:00.500000+00:00"
+    assert delta_since(high_water) == "2026-03-10T09:15:00.500000Z"
+    assert high_water_mark(CHANGE_COLUMNS, []) is None
+    assert parse_timespan("30d") == datetime.timedelta(days=30)
+    assert parse_timespan("P30D") is None
+    print("✓ High-water mark and delta bound computed")
+
+
+def test_merge_changes():
+    """Overlapping rows are not duplicated, new rows come first and rows outside the window are dropped."""
+    baseline = [["2026-03-10T09:00:00Z", "a", "x"], ["2026-02-01T00:00:00Z", "a", "old"]]
+    new_rows = [["2026-03-10T11:00:00Z", "a", "y"], ["2026-03-10T09:00:00Z", "a", "x"]]
+    rows = merge_rows(CHANGE_COLUMNS, baseline, new_rows, timespan="30d", now=NOW)
+    assert [row[2] for row in rows] == ["y", "x"]
+
+    limited = merge_rows(CHANGE_COLUMNS, rows, [["2026-03-10T11:30:00Z", "b", "z"]], max_rows=1,
+                         per_computer=True, now=NOW)
+    assert [row[1:] for row in limited] == [["b", "z"], ["a", "y"]]
+    print("✓ Software changes merged")
+
+
+def test_merge_config_replaces_by_key():
+    """A newer inventory record replaces the baseline row with the same software key."""
+    baseline = [
+        ["Git", "Git", "a", "2026-03-01T00:00:00Z", "Application", "2.40"],
+        ["Zip", "7-Zip", "a", "2026-03-01T00:00:00Z", "Application", "23.01"],
+    ]
+    new_rows = [["Git", "Git", "a", "2026-03-10T10:00:00Z", "Application", "2.40"]]
+    rows = merge_rows(CONFIG_COLUMNS, baseline, new_rows, key_columns=CONFIG_KEY, timespan="30d",
+                      order_by="SoftwareName", descending=False, now=NOW)
+    assert len(rows) == 2
+    assert rows[0][0] == "Git" and rows[0][3] == "2026-03-10T10:00:00Z"
+    assert rows[1][0] == "Zip"
+    print("✓ Software inventory merged by key")
+
+
+if __name__ == "__main__":
+    print("Testing delta cache...")
+    print("=" * 60)
+    test_high_water_mark_and_since()
+    test_merge_changes()
+    test_merge_config_replaces_by_key()
+    print("=" * 60)
+    print("All delta cache tests completed!")
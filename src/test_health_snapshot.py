@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Tests for joining the inventory, patching, anomaly and best practice results per server.
+"""
+
+import json
+import os
+import sys
+
+# Add the src directory to the path so we can import our utilities
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.health_snapshot import build_health_snapshot
+from utils.server_filter import matches_server
+
+METADATA = json.dumps({"data": [
+    {"name": "web-01", "type": "microsoft.hybridcompute/machines", "location": "westeurope", "coreCount": 4},
+    {"name": "db-01", "type": "microsoft.hybridcompute/machines", "location": "westeurope", "coreCount": 8},
+], "count": 2, "total_records": 2, "skip_token": None})
+
+PATCHING = json.dumps({"data": [
+    {"ServerName": "web-01", "MissedPatch": {"kbId": "5040430", "msrcSeverity": "Critical",
+                                             "classifications": ["Security"], "rebootBehavior": "CanRequestReboot"}},
+    {"ServerName": "web-01", "MissedPatch": {"kbId": "5039217", "msrcSeverity": "Important",
+                                             "classifications": ["Updates"], "rebootBehavior": "NeverReboots"}},
+], "count": 2, "total_records": 2, "skip_token": None})
+
+# Columnar Log Analytics output, with the FQDN Log Analytics usually reports
+ANOMALIES = json.dumps([{"name": "PrimaryResult",
+                         "columns": ["TimeGenerated", "Computer", "Namespace", "ActualUsage", "ExpectedUsage",
+                                     "AnomalyScore"],
+                         "rows": [["2025-08-04T12:00:00Z", "web-01.contoso.com", "Processor", 91.5, 20.0, 9.1],
+                                  ["2025-08-04T13:00:00Z", "web-01.contoso.com", "Processor", 95.0, 22.5, 12.4]]}])
+
+WIN_BP = json.dumps([[
+    {"Computer": "db-01.contoso.com", "Recommendation": "Enable SMB signing", "ActionArea": "Security", "Weight": 3.2},
+    {"Computer": "db-01.contoso.com", "Recommendation": "Set page file", "ActionArea": "Performance", "Weight": 1.1},
+]])
+
+
+def test_join_per_server():
+    """Every source is summarized under the server it belongs to, matching FQDNs to Arc names."""
+    snapshot = build_health_snapshot(METADATA, PATCHING, ANOMALIES, WIN_BP)
+    servers = {server["name"]: server for server in snapshot["servers"]}
+    assert snapshot["server_count"] == 2 and snapshot["errors"] == {}
+
+    web = servers["web-01"]
+    assert web["coreCount"] == 4
+    assert web["patches"] == {"missing": 2, "critical": 1, "security": 1, "reboot_required": 1,
+                              "kb_ids": ["5039217", "5040430"]}
+    assert web["anomalies"]["count"] == 2
+    assert web["anomalies"]["peak"] == {"namespace": "Processor", "value": 95.0, "expected": 22.5, "score": 12.4,
+                                        "time": "2025-08-04T13:00:00Z"}
+    assert "best_practices" not in web
+
+    db = servers["db-01"]
+    assert db["best_practices"]["issues"] == 2
+    assert db["best_practices"]["total_weight"] == 4.3
+    assert db["best_practices"]["top"][0]["recommendation"] == "Enable SMB signing"
+    print("✓ Results joined per server")
+
+
+def test_host_names_joined_once():
+    """Rows of one host under its short name and its FQDN are summarized together."""
+    anomalies = json.dumps([[
+        {"Computer": "web-01", "Namespace": "Processor", "AnomalyScore": 4.0},
+        {"Computer": "web-01.contoso.com", "Namespace": "Memory", "AnomalyScore": 6.0},
+        {"Computer": "WEB-01.contoso.com", "Namespace": "Memory", "AnomalyScore": 5.0},
+    ]])
+    snapshot = build_health_snapshot(METADATA, PATCHING, anomalies, WIN_BP)
+    web = next(server for server in snapshot["servers"] if server["name"] == "web-01")
+    assert web["anomalies"]["count"] == 3
+    assert web["anomalies"]["by_namespace"] == {"Processor": 1, "Memory": 2}
+    assert snapshot["server_count"] == 2
+    print("✓ Short names and FQDNs of one host joined")
+
+
+def test_same_host_name_in_two_domains():
+    """An FQDN is only folded into an inventory row when its host name matches exactly one of them."""
+    metadata = json.dumps({"data": [{"name": "app-01.contoso.com"}, {"name": "app-01.fabrikam.com"},
+                                    {"name": "db-01"}]})
+    win_bp = json.dumps([[
+        {"Computer": "app-01.contoso.com", "Recommendation": "a", "Weight": 1.0},
+        {"Computer": "app-01.fabrikam.com", "Recommendation": "b", "Weight": 2.0},
+        {"Computer": "app-01", "Recommendation": "c", "Weight": 3.0},
+        {"Computer": "db-01.contoso.com", "Recommendation": "d", "Weight": 4.0},
+        {"Computer": "web-09.contoso.com", "Recommendation": "e", "Weight": 5.0},
+        {"Computer": "web-09.fabrikam.com", "Recommendation": "f", "Weight": 6.0},
+    ]])
+    snapshot = build_health_snapshot(metadata, json.dumps({"data": []}), json.dumps([[]]), win_bp)
+    servers = {server["name"]: server["best_practices"]["total_weight"] for server in snapshot["servers"]}
+    assert servers == {"app-01": 3.0, "app-01.contoso.com": 1.0, "app-01.fabrikam.com": 2.0, "db-01": 4.0,
+                       "web-09.contoso.com": 5.0, "web-09.fabrikam.com": 6.0}
+    print("✓ Same host name in two domains kept apart")
+
+
+def test_failed_source_and_server_filter():
+    """A failed source is reported without dropping the others, and ServerName narrows the servers."""
+    failed = json.dumps({"error": "Query failed: timeout"})
+    snapshot = build_health_snapshot(METADATA, PATCHING, failed, WIN_BP, server_names=["web-*"])
+    assert snapshot["errors"] == {"GetAnomalies": "Query failed: timeout"}
+    assert [server["name"] for server in snapshot["servers"]] == ["web-01"]
+    assert "patches" in snapshot["servers"][0]
+
+    assert matches_server("WEB-01", ["web-01"])
+    assert matches_server("web-02", ["db-01", "web-*"])
+    assert not matches_server("db-01", ["web-*"])
+    print("✓ Failed sources reported and servers filtered")
+
+
+def test_anomaly_limit_reported():
+    """The snapshot says whether the anomalies reached the top they were fetched with."""
+    assert "anomaly_limit" not in build_health_snapshot(METADATA, PATCHING, ANOMALIES, WIN_BP)
+    snapshot = build_health_snapshot(METADATA, PATCHING, ANOMALIES, WIN_BP, anomaly_limit=2)
+    assert snapshot["anomaly_limit"] == 2 and snapshot["anomalies_truncated"]
+    assert not build_health_snapshot(METADATA, PATCHING, ANOMALIES, WIN_BP, anomaly_limit=3)["anomalies_truncated"]
+
+    import mcp_tools
+    jobs = dict(mcp_tools._health_snapshot_jobs("sub", "ws", None, "7d", False))
+    assert jobs["GetAnomalies"]["top"] == mcp_tools.HEALTH_SNAPSHOT_ANOMALY_TOP
+    assert "top" not in jobs["GetWinBpAssessment"]
+    print("✓ Anomaly limit reported")
+
+
+if __name__ == "__main__":
+    print("Testing server health snapshot...")
+    print("=" * 60)
+    test_join_per_server()
+    test_host_names_joined_once()
+    test_same_host_name_in_two_domains()
+    test_failed_source_and_server_filter()
+    test_anomaly_limit_reported()
+    print("=" * 60)
+    print("All health snapshot tests completed!")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests for lazy module loading and the startup import report.
+"""
+
+import os
+import subprocess
+import sys
+
+# Add the src directory to the path so we can import our utilities
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.lazy_imports import get_import_report, lazy_import, timed_import
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_lazy_module_loads_on_first_use():
+    """The module is imported on first attribute access and its cost is reported."""
+    module = lazy_import("colorsys")
+    assert "not loaded" in repr(module)
+    assert module.rgb_to_hsv(1, 0, 0) == (0.0, 1.0, 1)
+    assert "not loaded" not in repr(module)
+
+    with timed_import("startup block"):
+        pass
+
+    report = {entry["module"]: entry["phase"] for entry in get_import_report()}
+    assert report["colorsys"] == "lazy"
+    assert report["startup block"] == "startup"
+    print("✓ Lazy module loaded on first use")
+
+
+def test_mcp_tools_import_skips_heavy_modules():
+    """Importing mcp_tools does not load the Azure SDKs or pandas."""
+    code = (
+        "import sys, mcp_tools; "
+        "print(sorted(m for m in sys.modules if m.split('.')[0] in ('pandas', 'numpy') "
+        "or m.startswith(('azure.identity', 'azure.monitor', 'azure.mgmt'))))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=SRC_DIR, capture_output=True, text=True,
+        env=dict(os.environ, SUPPRESS_MCP_LOGGING="true")
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "[]", result.stdout
+    print("✓ mcp_tools imports without loading SDKs")
+
+
+if __name__ == "__main__":
+    print("Testing lazy imports...")
+    print("=" * 60)
+    test_lazy_module_loads_on_first_use()
+    test_mcp_tools_import_skips_heavy_modules()
+    print("=" * 60)
+    print("All lazy import tests completed!")
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Tests for running several Log Analytics queries in one batch request.
+Uses a fake LogsQueryClient, so no workspace or credentials are needed.
+"""
+
+import importlib.util
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+# Add the src directory to the path so we can import our utilities
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.log_analytics_tool import MAX_BATCH_QUERIES, LogAnalyticsTool
+from utils.result_cache import ResultCache
+
+# The batch requests and statuses are SDK types; install azure-monitor-query to run these tests
+HAS_MONITOR_QUERY = importlib.util.find_spec("azure.monitor.query") is not None
+
+
+def fake_table(rows):
+    return SimpleNamespace(name="PrimaryResult", columns=["Computer", "Value"], rows=rows)
+
+
+class FakeLogsClient:
+    """
+    LogsQueryClient answering query_batch from the query text: queries containing "partial" return
+    partial results, "fail" a failed query; any other query succeeds with one row.
+    """
+
+    def __init__(self, fail_requests=0):
+        self.batches = []
+        self.fail_requests = fail_requests
+
+    def query_batch(self, requests):
+        from azure.monitor.query import LogsQueryStatus
+
+        self.batches.append([request.body["query"] for request in requests])
+        if self.fail_requests:
+            self.fail_requests -= 1
+            raise RuntimeError("Service unavailable")
+        responses = []
+        for request in requests:
+            query = request.body["query"]
+            if "partial" in query:
+                responses.append(SimpleNamespace(status=LogsQueryStatus.PARTIAL,
+                                                 partial_data=[fake_table([["web-01", 1]])],
+                                                 partial_error="Result truncated"))
+            elif "fail" in query:
+                responses.append(SimpleNamespace(status=LogsQueryStatus.FAILURE, message="Query timed out"))
+            else:
+                responses.append(SimpleNamespace(status=LogsQueryStatus.SUCCESS,
+                                                 tables=[fake_table([["web-01", 2]])]))
+        return responses
+
+    def close(self):
+        pass
+
+
+def test_batch_requests_split():
+    """Queries are sent in chunks the batch API accepts, keeping their names in order."""
+    if not HAS_MONITOR_QUERY:
+        print("- azure-monitor-query not installed, skipped")
+        return
+    tool = LogAnalyticsTool(credential=object(), client=FakeLogsClient(), output_format="records")
+    queries = {f"q{index}": f"Table{index}" for index in range(MAX_BATCH_QUERIES + 2)}
+    chunks = list(tool._batch_requests(queries, "ws", "1d"))
+    assert [names for names, _ in chunks] == [list(queries)[:MAX_BATCH_QUERIES], list(queries)[MAX_BATCH_QUERIES:]]
+    assert [request.body["query"] for request in chunks[1][1]] == ["Table10", "Table11"]
+    assert all(request.workspace == "ws" for _, requests in chunks for request in requests)
+    print("✓ Batch split into API-sized requests")
+
+
+def test_run_batch_maps_each_status():
+    """A success, a partial result and a failure in one batch each map to their own result."""
+    if not HAS_MONITOR_QUERY:
+        print("- azure-monitor-query not installed, skipped")
+        return
+    tool = LogAnalyticsTool(credential=object(), client=FakeLogsClient(), output_format="records")
+    results = tool.run_batch({"ok": "Ok", "partial": "partial", "failed": "fail"}, "ws", "1d")
+    assert json.loads(results["ok"]) == [[{"Computer": "web-01", "Value": 2}]]
+    assert json.loads(results["partial"]["tables"]) == [[{"Computer": "web-01", "Value": 1}]]
+    assert results["partial"]["partial_error"] == "Result truncated"
+    assert results["failed"] == {"error": "Query timed out"}
+    print("✓ Success, partial and failed queries mapped")
+
+
+def test_run_batch_failed_request():
+    """A batch request that fails marks its queries failed; the next request still runs."""
+    if not HAS_MONITOR_QUERY:
+        print("- azure-monitor-query not installed, skipped")
+        return
+    client = FakeLogsClient(fail_requests=1)
+    tool = LogAnalyticsTool(credential=object(), client=client, output_format="records")
+    queries = {f"q{index}": f"Table{index}" for index in range(MAX_BATCH_QUERIES + 1)}
+    results = tool.run_batch(queries, "ws", "1d")
+    assert len(client.batches) == 2
+    assert all(results[f"q{index}"] == {"error": "Service unavailable"} for index in range(MAX_BATCH_QUERIES))
+    assert json.loads(results[f"q{MAX_BATCH_QUERIES}"])[0][0]["Value"] == 2
+    print("✓ Failed batch request reported per query")
+
+
+def test_assemble_batch_response():
+    """Cached and new results share the envelope; failures go to errors and partial results are not cached."""
+    import mcp_tools
+    from utils.result_cache import make_cache_key
+
+    cache = ResultCache()
+    original_cache, mcp_tools._result_cache = mcp_tools._result_cache, cache
+    try:
+        cache_keys = {name: make_cache_key(name, name, "ws", "30d") for name in ("cached", "ok", "partial", "failed")}
+        batch_results = {
+            "ok": '[[{"Value": 2}]]',
+            "partial": {"tables": '[[{"Value": 1}]]', "partial_error": "Result truncated"},
+            "failed": {"error": "Query timed out"},
+        }
+        response = mcp_tools._assemble_batch_response({"cached": '[[{"Value": 0}]]'}, dict.fromkeys(batch_results),
+                                                      batch_results, cache_keys)
+        envelope = json.loads(response)
+        assert envelope["results"]["cached"] == [[{"Value": 0}]]
+        assert envelope["results"]["ok"] == [[{"Value": 2}]]
+        assert envelope["results"]["partial"] == {"tables": [[{"Value": 1}]], "partial_error": "Result truncated"}
+        assert envelope["errors"] == {"failed": "Query timed out"}
+        assert cache.get(cache_keys["ok"]) == '[[{"Value": 2}]]'
+        assert cache.get(cache_keys["partial"]) is None and cache.get(cache_keys["failed"]) is None
+    finally:
+        mcp_tools._result_cache = original_cache
+    print("✓ Batch envelope assembled and only complete results cached")
+
+
+def test_batch_chunks_server_queries():
+    """Several servers run one query per chunk, as GetSwConfig does on its own; one server keeps one query."""
+    import mcp_tools
+    from utils.server_filter import MAX_SERVERS_PER_QUERY
+
+    servers = [f"web-{index:03d}" for index in range(MAX_SERVERS_PER_QUERY + 1)]
+    queries, grouped, error = mcp_tools._build_batch_queries(["GetSwConfig", "GetWinBpAssessment"], servers, "7d")
+    assert error is None
+    assert grouped == {"GetSwConfig": ["GetSwConfig[0]", "GetSwConfig[1]"]}
+    assert list(queries) == ["GetSwConfig[0]", "GetSwConfig[1]", "GetWinBpAssessment"]
+    assert "'web-199'" in queries["GetSwConfig[0]"] and "'web-200'" not in queries["GetSwConfig[0]"]
+    assert mcp_tools._batch_tool_name("GetSwConfig[1]") == "GetSwConfig"
+
+    queries, grouped, error = mcp_tools._build_batch_queries(["GetSwConfig"], "web-01", "7d")
+    assert grouped == {} and "Computer =~ 'web-01'" in queries["GetSwConfig"]
+    print("✓ Batch server queries chunked")
+
+
+def test_finish_batch_response_groups_chunks():
+    """Chunk results are grouped per computer; a failed chunk fails its tool only."""
+    import mcp_tools
+
+    grouped = {"GetSwConfig": ["GetSwConfig[0]", "GetSwConfig[1]"],
+               "GetSwChangesList": ["GetSwChangesList[0]", "GetSwChangesList[1]"]}
+    response = json.dumps({
+        "results": {
+            "GetSwConfig[0]": [[{"Computer": "web-01", "SoftwareName": "a"}]],
+            "GetSwConfig[1]": {"tables": [[{"Computer": "web-02", "SoftwareName": "b"}]],
+                               "partial_error": "Result truncated"},
+            "GetSwChangesList[0]": [[]],
+            "GetWinBpAssessment": [[{"Computer": "web-01"}]],
+        },
+        "errors": {"GetSwChangesList[1]": "Query timed out"},
+    })
+    envelope = json.loads(mcp_tools._finish_batch_response(response, "records", "7d", grouped))
+    assert envelope["results"]["GetSwConfig"] == {
+        "servers": {"web-01": [{"Computer": "web-01", "SoftwareName": "a"}],
+                    "web-02": [{"Computer": "web-02", "SoftwareName": "b"}]},
+        "server_count": 2, "count": 2, "partial_error": "Result truncated",
+    }
+    assert envelope["results"]["GetWinBpAssessment"] == [[{"Computer": "web-01"}]]
+    assert envelope["errors"] == {"GetSwChangesList": "Query timed out"}
+    assert set(envelope["results"]) == {"GetSwConfig", "GetWinBpAssessment"}
+    print("✓ Batch chunk results grouped per computer")
+
+
+if __name__ == "__main__":
+    print("Testing Log Analytics batches...")
+    print("=" * 60)
+    test_batch_requests_split()
+    test_run_batch_maps_each_status()
+    test_run_batch_failed_request()
+    test_assemble_batch_response()
+    test_batch_chunks_server_queries()
+    test_finish_batch_response_groups_chunks()
+    print("=" * 60)
+    print("All Log Analytics batch tests completed!")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for the GetAnomalies metric catalogue and the bin size chosen for a window.
+"""
+
+import os
+import sys
+
+# Add the src directory to the path so we can import our utilities
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.metric_catalogue import (
+    DEFAULT_METRICS,
+    MAX_POINTS_PER_SERIES,
+    choose_bin_seconds,
+    kql_timespan,
+    metric_label_expression,
+    parse_metrics,
+)
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+def test_parse_metrics():
+    """Catalogue names resolve case-insensitively; custom namespaces and counters are accepted."""
+    assert [spec.label for spec in parse_metrics(None)] == list(DEFAULT_METRICS)
+    specs = parse_metrics("memory, Network, MyApp/QueueLength, memory")
+    assert [spec.label for spec in specs] == ["Memory", "Network", "MyApp/QueueLength"]
+    assert specs[0].low_is_bad and not specs[1].low_is_bad
+    assert specs[2].condition() == "Namespace == 'MyApp' and Name in ('QueueLength')"
+    expression = metric_label_expression(parse_metrics(["LogicalDisk"]))
+    assert expression == "case(Namespace == 'LogicalDisk', 'LogicalDisk', '')"
+    for bad in ("Processor'; drop", "a/b/c", "9lives"):
+        try:
+            parse_metrics([bad])
+        except ValueError:
+            continue
+        raise AssertionError(f"Accepted metric {bad!r}")
+    print("✓ Metrics resolved from the catalogue")
+
+
+def test_bin_size_bounds_points():
+    """The bin size grows with the window so every series stays within the point budget."""
+    assert choose_bin_seconds(HOUR) == 60
+    assert choose_bin_seconds(7 * DAY) == HOUR
+    assert choose_bin_seconds(30 * DAY) == 3 * HOUR
+    for window in (HOUR, 6 * HOUR, DAY, 7 * DAY, 30 * DAY, 90 * DAY):
+        assert window / choose_bin_seconds(window) <= MAX_POINTS_PER_SERIES
+    assert [kql_timespan(seconds) for seconds in (60, 900, HOUR, 3 * HOUR, DAY)] == ["1m", "15m", "1h", "3h", "1d"]
+    print("✓ Bin size chosen from the window")
+
+
+if __name__ == "__main__":
+    print("Testing metric catalogue...")
+    print("=" * 60)
+    test_parse_metrics()
+    test_bin_size_bounds_points()
+    print("=" * 60)
+    print("All metric catalogue tests completed!")
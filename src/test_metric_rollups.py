@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Tests for the hourly metric rollups GetAnomalies keeps between calls.
+"""
+
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+
+# Add the src directory to the path so we can import our utilities
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.metric_rollups import (
+    DAY,
+    HOUR,
+    REFRESH_BINS,
+    MetricRollupStore,
+    format_bin_time,
+    read_rollup_rows,
+    rollup_window,
+)
+from utils.result_cache import FileCacheBackend, ResultCache
+
+# Reading series back uses numpy, a runtime dependency of GetAnomalies
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+START = 1754006400  # 2025-08-01T00:00:00Z
+
+
+def rollup_response(first_hour, hours, value=10.0, computer="web-01"):
+    """A columnar rollup query result with 4 samples of value per hour."""
+    rows = [[computer, "Processor", format_bin_time(START + hour * HOUR), value * 4, 4]
+            for hour in range(first_hour, first_hour + hours)]
+    return json.dumps([{"name": "PrimaryResult", "columns": ["Computer", "Namespace", "TimeGenerated", "Total",
+                                                             "Samples"], "rows": rows}])
+
+
+def test_window_and_fetch_start():
+    """An empty store fetches the whole window; afterwards only the newest bins are read again."""
+    window_start, window_end = rollup_window(START + 47 * HOUR + 600, 2 * DAY)
+    assert (window_start, window_end) == (START, START + 2 * DAY)
+
+    store = MetricRollupStore()
+    assert store.fetch_start(window_start) == window_start
+    store.merge(read_rollup_rows(rollup_response(0, 48)), window_start, window_end)
+    assert store.fetch_start(window_start) == window_end - REFRESH_BINS * HOUR
+    assert store.fetch_start(window_start - HOUR) == window_start - HOUR
+    print("✓ Only missing bins are fetched")
+
+
+def test_refresh_replaces_bins():
+    """Bins read again replace the stored ones instead of adding their samples twice."""
+    store = MetricRollupStore()
+    assert store.merge(read_rollup_rows(rollup_response(0, 10)), START, START + 10 * HOUR)
+    assert store.merge(read_rollup_rows(rollup_response(8, 4, value=30.0)), START + 8 * HOUR, START + 12 * HOUR)
+    assert store.length == 12
+    assert store._counts[("web-01", "Processor")].tolist() == [4] * 12
+    assert store._sums[("web-01", "Processor")].tolist()[7:] == [40.0, 120.0, 120.0, 120.0, 120.0]
+
+    # Reading the same bins again changes nothing, so the store is not written back
+    assert not store.merge(read_rollup_rows(rollup_response(8, 4, value=30.0)), START + 8 * HOUR, START + 12 * HOUR)
+    copy = store.copy()
+    assert copy.merge(read_rollup_rows(rollup_response(11, 1, value=50.0)), START + 11 * HOUR, START + 12 * HOUR)
+    assert store._sums[("web-01", "Processor")].tolist()[-1] == 120.0
+
+    assert store.trim(START + 6 * HOUR) and not store.trim(START + 6 * HOUR)
+    assert (store.start, store.length) == (START + 6 * HOUR, 6)
+    restored = MetricRollupStore.from_bytes(store.to_bytes())
+    assert restored.start == store.start and restored._sums == store._sums and restored._counts == store._counts
+    assert restored.bin_seconds == store.bin_seconds
+    print("✓ Refreshed bins replaced, store trimmed and restored")
+
+
+def test_series_resolutions():
+    """Series are read back per hour or averaged into daily points, NaN where nothing was measured."""
+    if not HAS_NUMPY:
+        print("- numpy not installed, skipped")
+        return
+    store = MetricRollupStore()
+    store.merge(read_rollup_rows(rollup_response(0, 24, value=10.0)), START, START + DAY)
+    store.merge(read_rollup_rows(rollup_response(24, 24, value=20.0)), START + DAY, START + 2 * DAY)
+
+    hourly = store.series(START + 23 * HOUR, START + 26 * HOUR)
+    assert hourly[0][:2] == ("web-01", "Processor")
+    assert hourly[0][2] == [format_bin_time(START + hour * HOUR) for hour in (23, 24, 25)]
+    assert hourly[0][3].tolist() == [10.0, 20.0, 20.0]
+
+    daily = store.series(START - DAY, START + 2 * DAY, bins_per_point=24)
+    values = daily[0][3].tolist()
+    assert values[0] != values[0] and values[1:] == [10.0, 20.0]
+    print("✓ Hourly and daily series read back")
+
+
+class CountingBackend(FileCacheBackend):
+    """FileCacheBackend counting the raw payloads written."""
+
+    writes = 0
+
+    def set_bytes(self, key, payload, ttl):
+        self.writes += 1
+        super().set_bytes(key, payload, ttl)
+
+
+def test_rollups_kept_out_of_result_cache():
+    """Rollups are merged in place and written to disk only when they change, never to the result cache."""
+    if not HAS_NUMPY:
+        print("- numpy not installed, skipped")
+        return
+    import mcp_tools
+
+    key = ("rollups", "ws", ("Processor",), HOUR)
+    saved = mcp_tools._result_cache, mcp_tools._rollup_backend, mcp_tools._rollup_stores
+    with tempfile.TemporaryDirectory() as directory:
+        backend = CountingBackend(directory)
+        mcp_tools._result_cache, mcp_tools._rollup_backend, mcp_tools._rollup_stores = ResultCache(), backend, {}
+        try:
+            def fetch(value):
+                plan = dict(key=key, store=mcp_tools._load_rollups(key, HOUR), since=START, window_start=START,
+                            window_end=START + 10 * HOUR, bins_per_point=1)
+                return plan["store"], mcp_tools._rollup_series(plan, rollup_response(0, 10, value=value))
+
+            store, series = fetch(10.0)
+            assert series[0][3].tolist() == [10.0] * 10 and backend.writes == 1
+            again, _ = fetch(10.0)
+            assert again is store and backend.writes == 1
+            fetch(20.0)
+            assert backend.writes == 2 and mcp_tools._result_cache.stats()["entries"] == 0
+
+            # A new worker loads the rollups from the disk tier
+            mcp_tools._rollup_stores = {}
+            loaded = mcp_tools._load_rollups(key, HOUR)
+            assert loaded is not store and loaded._sums == store._sums
+        finally:
+            mcp_tools._result_cache, mcp_tools._rollup_backend, mcp_tools._rollup_stores = saved
+    print("✓ Rollups kept live and written to disk only when changed")
+
+
+if __name__ == "__main__":
+    print("Testing metric rollups...")
+    print("=" * 60)
+    test_window_and_fetch_start()
+    test_refresh_replaces_bins()
+    test_series_resolutions()
+    test_rollups_kept_out_of_result_cache()
+    print("=" * 60)
+    print("All metric rollup tests completed!")
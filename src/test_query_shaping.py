@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for compiling the columns, filter, top and order_by tool arguments into KQL.
+"""
+
+import os
+import sys
+
+# Add the src directory to the path so we can import our utilities
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.query_shaping import build_filter, parse_order_by, shape_query, shape_rows
+
+QUERY = "resources | where type == 'microsoft.hybridcompute/machines' | project name, location, coreCount"
+
+
+def test_unshaped_query_is_unchanged():
+    """Without shaping arguments the tool query, and so its cache key, stays the same."""
+    assert shape_query(QUERY) == QUERY
+    print("✓ Unshaped query unchanged")
+
+
+def test_full_shaping():
+    """Filter, projection and top N ordering are appended in that order."""
+    shaped = shape_query(QUERY, columns="name, coreCount", row_filter="location == westeurope and coreCount > 4",
+                         top="10", order_by="coreCount")
+    assert shaped == (
+        QUERY + " | where location == 'westeurope' and coreCount > 4"
+        " | project name, coreCount | top 10 by coreCount desc"
+    )
+    assert shape_query(QUERY, top=5) == QUERY + " | take 5"
+    assert shape_query(QUERY, order_by=["name asc"]) == QUERY + " | sort by name asc"
+    print("✓ Columns, filter, top and order_by compiled")
+
+
+def test_dynamic_fields_and_required_columns():
+    """Dotted paths project and filter fields of dynamic columns; required columns are always kept."""
+    shaped = shape_query("patches", columns=["MissedPatch.kbId"], row_filter="MissedPatch.msrcSeverity == 'Critical'",
+                         required_columns=("ServerName",))
+    assert shaped == (
+        "patches | where tostring(MissedPatch.msrcSeverity) == 'Critical'"
+        " | project kbId = MissedPatch.kbId, ServerName"
+    )
+    print("✓ Dynamic fields and required columns handled")
+
+
+def test_invalid_arguments_rejected():
+    """Anything that is not a plain field predicate or column name is rejected instead of reaching KQL."""
+    assert build_filter(["name startswith 'web'", "RamGB >= 16"]) == "name startswith 'web' and RamGB >= 16"
+    assert build_filter("Publisher contains \"O'Brien\"") == "Publisher contains 'O\\'Brien'"
+    for kwargs in (
+        {"row_filter": "name == web | take 1"},
+        {"row_filter": "coreCount"},
+        {"columns": "name; drop"},
+        {"columns": "name, other.name"},
+        {"top": 0},
+        {"top": "many"},
+        {"order_by": "coreCount sideways"},
+        {"columns": "name", "order_by": "coreCount"},
+    ):
+        try:
+            shape_query(QUERY, **kwargs)
+        except ValueError:
+            continue
+        raise AssertionError(f"Accepted invalid shaping: {kwargs}")
+    assert parse_order_by("name, coreCount ASC") == ["name desc", "coreCount asc"]
+    print("✓ Invalid shaping arguments rejected")
+
+
+def test_local_row_shaping():
+    """Rows computed by a tool are shaped with the same arguments and KQL operator semantics."""
+    columns = ["Computer", "Namespace", "AnomalyScore"]
+    rows = [["web-01", "Processor", 4.2], ["web-02", "LogicalDisk", 9.0], ["db-01", "Processor", 12.5]]
+    names, shaped = shape_rows(columns, rows, selected="Computer, AnomalyScore",
+                               row_filter="Namespace =~ processor and AnomalyScore > 4", order_by="AnomalyScore")
+    assert names == ["Computer", "AnomalyScore"]
+    assert shaped == [["db-01", 12.5], ["web-01", 4.2]]
+    assert shape_rows(columns, rows, row_filter="Computer startswith WEB", top=1)[1] == [rows[0]]
+    try:
+        shape_rows(columns, rows, row_filter="Missing == 1")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Accepted a filter on an unknown column")
+    print("✓ Local rows shaped")
+
+
+if __name__ == "__main__":
+    print("Testing query shaping...")
+    print("=" * 60)
+    test_unshaped_query_is_unchanged()
+    test_full_shaping()
+    test_dynamic_fields_and_required_columns()
+    test_invalid_arguments_rejected()
+    test_local_row_shaping()
+    print("=" * 60)
+    print("All query shaping tests completed!")
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Tests for following Resource Graph skip tokens, fanning out over subscriptions and serializing the pages.
+Uses a fake page source so the Azure SDK is not required.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+# Add the src directory to the path so we can import our utilities
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.resource_graph_tool import (
+    MAX_SUBSCRIPTIONS_PER_REQUEST,
+    AsyncResourceGraphTool,
+    ResourceGraphTool,
+    _trim_rows,
+    chunk_subscriptions,
+)
+
+
+def fake_page(subscription_ids, skip_token, total, page_rows):
+    """One page of `page_rows` rows out of `total`, tagged with the first subscription of the request."""
+    start = int(skip_token or 0)
+    end = min(start + page_rows, total)
+    return SimpleNamespace(
+        data=[{"id": index, "subscription": subscription_ids[0]} for index in range(start, end)],
+        count=end - start, total_records=total, skip_token=str(end) if end < total else None,
+    )
+
+
+class FakeResourceGraphTool(ResourceGraphTool):
+    """ResourceGraphTool serving pages of `page_rows` rows out of `total` rows per request, keyed by skip token."""
+
+    def __init__(self, total, page_rows, delay=0.0):
+        super().__init__(credential=object(), client=object())
+        self.total = total
+        self.page_rows = page_rows
+        self.delay = delay
+        self.requests = []
+        self.fetched = threading.Event()
+
+    def _fetch_page(self, query, subscription_ids=None, page_size=1000, skip_token=None, management_groups=None):
+        self.requests.append(skip_token)
+        self.fetched.set()
+        time.sleep(self.delay)
+        return fake_page(subscription_ids, skip_token, self.total, self.page_rows)
+
+
+class FakeAsyncResourceGraphTool(AsyncResourceGraphTool):
+    """Async version of FakeResourceGraphTool."""
+
+    def __init__(self, total, page_rows):
+        super().__init__(credential=object(), client=object())
+        self.total = total
+        self.page_rows = page_rows
+        self.requests = []
+
+    async def _fetch_page(self, query, subscription_ids=None, page_size=1000, skip_token=None,
+                          management_groups=None):
+        self.requests.append(skip_token)
+        await asyncio.sleep(0)
+        return fake_page(subscription_ids, skip_token, self.total, self.page_rows)
+
+
+def many_subscriptions(chunks):
+    """Subscription IDs filling `chunks` request chunks, the last one half full."""
+    count = MAX_SUBSCRIPTIONS_PER_REQUEST * (chunks - 1) + MAX_SUBSCRIPTIONS_PER_REQUEST // 2
+    return [f"sub-{index:05d}" for index in range(count)]
+
+
+def test_trim_rows():
+    """Pages are cut so the running total never exceeds max_rows."""
+    rows = list(range(5))
+    assert _trim_rows(rows, 0, None) == rows
+    assert _trim_rows(rows, 3, 10) == rows
+    assert _trim_rows(rows, 8, 10) == [0, 1]
+    print("✓ Pages trimmed to max_rows")
+
+
+def test_iter_pages_follows_skip_tokens():
+    """Every page is returned in order and the last page has no skip token."""
+    tool = FakeResourceGraphTool(total=25, page_rows=10)
+    pages = list(tool.iter_pages("resources", ["sub"]))
+    assert [page["count"] for page in pages] == [10, 10, 5]
+    assert [row["id"] for page in pages for row in page["data"]] == list(range(25))
+    assert [page["skip_token"] for page in pages] == [None, None, None]
+    assert tool.requests == [None, "10", "20"]
+    print("✓ Skip tokens followed over every page")
+
+
+def test_iter_pages_prefetches_next_page():
+    """The next page is requested while the caller still holds the current one."""
+    tool = FakeResourceGraphTool(total=20, page_rows=10)
+    pages = tool.iter_pages("resources", ["sub"])
+    next(pages)
+    tool.fetched.clear()
+    assert tool.fetched.wait(timeout=2) and tool.requests == [None, "10"]
+    pages.close()
+    print("✓ Next page prefetched in the background")
+
+
+def test_max_rows_and_skip_token():
+    """max_rows stops paging; a token is only returned when the cut falls on a page boundary."""
+    tool = FakeResourceGraphTool(total=50, page_rows=10)
+    pages = list(tool.iter_pages("resources", ["sub"], max_rows=20))
+    assert [page["count"] for page in pages] == [10, 10]
+    assert pages[-1]["skip_token"] == "20" and tool.requests == [None, "10"]
+
+    # The second page is cut after 5 rows: resuming from its token would skip rows 15-19
+    tool = FakeResourceGraphTool(total=50, page_rows=10)
+    pages = list(tool.iter_pages("resources", ["sub"], max_rows=15))
+    assert [page["count"] for page in pages] == [10, 5]
+    assert pages[-1]["skip_token"] is None
+
+    result = tool.run_query("resources", ["sub"], paginate=True, max_rows=15)
+    assert result["count"] == 15 and result["skip_token"] is None and result["total_records"] == 50
+    print("✓ max_rows respected without a misleading skip token")
+
+
+def test_chunk_subscriptions():
+    """Subscriptions are split into request-sized chunks in their original order."""
+    subscriptions = many_subscriptions(3)
+    chunks = chunk_subscriptions(subscriptions)
+    assert [len(chunk) for chunk in chunks] == [1000, 1000, 500]
+    assert [item for chunk in chunks for item in chunk] == subscriptions
+    assert chunk_subscriptions([]) == []
+    assert chunk_subscriptions(["a", "b", "c"], chunk_size=2) == [["a", "b"], ["c"]]
+    print("✓ Subscriptions chunked per request")
+
+
+def test_fan_out_merges_chunks_in_order():
+    """Chunks are queried concurrently and merged in chunk order with a running total."""
+    tool = FakeResourceGraphTool(total=25, page_rows=10)
+    pages = list(tool.iter_pages_concurrent("resources", many_subscriptions(3), max_workers=2))
+    assert [row["subscription"] for page in pages for row in page["data"][:1]] == \
+        ["sub-00000"] * 3 + ["sub-01000"] * 3 + ["sub-02000"] * 3
+    assert [page["total_records"] for page in pages] == [25] * 3 + [50] * 3 + [75] * 3
+    assert sum(page["count"] for page in pages) == 75
+    assert all(page["skip_token"] is None for page in pages)
+    print("✓ Chunk pages merged in order")
+
+
+def test_fan_out_stops_early_at_max_rows():
+    """Reaching max_rows returns at once and stops the chunks still paging."""
+    tool = FakeResourceGraphTool(total=10000, page_rows=10, delay=0.01)
+    start = time.monotonic()
+    pages = list(tool.iter_pages_concurrent("resources", many_subscriptions(3), max_rows=15, max_workers=3))
+    assert [page["count"] for page in pages] == [10, 5]
+    assert time.monotonic() - start < 1
+
+    # Every chunk buffers a few pages at most, then stops once the caller is gone
+    time.sleep(0.3)
+    requests = len(tool.requests)
+    time.sleep(0.2)
+    assert len(tool.requests) == requests and requests < 20, requests
+    print("✓ Fan-out stopped at max_rows without draining the other chunks")
+
+
+def test_async_fan_out():
+    """The async fan-out merges chunks in order and stops at max_rows."""
+    async def collect(**kwargs):
+        tool = FakeAsyncResourceGraphTool(total=25, page_rows=10)
+        pages = [page async for page in tool.iter_pages_concurrent("resources", many_subscriptions(3), **kwargs)]
+        await asyncio.sleep(0.05)
+        return pages, tool.requests
+
+    pages, _ = asyncio.run(collect(max_workers=2))
+    assert [row["subscription"] for page in pages for row in page["data"][:1]] == \
+        ["sub-00000"] * 3 + ["sub-01000"] * 3 + ["sub-02000"] * 3
+    assert pages[-1]["total_records"] == 75
+
+    pages, requests = asyncio.run(collect(max_rows=15, max_workers=3))
+    assert [page["count"] for page in pages] == [10, 5] and len(requests) < 9
+    print("✓ Async fan-out merged in order")
+
+
+def test_page_writer_serializes_pages():
+    """The page writer joins the pages into one Resource Graph result document."""
+    import mcp_tools
+
+    tool = FakeResourceGraphTool(total=25, page_rows=10)
+    result = json.loads(mcp_tools._serialize_resource_graph_pages(tool.iter_pages("resources", ["sub"])))
+    assert result["count"] == 25 and result["total_records"] == 25 and result["skip_token"] is None
+    assert [row["id"] for row in result["data"]] == list(range(25))
+
+    empty = json.loads(mcp_tools._serialize_resource_graph_pages([]))
+    assert empty == {"data": [], "count": 0, "total_records": None, "skip_token": None}
+    print("✓ Pages serialized into one result")
+
+
+if __name__ == "__main__":
+    print("Testing Resource Graph paging...")
+    print("=" * 60)
+    test_trim_rows()
+    test_iter_pages_follows_skip_tokens()
+    test_iter_pages_prefetches_next_page()
+    test_max_rows_and_skip_token()
+    test_chunk_subscriptions()
+    test_fan_out_merges_chunks_in_order()
+    test_fan_out_stops_early_at_max_rows()
+    test_async_fan_out()
+    test_page_writer_serializes_pages()
+    print("=" * 60)
+    print("All Resource Graph paging tests completed!")
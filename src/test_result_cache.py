@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory TTL + LRU result cache used by the MCP tools.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add the src directory to the path so we can import our utilities
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.result_cache import STALE_TEMP_SECONDS, FileCacheBackend, ResultCache, TieredResultCache, make_cache_key
+
+
+def test_cache_key_normalization():
+    """Whitespace, scope order and timespan spelling do not change the key."""
+    first = make_cache_key("GetSwConfig", "ConfigurationData\n| where  x", ["B", "a"], "P30D")
+    second = make_cache_key("GetSwConfig", "ConfigurationData | where x", "a,b", "30d")
+    other_tool = make_cache_key("GetSwChangesList", "ConfigurationData | where x", "a,b", "30d")
+
+    assert first == second
+    assert first != other_tool
+    print("✓ Cache keys normalized")
+
+
+def test_hits_misses_and_ttl():
+    """Entries are served until their TTL expires and counters track hits and misses."""
+    cache = ResultCache()
+    cache.set("key", '{"data": []}', ttl=0.05)
+
+    assert cache.get("key") == '{"data": []}'
+    time.sleep(0.06)
+    assert cache.get("key") is None
+    assert cache.get("missing") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["entries"] == 0
+    print("✓ TTL expiry and hit/miss counters")
+
+
+def test_fresh_ttl():
+    """An entry can outlive its freshness; get_entry() reports whether it is still fresh."""
+    cache = ResultCache()
+    cache.set("key", "value", ttl=60, fresh_ttl=0.05)
+    cache.set("other", "value", ttl=60)
+    assert cache.get_entry("key") == ("value", True)
+    time.sleep(0.06)
+    assert cache.get_entry("key") == ("value", False) and cache.get("key") == "value"
+    assert cache.get_entry("other") == ("value", True)
+    print("✓ Freshness tracked within the TTL")
+
+
+def test_lru_eviction_by_count_and_size():
+    """Least recently used entries are evicted when the cache is full."""
+    cache = ResultCache(max_entries=2, max_bytes=10)
+    cache.set("a", "1111")
+    cache.set("b", "2222")
+    cache.get("a")
+    cache.set("c", "3333")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1111"
+
+    cache.set("d", "444444")
+    assert cache.stats()["bytes"] <= 10
+    assert cache.stats()["evictions"] >= 2
+    print("✓ LRU eviction by entry count and size")
+
+
+def test_file_backend_roundtrip_and_expiry():
+    """Values survive a new backend instance on the same directory and expire on time."""
+    with tempfile.TemporaryDirectory() as directory:
+        key = make_cache_key("GetSqlBpAssessment", "SqlAssessment_CL", "ws", "30d")
+        FileCacheBackend(directory).set(key, '[{"Result": "ok"}]', ttl=60, fresh_ttl=30)
+
+        value, expires_at, fresh_until = FileCacheBackend(directory).get(key)
+        assert value == '[{"Result": "ok"}]'
+        assert expires_at > time.time() and expires_at - 31 < fresh_until < expires_at - 29
+
+        backend = FileCacheBackend(directory)
+        backend.set("short", "x", ttl=0.01)
+        time.sleep(0.02)
+        assert backend.get("short") is None
+        print("✓ File backend round trip and expiry")
+
+
+def test_file_backend_raw_bytes():
+    """Raw payloads are stored as they are and never read back as text entries."""
+    with tempfile.TemporaryDirectory() as directory:
+        backend = FileCacheBackend(directory)
+        payload = os.urandom(1000)
+        backend.set_bytes("rollups", payload, ttl=60)
+
+        data, expires_at = FileCacheBackend(directory).get_bytes("rollups")
+        assert data == payload and expires_at > time.time()
+        assert backend.get("rollups") is None
+        assert sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) < 1100
+        print("✓ File backend raw payloads")
+
+
+def test_file_backend_size_eviction():
+    """The oldest files are evicted once the directory exceeds its size bound."""
+    with tempfile.TemporaryDirectory() as directory:
+        backend = FileCacheBackend(directory, max_bytes=200)
+        for index in range(10):
+            backend.set(f"key{index}", os.urandom(40).hex(), ttl=60)
+            time.sleep(0.01)
+
+        total = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        assert total <= 200
+        assert backend.get("key9") is not None
+        assert backend.get("key0") is None
+        print("✓ File backend evicts oldest entries")
+
+
+def test_file_backend_sweeps_stale_temp_files():
+    """Temp files of interrupted writes are removed once stale, while a write in progress is kept."""
+    with tempfile.TemporaryDirectory() as directory:
+        stale = os.path.join(directory, "crashed.tmp")
+        fresh = os.path.join(directory, "writing.tmp")
+        for path in (stale, fresh):
+            with open(path, "wb") as handle:
+                handle.write(b"x" * 100)
+        old = time.time() - STALE_TEMP_SECONDS - 1
+        os.utime(stale, (old, old))
+
+        backend = FileCacheBackend(directory, max_bytes=10_000)
+        assert not os.path.exists(stale) and os.path.exists(fresh)
+
+        os.utime(fresh, (old, old))
+        backend._evict()
+        assert not os.path.exists(fresh)
+        print("✓ Stale temp files swept")
+
+
+def test_tiered_cache_promotes_backend_hits():
+    """A fresh memory tier (e.g. after a cold start) is filled from the shared backend."""
+    with tempfile.TemporaryDirectory() as directory:
+        TieredResultCache(ResultCache(), FileCacheBackend(directory)).set("key", "value", ttl=60)
+        TieredResultCache(ResultCache(), FileCacheBackend(directory)).set("stale", "value", ttl=60, fresh_ttl=0)
+
+        cold_start = TieredResultCache(ResultCache(), FileCacheBackend(directory))
+        assert cold_start.get("key") == "value"
+        assert cold_start.memory.get("key") == "value"
+        # Promoted entries keep their freshness
+        assert cold_start.get_entry("stale") == ("value", False)
+        assert cold_start.memory.get_entry("stale") == ("value", False)
+        assert cold_start.stats()["backend_hits"] == 2
+        print("✓ Backend hits promoted into memory")
+
+
+class ThreadRecordingBackend(FileCacheBackend):
+    """FileCacheBackend recording the thread of every read and write."""
+
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.threads = []
+
+    def get(self, key):
+        self.threads.append(threading.current_thread())
+        return super().get(key)
+
+    def set(self, key, value, ttl, fresh_ttl=None):
+        self.threads.append(threading.current_thread())
+        super().set(key, value, ttl, fresh_ttl)
+
+
+def test_tiered_cache_async_io_off_the_loop():
+    """get_async() and set_async() do the backend I/O in a worker thread, not on the event loop."""
+    async def roundtrip(cache):
+        await cache.set_async("key", "value", ttl=60)
+        cache.memory.invalidate()
+        return await cache.get_async("key"), threading.current_thread()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TieredResultCache(ResultCache(), ThreadRecordingBackend(directory))
+        value, loop_thread = asyncio.run(roundtrip(cache))
+        assert value == "value" and cache.memory.get("key") == "value"
+        assert len(cache.backend.threads) == 2 and loop_thread not in cache.backend.threads
+        print("✓ Async backend I/O ran in worker threads")
+
+
+def test_stale_while_revalidate():
+    """A stale hit returns at once and starts one background refresh; the next caller gets the new result."""
+    import mcp_tools
+
+    calls = []
+    release = threading.Event()
+
+    def execute(query, subscription_ids, management_groups, paginate, max_rows):
+        calls.append(query)
+        if len(calls) > 1:
+            release.wait(timeout=2)
+        return json.dumps({"data": [len(calls)]})
+
+    saved = mcp_tools._result_cache, mcp_tools._execute_resource_graph_query, mcp_tools.TOOL_CACHE_TTLS
+    mcp_tools._result_cache, mcp_tools._execute_resource_graph_query = ResultCache(), execute
+    mcp_tools.TOOL_CACHE_TTLS = dict(saved[2], GetServerMetadata=0.05)
+    try:
+        def call():
+            return mcp_tools.resource_graph_tool("Resources", "sub", tool_name="GetServerMetadata")
+
+        first = call()
+        assert call() == first and len(calls) == 1
+        time.sleep(0.06)
+
+        start = time.monotonic()
+        assert [call() for _ in range(3)] == [first] * 3
+        assert time.monotonic() - start < 0.5
+
+        release.set()
+        deadline = time.monotonic() + 2
+        while mcp_tools._refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(calls) == 2
+        assert json.loads(call()) == {"data": [2]}
+        # The freshness is kept in the entry itself, not in a second cache entry
+        assert len(mcp_tools._result_cache) == 1
+    finally:
+        mcp_tools._result_cache, mcp_tools._execute_resource_graph_query, mcp_tools.TOOL_CACHE_TTLS = saved
+    print("✓ Stale result served while refreshed once in the background")
+
+
+if __name__ == "__main__":
+    print("Testing ResultCache...")
+    print("=" * 60)
+    test_cache_key_normalization()
+    test_hits_misses_and_ttl()
+    test_fresh_ttl()
+    test_lru_eviction_by_count_and_size()
+    test_file_backend_roundtrip_and_expiry()
+    test_file_backend_raw_bytes()
+    test_file_backend_size_eviction()
+    test_file_backend_sweeps_stale_temp_files()
+    test_tiered_cache_promotes_backend_hits()
+    test_tiered_cache_async_io_off_the_loop()
+    test_stale_while_revalidate()
+    print("=" * 60)
+    print("All result cache tests completed!")
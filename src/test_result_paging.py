@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for cutting large tool results into pages with continuation cursors.
+"""
+
+import json
+import os
+import sys
+
+# Add the src directory to the path so we can import our utilities
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.result_paging import (
+    build_page,
+    count_rows,
+    decode_cursor,
+    encode_cursor,
+    fits_in_page,
+    parse_page_size,
+    result_token,
+)
+
+
+def resource_graph_result(rows):
+    return {"data": [{"ServerName": f"srv-{i}"} for i in range(rows)], "count": rows, "total_records": rows,
+            "skip_token": None}
+
+
+def test_cursor_round_trip():
+    """Cursors are opaque strings that decode back to the tool, result and position."""
+    cursor = encode_cursor("GetPatchingLevel", "abc", 500, 250)
+    assert "GetPatchingLevel" not in cursor
+    assert decode_cursor(cursor) == {"tool": "GetPatchingLevel", "token": "abc", "offset": 500, "page_size": 250}
+    for bad in ("not a cursor", "", encode_cursor("GetSwConfig", "abc", -1, 10)):
+        try:
+            decode_cursor(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"Accepted invalid cursor: {bad!r}")
+    assert result_token("same") == result_token("same") != result_token("other")
+    print("✓ Cursors encoded and validated")
+
+
+def test_resource_graph_pages():
+    """Following next_cursor walks every row exactly once."""
+    response = json.dumps(resource_graph_result(5))
+    seen = []
+    offset = 0
+    while True:
+        page = build_page(json.loads(response), "GetPatchingLevel", "token", offset, 2)
+        seen.extend(row["ServerName"] for row in page["data"])
+        assert page["count"] == len(page["data"])
+        assert page["paging"]["total_rows"] == 5
+        if not page["paging"]["next_cursor"]:
+            break
+        offset = decode_cursor(page["paging"]["next_cursor"])["offset"]
+    assert seen == [f"srv-{i}" for i in range(5)]
+    print("✓ Resource Graph result paged")
+
+
+def test_log_analytics_and_grouped_pages():
+    """Table lists are wrapped under "tables"; grouped results keep only the servers on the page."""
+    records = [[{"Computer": "a", "Value": i} for i in range(3)], [{"Computer": "b", "Value": 9}]]
+    page = build_page(records, "GetAnomalies", "token", 2, 2)
+    assert page["tables"] == [[{"Computer": "a", "Value": 2}], [{"Computer": "b", "Value": 9}]]
+    assert page["paging"]["next_cursor"] is None
+
+    columnar = [{"name": "PrimaryResult", "columns": ["Computer"], "rows": [["a"], ["b"], ["c"]]}]
+    assert count_rows(columnar) == 3
+    assert build_page(columnar, "GetSwConfig", "token", 0, 2)["tables"][0]["rows"] == [["a"], ["b"]]
+
+    grouped = {"servers": {"web-01": [{"x": 1}, {"x": 2}], "web-02": [{"x": 3}]}, "server_count": 2, "count": 3}
+    page = build_page(grouped, "GetSwConfig", "token", 2, 2)
+    assert page["servers"] == {"web-02": [{"x": 3}]}
+    assert page["server_count"] == 1 and page["count"] == 1
+    assert count_rows({"error": "x"}) is None
+    print("✓ Log Analytics and grouped results paged")
+
+
+def test_page_size_validation():
+    """page_size defaults, accepts strings from the trigger, allows 0 and rejects bad values."""
+    assert parse_page_size(None, 500) == 500
+    assert parse_page_size("100") == 100
+    assert parse_page_size(0) == 0
+    for bad in (-1, "ten", 10 ** 6):
+        try:
+            parse_page_size(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"Accepted page_size {bad!r}")
+    print("✓ Page sizes validated")
+
+
+def test_row_count_without_parsing():
+    """Short responses and responses whose row count is known are returned without parsing them."""
+    import mcp_tools
+
+    response = json.dumps(resource_graph_result(10))
+    assert fits_in_page("[[{},{}]]", 3) and fits_in_page(response, 0)
+    assert not fits_in_page(json.dumps([[{}] * 4]), 3)
+
+    page = json.loads(mcp_tools._paginate("GetServerMetadata", response, 3))
+    assert page["paging"]["total_rows"] == 10
+    assert mcp_tools._row_counts[result_token(response)] == 10
+
+    # A remembered count is trusted instead of parsing the response again
+    mcp_tools._row_counts[result_token(response)] = 2
+    try:
+        assert mcp_tools._paginate("GetServerMetadata", response, 3) == response
+    finally:
+        del mcp_tools._row_counts[result_token(response)]
+    print("✓ Row counts served without parsing")
+
+
+if __name__ == "__main__":
+    print("Testing result paging...")
+    print("=" * 60)
+    test_cursor_round_trip()
+    test_resource_graph_pages()
+    test_log_analytics_and_grouped_pages()
+    test_page_size_validation()
+    test_row_count_without_parsing()
+    print("=" * 60)
+    print("All result paging tests completed!")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for the single-pass JSON encoder used for tool responses.
+"""
+
+import datetime
+import decimal
+import json
+import os
+import sys
+
+# Add the src directory to the path so we can import our utilities
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.serialization import dumps, get_backend, set_backend
+
+
+class FakeModel:
+    """SDK model exposing as_dict(), like msrest models."""
+
+    def as_dict(self):
+        return {"name": "vm-01"}
+
+
+class PlainObject:
+    def __init__(self):
+        self.name = "vm-02"
+        self._secret = "hidden"
+
+
+class FakeRow:
+    def __iter__(self):
+        return iter(["web-01", 3])
+
+
+def test_builtin_types():
+    """Datetimes, decimals and sets are converted while encoding."""
+    payload = {
+        "when": datetime.datetime(2025, 8, 4, 12, 0),
+        "day": datetime.date(2025, 8, 4),
+        "duration": datetime.timedelta(hours=1),
+        "price": decimal.Decimal("1.5"),
+        "tags": {"prod"},
+        "nested": [{"inner": datetime.date(2025, 1, 1)}],
+    }
+    assert json.loads(dumps(payload)) == {
+        "when": "2025-08-04T12:00:00",
+        "day": "2025-08-04",
+        "duration": "1:00:00",
+        "price": 1.5,
+        "tags": ["prod"],
+        "nested": [{"inner": "2025-01-01"}],
+    }
+    print("✓ Built-in types encoded")
+
+
+def test_sdk_objects():
+    """SDK models, plain objects and row sequences are encoded without a pre-walk."""
+    payload = [FakeModel(), PlainObject(), FakeRow()]
+    assert json.loads(dumps(payload)) == [{"name": "vm-01"}, {"name": "vm-02"}, ["web-01", 3]]
+    print("✓ SDK objects encoded")
+
+
+def test_backends_agree():
+    """Every installed backend produces the same JSON; missing ones fall back to the stdlib encoder."""
+    payload = {
+        "when": datetime.datetime(2025, 8, 4, 12, 0, tzinfo=datetime.UTC),
+        "price": decimal.Decimal("1.5"),
+        "models": [FakeModel(), FakeRow()],
+        "big": 2 ** 70,
+    }
+    original = get_backend()
+    try:
+        set_backend("json")
+        expected = json.loads(dumps(payload))
+        for name in ("orjson", "msgspec"):
+            backend = set_backend(name)
+            assert backend in (name, "json")
+            assert json.loads(dumps(payload)) == expected, backend
+    finally:
+        set_backend(original)
+    print(f"✓ JSON backends agree (default: {original})")
+
+
+if __name__ == "__main__":
+    print("Testing serialization...")
+    print("=" * 60)
+    test_builtin_types()
+    test_sdk_objects()
+    test_backends_agree()
+    print("=" * 60)
+    print("All serialization tests completed!")
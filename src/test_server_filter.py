@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Tests for the multi-server Computer filters used by GetSwConfig and GetSwChangesList.
+"""
+
+import os
+import sys
+
+# Add the src directory to the path so we can import our utilities
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.server_filter import build_computer_filter, chunk_server_names, is_multi_server
+
+
+def test_computer_filters():
+    """Single names, lists, prefixes and '*' produce the matching KQL predicate."""
+    assert build_computer_filter(["web-01"]) == "Computer =~ 'web-01'"
+    assert build_computer_filter(["web-01", "web-02"]) == "Computer in~ ('web-01', 'web-02')"
+    assert build_computer_filter(["web-*"]) == "Computer startswith 'web-'"
+    assert build_computer_filter(["db-01", "web-*"]) == "(Computer =~ 'db-01' or Computer startswith 'web-')"
+    assert build_computer_filter(["*"]) == "isnotempty(Computer)"
+    assert build_computer_filter(["o'brien"]) == "Computer =~ 'o\\'brien'"
+
+    assert not is_multi_server(["web-01"])
+    assert is_multi_server(["web-01", "web-02"])
+    assert is_multi_server(["web-*"])
+    print("✓ Computer filters built")
+
+
+def test_chunking():
+    """Long server lists are split by count and by filter length."""
+    names = [f"server-{i:03d}" for i in range(450)]
+    chunks = chunk_server_names(names, max_servers=200)
+    assert [len(chunk) for chunk in chunks] == [200, 200, 50]
+    assert sum(chunks, []) == names
+
+    chunks = chunk_server_names(names, max_length=140)
+    assert all(len(chunk) == 10 for chunk in chunks)
+    assert chunk_server_names([]) == []
+    print("✓ Server lists chunked")
+
+
+if __name__ == "__main__":
+    print("Testing server filters...")
+    print("=" * 60)
+    test_computer_filters()
+    test_chunking()
+    print("=" * 60)
+    print("All server filter tests completed!")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for coalescing identical concurrent tool calls into one execution.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+# Add the src directory to the path so we can import our utilities
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.single_flight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    """Threads asking for the same key while it runs get the leader's result; other keys run on their own."""
+    flight = SingleFlight()
+    executions = []
+    lock = threading.Lock()
+
+    def query(value):
+        with lock:
+            executions.append(value)
+        time.sleep(0.2)
+        return f"result-{value}"
+
+    results = [None] * 6
+
+    def call(index):
+        key = "servers" if index < 5 else "patches"
+        results[index] = flight.do(key, query, key)
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(6)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+
+    assert results == ["result-servers"] * 5 + ["result-patches"]
+    assert sorted(executions) == ["patches", "servers"]
+    assert flight.stats() == {"executions": 2, "coalesced": 4, "in_flight": 0}
+
+    # Once the call finished the key is released and runs again
+    assert flight.do("servers", query, "again") == "result-again"
+    print("✓ Concurrent identical calls shared one execution")
+
+
+def test_errors_reach_every_caller():
+    """An exception of the shared execution is raised in every waiting caller."""
+    flight = SingleFlight()
+
+    def failing():
+        time.sleep(0.1)
+        raise RuntimeError("throttled")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("key", failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == ["throttled"] * 3
+    assert flight.stats()["in_flight"] == 0
+    print("✓ Errors shared with every waiting caller")
+
+
+def test_async_calls_share_one_execution():
+    """Coroutines share one execution, and a cancelled caller does not cancel it for the others."""
+    flight = AsyncSingleFlight()
+    executions = []
+
+    async def query(value):
+        executions.append(value)
+        await asyncio.sleep(0.1)
+        return f"result-{value}"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("servers", query, "servers"))
+        await asyncio.sleep(0)
+        others = [flight.do("servers", query, "servers") for _ in range(3)]
+        first.cancel()
+        results = await asyncio.gather(*others)
+        return results, first.cancelled()
+
+    results, cancelled = asyncio.run(main())
+    assert results == ["result-servers"] * 3 and cancelled
+    assert executions == ["servers"]
+    assert flight.stats() == {"executions": 1, "coalesced": 3, "in_flight": 0}
+    print("✓ Async calls shared one execution")
+
+
+if __name__ == "__main__":
+    print("Testing single-flight calls...")
+    print("=" * 60)
+    test_concurrent_calls_share_one_execution()
+    test_errors_reach_every_caller()
+    test_async_calls_share_one_execution()
+    print("=" * 60)
+    print("All single-flight tests completed!")
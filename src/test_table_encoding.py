@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for encoding Log Analytics tables straight to JSON.
+Uses fake tables shaped like the SDK's LogsTable so azure-monitor-query is not required.
+"""
+
+import datetime
+import json
+import os
+import sys
+
+# Add the src directory to the path so we can import our utilities
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.serialization import dumps
+from utils.table_encoding import COLUMNAR, RECORDS, ResultTable, encode_tables, normalize_output_format
+
+
+class FakeRow:
+    """Row sequence like LogsTableRow, which is not a list."""
+
+    def __init__(self, values):
+        self._values = values
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __getitem__(self, index):
+        return self._values[index]
+
+
+class FakeTable:
+    def __init__(self, name, columns, rows):
+        self.name = name
+        self.columns = columns
+        self.rows = [FakeRow(row) for row in rows]
+
+
+TIMESTAMP = datetime.datetime(2025, 8, 4, 12, 30, tzinfo=datetime.UTC)
+TABLE = FakeTable("PrimaryResult", ["Computer", "TimeGenerated", "Value"], [["web-01", TIMESTAMP, 1.5]])
+
+
+def test_records_format():
+    """Records keep the shape the tools have always returned: one object per row."""
+    result = json.loads(encode_tables([TABLE], RECORDS))
+    assert result == [[{"Computer": "web-01", "TimeGenerated": "2025-08-04T12:30:00+00:00", "Value": 1.5}]]
+    print("✓ Records encoded")
+
+
+def test_columnar_format():
+    """Columnar output lists the column names once and the rows as arrays."""
+    result = json.loads(encode_tables([TABLE], COLUMNAR))
+    assert result == [{
+        "name": "PrimaryResult",
+        "columns": ["Computer", "TimeGenerated", "Value"],
+        "rows": [["web-01", "2025-08-04T12:30:00+00:00", 1.5]],
+    }]
+    print("✓ Columnar tables encoded")
+
+
+def test_output_format_validation():
+    """Missing formats default to records and unknown formats are rejected."""
+    assert normalize_output_format(None) == RECORDS
+    assert normalize_output_format(" Columnar ") == COLUMNAR
+    try:
+        normalize_output_format("csv")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Unknown output format accepted")
+    print("✓ Output formats validated")
+
+
+def test_result_table():
+    """ResultTable wraps the SDK rows without copying and serializes as records."""
+    table = ResultTable.from_logs_table(TABLE)
+    assert table.rows is TABLE.rows
+    assert not hasattr(table, "__dict__")
+    assert len(table) == 1
+    assert table.column("Computer") == ["web-01"]
+    assert table.to_records()[0]["Value"] == 1.5
+    assert table.to_columnar()["rows"] == [["web-01", TIMESTAMP, 1.5]]
+    assert json.loads(dumps([table])) == json.loads(encode_tables([TABLE], RECORDS))
+    assert encode_tables([table], COLUMNAR) == encode_tables([TABLE], COLUMNAR)
+    print("✓ ResultTable behaves like the SDK table")
+
+
+if __name__ == "__main__":
+    print("Testing table encoding...")
+    print("=" * 60)
+    test_records_format()
+    test_columnar_format()
+    test_output_format_validation()
+    test_result_table()
+    print("=" * 60)
+    print("All table encoding tests completed!")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for building MCP tool triggers from the tool function signatures.
+"""
+
+import asyncio
+import json
+import os
+import sys
+from typing import Annotated
+
+# Add the src directory to the path so we can import our utilities
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.logging_decorators import log_function_call
+from utils.tool_registry import ToolArgumentError, build_tool_spec
+
+DESCRIPTIONS = {
+    "workspace_id": "The workspace ID",
+    "tools": "Tools to run",
+    "bypass_cache": "Ignore cached results",
+    "top": "Maximum rows",
+    "columns": "Columns to return",
+    "filter": "Row predicates",
+}
+
+
+@log_function_call
+async def SampleToolAsync(workspace_id: str, tools: list[str] = None, bypass_cache: bool = False,
+                          top: int = None, columns=None, row_filter=None,
+                          timespan: Annotated[str, "Timespan from the hint"] = "30d") -> str:
+    return json.dumps({"workspace_id": workspace_id, "tools": tools, "bypass_cache": bypass_cache, "top": top,
+                       "columns": columns, "row_filter": row_filter, "timespan": timespan})
+
+
+SPEC = build_tool_spec("GetSample", SampleToolAsync, "A sample tool", DESCRIPTIONS, {"top": "Rows to keep"},
+                       {"row_filter": "filter"})
+
+
+def test_properties_from_signature():
+    """Property types come from the type hints, descriptions from the table, overrides or Annotated hints."""
+    properties = {prop["propertyName"]: prop for prop in json.loads(SPEC.properties_json)}
+    assert list(properties) == ["workspace_id", "tools", "bypass_cache", "top", "columns", "filter", "timespan"]
+    assert properties["tools"] == {"propertyName": "tools", "propertyType": "array", "description": "Tools to run",
+                                   "items": {"type": "string"}}
+    assert properties["bypass_cache"]["propertyType"] == "boolean"
+    assert properties["top"] == {"propertyName": "top", "propertyType": "integer", "description": "Rows to keep"}
+    assert properties["columns"]["propertyType"] == "string"
+    assert properties["filter"]["description"] == "Row predicates"
+    assert properties["timespan"]["description"] == "Timespan from the hint"
+    assert SPEC.function_name == "get_sample_function"
+
+    try:
+        build_tool_spec("GetSample", SampleToolAsync, "A sample tool", {})
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Missing argument description accepted")
+    print("✓ Tool properties generated from the signature")
+
+
+def test_argument_parsing():
+    """Arguments are converted by type and renamed to their keywords; nulls and unknown names are dropped."""
+    kwargs = SPEC.parse_arguments({"workspace_id": "ws", "tools": "GetAnomalies, GetSwConfig",
+                                   "bypass_cache": "true", "top": "10", "timespan": None, "other": 1,
+                                   "filter": "Value > 1", "row_filter": "ignored"})
+    assert kwargs == {"workspace_id": "ws", "tools": ["GetAnomalies", "GetSwConfig"], "bypass_cache": True,
+                      "top": 10, "row_filter": "Value > 1"}
+
+    for arguments, message in (({}, "workspace_id is required"),
+                               ({"workspace_id": "ws", "top": "ten"}, "top must be of type integer"),
+                               ({"workspace_id": "ws", "top": 1.5}, "top must be of type integer")):
+        try:
+            SPEC.parse_arguments(arguments)
+        except ToolArgumentError as e:
+            assert str(e) == message, str(e)
+        else:
+            raise AssertionError(f"Accepted {arguments}")
+    print("✓ Arguments parsed and validated")
+
+
+def test_handle_trigger_context():
+    """The trigger handler awaits the tool with the parsed arguments and returns errors as JSON."""
+    context = json.dumps({"arguments": {"workspace_id": "ws", "bypass_cache": False}})
+    result = json.loads(asyncio.run(SPEC.handle(context)))
+    assert result["workspace_id"] == "ws" and result["timespan"] == "30d"
+
+    assert json.loads(asyncio.run(SPEC.handle(json.dumps({"arguments": {}})))) == {"error": "workspace_id is required"}
+    assert "error" in json.loads(asyncio.run(SPEC.handle("not json")))
+    print("✓ Trigger context handled")
+
+
+if __name__ == "__main__":
+    print("Testing tool registry...")
+    print("=" * 60)
+    test_properties_from_signature()
+    test_argument_parsing()
+    test_handle_trigger_context()
+    print("=" * 60)
+    print("All tool registry tests completed!")
@@ -0,0 +1,153 @@
+import json
+import logging
+import warnings
+
+from utils.lazy_imports import lazy_import
+
+# numpy is only loaded when GetAnomalies scores its first series
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+# Robust z-score above which a bin is reported; 3.5 is the usual cut-off for median/MAD scores
+DEFAULT_ANOMALY_THRESHOLD = 3.5
+
+# Points per day of hourly series: the seasonal profile is the median usage of each time of day
+SEASONAL_PERIOD = 24
+
+# Days of history needed before the time-of-day profile replaces a flat median baseline
+MIN_SEASONAL_CYCLES = 3
+
+# Floor for the residual spread, in metric units, so flat series do not turn noise into huge scores
+MIN_SCALE = 1.0
+
+# Scale factor turning the median absolute deviation into a standard deviation estimate
+MAD_SCALE = 1.4826
+
+ANOMALY_COLUMNS = ["TimeGenerated", "Computer", "Namespace", "ActualUsage", "ExpectedUsage", "AnomalyScore"]
+
+
+def _array_value(value):
+    # make-series columns are dynamic arrays; depending on the SDK they arrive parsed or as JSON text
+    return json.loads(value) if isinstance(value, str) else (value or [])
+
+
+def read_series(response):
+    """
+    Read the make-series result of the anomalies query from a Log Analytics response.
+
+    Accepts records or columnar tables, and partial results ({"tables": ..., "partial_error": ...}).
+
+    Returns:
+        list: (Computer, Namespace, times, values) tuples, one per series
+    """
+    tables = json.loads(response) if isinstance(response, str) else response
+    if isinstance(tables, dict):
+        tables = tables.get("tables") or []
+    series = []
+    for table in tables:
+        if isinstance(table, dict):
+            rows = [dict(zip(table["columns"], row)) for row in table["rows"]]
+        else:
+            rows = table
+        for row in rows:
+            series.append((row.get("Computer"), row.get("Namespace"),
+                           _array_value(row.get("TimeGenerated")), _array_value(row.get("AvgValue"))))
+    return series
+
+
+def _expected_usage(values, period):
+    """Baseline per bin: the time-of-day median when there is enough history, else the series median."""
+    bins = values.shape[1]
+    if period < 2 or bins < period * MIN_SEASONAL_CYCLES:
+        return np.repeat(np.nanmedian(values, axis=1, keepdims=True), bins, axis=1)
+
+    slots = np.arange(bins) % period
+    profile = np.stack([np.nanmedian(values[:, slots == slot], axis=1) for slot in range(period)], axis=1)
+    expected = profile[:, slots]
+    # Hours never measured fall back to the series median
+    fallback = np.repeat(np.nanmedian(values, axis=1, keepdims=True), bins, axis=1)
+    return np.where(np.isnan(expected), fallback, expected)
+
+
+def score_series(values, period=SEASONAL_PERIOD, signs=None):
+    """
+    Score every bin of a batch of equally long series against its seasonal baseline.
+
+    Args:
+        values (ndarray): Series x bins matrix of usage values, NaN for missing bins
+        period (int): Bins per day; below 2 there is no time-of-day profile
+        signs (ndarray, optional): Column of 1 per series, or -1 where a drop is the anomaly
+
+    Returns:
+        tuple: (expected usage, anomaly scores) matrices of the same shape; scores are robust
+            z-scores of the usage above the baseline (below it for -1 series) and are NaN where
+            there is no measurement
+    """
+    with warnings.catch_warnings():
+        # Series without any measurement produce all-NaN slices; their scores stay NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        expected = _expected_usage(values, period)
+        residuals = values - expected
+        if signs is not None:
+            residuals = residuals * signs
+        spread = np.nanmedian(np.abs(residuals - np.nanmedian(residuals, axis=1, keepdims=True)), axis=1,
+                              keepdims=True)
+        scale = np.fmax(spread * MAD_SCALE, MIN_SCALE)
+        scores = residuals / scale
+    return expected, scores
+
+
+def detect_anomalies(series, threshold=DEFAULT_ANOMALY_THRESHOLD, max_results=None, include_expected=True,
+                     period=SEASONAL_PERIOD, low_is_bad=()):
+    """
+    Find the bins whose usage is far above the expected usage of their series.
+
+    Series with the same number of bins (all of them, for a make-series query) are scored together
+    as one matrix, so thousands of servers are handled in a single vectorized pass.
+
+    Args:
+        series (list): (Computer, Namespace, times, values) tuples from read_series
+        threshold (float): Minimum AnomalyScore reported
+        max_results (int, optional): Keep only the highest scores
+        include_expected (bool): Return the ExpectedUsage column
+        period (int): Bins per day of the series, SEASONAL_PERIOD for hourly bins
+        low_is_bad (iterable): Namespaces whose anomalies are drops below the expected value
+
+    Returns:
+        tuple: (columns, rows) with rows sorted by AnomalyScore, highest first
+    """
+    by_length = {}
+    for item in series:
+        if len(item[3]) != len(item[2]):
+            logger.warning(f"Skipping series {item[0]}/{item[1]}: {len(item[2])} times for {len(item[3])} values")
+            continue
+        if len(item[3]):
+            by_length.setdefault(len(item[3]), []).append(item)
+
+    anomalies = []
+    for group in by_length.values():
+        # None (missing bins in JSON series) becomes NaN
+        values = np.array([item[3] for item in group], dtype=float)
+        signs = np.array([[-1.0 if item[1] in low_is_bad else 1.0] for item in group])
+        expected, scores = score_series(values, period, signs)
+        hits = np.argwhere(np.nan_to_num(scores, nan=-np.inf) >= threshold)
+        for series_index, bin_index in hits.tolist():
+            computer, namespace, times, _ = group[series_index]
+            anomalies.append([
+                times[bin_index], computer, namespace,
+                round(float(values[series_index, bin_index]), 2),
+                round(float(expected[series_index, bin_index]), 2),
+                round(float(scores[series_index, bin_index]), 2),
+            ])
+
+    anomalies.sort(key=lambda row: row[5], reverse=True)
+    if max_results:
+        anomalies = anomalies[:max_results]
+    logger.info(f"Scored {sum(len(group) for group in by_length.values())} series, {len(anomalies)} anomalies")
+
+    if include_expected:
+        return list(ANOMALY_COLUMNS), anomalies
+    expected_index = ANOMALY_COLUMNS.index("ExpectedUsage")
+    columns = [column for column in ANOMALY_COLUMNS if column != "ExpectedUsage"]
+    return columns, [row[:expected_index] + row[expected_index + 1:] for row in anomalies]
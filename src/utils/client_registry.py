@@ -0,0 +1,224 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+LOGS_CLIENT = "logs"
+RESOURCE_GRAPH_CLIENT = "resource_graph"
+
+DEFAULT_ENDPOINTS = {
+    LOGS_CLIENT: "https://api.loganalytics.io/v1",
+    RESOURCE_GRAPH_CLIENT: "https://management.azure.com",
+}
+
+# Keep-alive connections kept open per host in the shared pool
+DEFAULT_POOL_MAXSIZE = 20
+
+
+def _build_logs_client(credential, endpoint, registry):
+    """Create a LogsQueryClient that uses the shared connection pool."""
+    from azure.monitor.query import LogsQueryClient
+    return LogsQueryClient(credential, endpoint=endpoint, transport=registry.create_transport())
+
+
+def _build_resource_graph_client(credential, endpoint, registry):
+    """Create a ResourceGraphClient that uses the shared connection pool."""
+    from azure.mgmt.resourcegraph import ResourceGraphClient
+    return ResourceGraphClient(credential, base_url=endpoint, transport=registry.create_transport())
+
+
+class ClientRegistry:
+    """
+    Registry of long-lived Azure SDK clients, one per (kind, credential, endpoint).
+
+    Clients are created on first use and kept for the life of the worker. All of them
+    share one keep-alive HTTP connection pool, so repeated tool calls reuse TLS sessions
+    instead of building a new pipeline per request.
+    """
+
+    def __init__(self, pool_maxsize=DEFAULT_POOL_MAXSIZE):
+        logger.info("Initializing ClientRegistry")
+        self.pool_maxsize = pool_maxsize
+        self._clients = {}
+        self._factories = {
+            LOGS_CLIENT: _build_logs_client,
+            RESOURCE_GRAPH_CLIENT: _build_resource_graph_client,
+        }
+        self._session = None
+        self._lock = threading.RLock()
+
+    def register_factory(self, kind, factory):
+        """
+        Register the factory used to build clients of a given kind.
+
+        Args:
+            kind (str): Client kind, e.g. LOGS_CLIENT
+            factory (callable): Called as factory(credential, endpoint, registry)
+        """
+        with self._lock:
+            self._factories[kind] = factory
+
+    def create_transport(self):
+        """Create an SDK transport bound to the shared keep-alive session."""
+        from azure.core.pipeline.transport import RequestsTransport
+
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_maxsize, pool_maxsize=self.pool_maxsize)
+                session.mount("https://", adapter)
+                self._session = session
+                logger.info(f"Created shared HTTP session with pool size {self.pool_maxsize}")
+            # The registry owns the session, so the transport must not close it
+            return RequestsTransport(session=self._session, session_owner=False)
+
+    def get_client(self, kind, credential, endpoint=None):
+        """
+        Get the shared client for a credential and endpoint, creating it on first use.
+
+        Args:
+            kind (str): Client kind, e.g. LOGS_CLIENT or RESOURCE_GRAPH_CLIENT
+            credential: The Azure credential the client authenticates with
+            endpoint (str, optional): Service endpoint; defaults to the public cloud
+
+        Returns:
+            The SDK client instance
+        """
+        endpoint = endpoint or DEFAULT_ENDPOINTS.get(kind)
+        key = (kind, credential, endpoint)
+
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                logger.info(f"Creating {kind} client for endpoint {endpoint}")
+                client = self._factories[kind](credential, endpoint, self)
+                self._clients[key] = client
+            return client
+
+    def logs_client(self, credential, endpoint=None):
+        """Get the shared LogsQueryClient."""
+        return self.get_client(LOGS_CLIENT, credential, endpoint)
+
+    def resource_graph_client(self, credential, endpoint=None):
+        """Get the shared ResourceGraphClient."""
+        return self.get_client(RESOURCE_GRAPH_CLIENT, credential, endpoint)
+
+    def rebuild(self, kind, credential, endpoint=None):
+        """
+        Close and recreate a client, e.g. after its connection pool got into a bad state.
+
+        Returns:
+            The new SDK client instance
+        """
+        endpoint = endpoint or DEFAULT_ENDPOINTS.get(kind)
+        with self._lock:
+            client = self._clients.pop((kind, credential, endpoint), None)
+            if client is not None:
+                self._close_client(client)
+            return self.get_client(kind, credential, endpoint)
+
+    def close(self):
+        """Close all clients and the shared HTTP session."""
+        with self._lock:
+            for client in self._clients.values():
+                self._close_client(client)
+            self._clients.clear()
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+        logger.info("Closed all registered clients")
+
+    @staticmethod
+    def _close_client(client):
+        try:
+            if hasattr(client, "close"):
+                client.close()
+        except Exception as e:
+            logger.warning(f"Failed to close client {type(client).__name__}: {str(e)}")
+
+    def __len__(self):
+        return len(self._clients)
+
+
+def _build_async_logs_client(credential, endpoint, registry):
+    """Create an async LogsQueryClient that uses the shared connection pool."""
+    from azure.monitor.query.aio import LogsQueryClient
+    return LogsQueryClient(credential, endpoint=endpoint, transport=registry.create_transport())
+
+
+def _build_async_resource_graph_client(credential, endpoint, registry):
+    """Create an async ResourceGraphClient that uses the shared connection pool."""
+    from azure.mgmt.resourcegraph.aio import ResourceGraphClient
+    return ResourceGraphClient(credential, base_url=endpoint, transport=registry.create_transport())
+
+
+class AsyncClientRegistry(ClientRegistry):
+    """
+    Registry of long-lived async (.aio) Azure SDK clients for the asyncio tool path.
+
+    Clients share one aiohttp session with a keep-alive connection pool. The session is
+    created on first use, inside the event loop that runs the tool calls.
+    """
+
+    def __init__(self, pool_maxsize=DEFAULT_POOL_MAXSIZE):
+        super().__init__(pool_maxsize)
+        self._factories = {
+            LOGS_CLIENT: _build_async_logs_client,
+            RESOURCE_GRAPH_CLIENT: _build_async_resource_graph_client,
+        }
+
+    def create_transport(self):
+        """Create an async SDK transport bound to the shared aiohttp session."""
+        from azure.core.pipeline.transport import AioHttpTransport
+
+        with self._lock:
+            if self._session is None:
+                import aiohttp
+
+                connector = aiohttp.TCPConnector(limit=self.pool_maxsize, keepalive_timeout=60)
+                self._session = aiohttp.ClientSession(connector=connector)
+                logger.info(f"Created shared aiohttp session with pool size {self.pool_maxsize}")
+            # The registry owns the session, so the transport must not close it
+            return AioHttpTransport(session=self._session, session_owner=False)
+
+    async def rebuild(self, kind, credential, endpoint=None):
+        """
+        Close and recreate a client, e.g. after its connection pool got into a bad state.
+
+        Returns:
+            The new SDK client instance
+        """
+        endpoint = endpoint or DEFAULT_ENDPOINTS.get(kind)
+        with self._lock:
+            client = self._clients.pop((kind, credential, endpoint), None)
+        if client is not None:
+            await self._close_client_async(client)
+        return self.get_client(kind, credential, endpoint)
+
+    async def close(self):
+        """Close all clients and the shared aiohttp session."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            session, self._session = self._session, None
+
+        for client in clients:
+            await self._close_client_async(client)
+        if session is not None:
+            await session.close()
+        logger.info("Closed all registered async clients")
+
+    @staticmethod
+    async def _close_client_async(client):
+        try:
+            if hasattr(client, "close"):
+                await client.close()
+        except Exception as e:
+            logger.warning(f"Failed to close client {type(client).__name__}: {str(e)}")
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_TIMEOUT_SECONDS = 120
+
+# How often running jobs are checked against their timeout
+_POLL_SECONDS = 0.05
+
+
+def _error_response(name, message):
+    logger.error(f"{name}: {message}")
+    return json.dumps({"error": message, "tool": name})
+
+
+def run_concurrently(jobs, max_concurrency=DEFAULT_MAX_CONCURRENCY, timeout=DEFAULT_TIMEOUT_SECONDS):
+    """
+    Run tool calls on a thread pool and return their responses in input order.
+
+    Args:
+        jobs (list): (name, function, kwargs) tuples; each function returns a JSON string
+        max_concurrency (int): Maximum number of jobs running at the same time
+        timeout (float): Seconds a job may run once started before it is reported as timed out
+
+    Returns:
+        list: One JSON string per job; failed or timed-out jobs return {"error": ..., "tool": name}
+    """
+    if not jobs:
+        return []
+
+    started = [None] * len(jobs)
+
+    def run(index, function, kwargs):
+        started[index] = time.monotonic()
+        return function(**kwargs)
+
+    results = [None] * len(jobs)
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(jobs))))
+    try:
+        futures = [executor.submit(run, index, function, kwargs) for index, (_, function, kwargs) in enumerate(jobs)]
+        pending = set(range(len(jobs)))
+        while pending:
+            now = time.monotonic()
+            for index in list(pending):
+                name = jobs[index][0]
+                future = futures[index]
+                if future.done():
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        results[index] = _error_response(name, f"{name} failed: {str(e)}")
+                    pending.discard(index)
+                elif started[index] is not None and now - started[index] >= timeout:
+                    # The thread cannot be interrupted; it finishes in the background and its result is dropped
+                    results[index] = _error_response(name, f"{name} timed out after {timeout}s")
+                    pending.discard(index)
+            if pending:
+                wait([futures[index] for index in pending], timeout=_POLL_SECONDS, return_when=FIRST_COMPLETED)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+async def run_concurrently_async(jobs, max_concurrency=DEFAULT_MAX_CONCURRENCY, timeout=DEFAULT_TIMEOUT_SECONDS):
+    """
+    Async version of run_concurrently for coroutine functions; timed-out jobs are cancelled.
+
+    Args:
+        jobs (list): (name, coroutine function, kwargs) tuples
+        max_concurrency (int): Maximum number of jobs awaited at the same time
+        timeout (float): Seconds a job may run once started
+
+    Returns:
+        list: One JSON string per job, in input order
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(name, function, kwargs):
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(function(**kwargs), timeout)
+            except TimeoutError:
+                return _error_response(name, f"{name} timed out after {timeout}s")
+            except Exception as e:
+                return _error_response(name, f"{name} failed: {str(e)}")
+
+    return list(await asyncio.gather(*(run(name, function, kwargs) for name, function, kwargs in jobs)))
@@ -0,0 +1,263 @@
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Refresh tokens this many seconds before they expire
+DEFAULT_REFRESH_MARGIN_SECONDS = 300
+
+
+def _token_key(scopes, tenant_id):
+    return (tuple(sorted(scopes)), tenant_id)
+
+
+def _authentication_error(errors):
+    from azure.core.exceptions import ClientAuthenticationError
+    return ClientAuthenticationError(
+        message="No credential in the chain was able to authenticate. " + "; ".join(errors)
+    )
+
+
+class _TokenCacheBase:
+    """Token cache and chain bookkeeping shared by the sync and async credentials."""
+
+    def __init__(self, credentials, refresh_margin=DEFAULT_REFRESH_MARGIN_SECONDS):
+        logger.info(f"Initializing {type(self).__name__}")
+        self.credentials = list(credentials)
+        if not self.credentials:
+            raise ValueError("At least one credential is required")
+        self.refresh_margin = refresh_margin
+        self._tokens = {}
+        self._active_index = None
+
+    @property
+    def active_credential(self):
+        """The credential that produced the most recent token, or None."""
+        if self._active_index is None:
+            return None
+        return self.credentials[self._active_index]
+
+    def _needs_refresh(self, token):
+        """Check whether a cached token is inside the refresh window."""
+        refresh_on = getattr(token, "refresh_on", None)
+        if refresh_on:
+            return time.time() >= refresh_on
+        return time.time() >= token.expires_on - self.refresh_margin
+
+    def _credential_order(self):
+        """Indexes of the chain links, starting with the one that worked last time."""
+        order = list(range(len(self.credentials)))
+        if self._active_index is not None:
+            order.remove(self._active_index)
+            order.insert(0, self._active_index)
+        return order
+
+    def _set_active(self, index):
+        if index != self._active_index:
+            logger.info(f"Using credential: {type(self.credentials[index]).__name__}")
+            self._active_index = index
+
+    def _cached_token(self, key, claims):
+        """Return the cached token if it can be used without refreshing."""
+        token = self._tokens.get(key)
+        if claims is None and token is not None and not self._needs_refresh(token):
+            return token
+        return None
+
+    def _valid_token(self, key, claims):
+        """Return the cached token if it has not expired yet, even if it is due for a refresh."""
+        token = self._tokens.get(key)
+        if claims is None and token is not None and time.time() < token.expires_on:
+            return token
+        return None
+
+    def _fallback_token(self, key, claims):
+        """Return the cached token if it is still valid after a failed refresh."""
+        token = self._valid_token(key, claims)
+        if token is not None:
+            logger.warning("Token refresh failed, using cached token until it expires")
+        return token
+
+
+class CachedTokenCredential(_TokenCacheBase):
+    """
+    Process-wide credential that caches access tokens in memory.
+
+    Wraps an ordered list of Azure credentials (the same links a ChainedTokenCredential
+    would try) and adds two things the SDK chain does not do:
+    - Access tokens are cached per (scopes, tenant) and refreshed proactively before expiry.
+    - The link that last produced a token is tried first, so failing links
+      (e.g. Azure CLI on a Function App instance) are skipped on later calls.
+    """
+
+    def __init__(self, credentials, refresh_margin=DEFAULT_REFRESH_MARGIN_SECONDS):
+        super().__init__(credentials, refresh_margin)
+        self._lock = threading.Lock()
+
+    def _request_token(self, scopes, claims, tenant_id, **kwargs):
+        """Request a new token, starting with the link that worked last time."""
+        errors = []
+        for index in self._credential_order():
+            credential = self.credentials[index]
+            try:
+                token = credential.get_token(*scopes, claims=claims, tenant_id=tenant_id, **kwargs)
+            except Exception as e:
+                errors.append(f"{type(credential).__name__}: {str(e)}")
+                logger.debug(f"Credential {type(credential).__name__} failed: {str(e)}")
+                continue
+
+            self._set_active(index)
+            return token
+
+        self._active_index = None
+        raise _authentication_error(errors)
+
+    def get_token(self, *scopes, claims=None, tenant_id=None, **kwargs):
+        """
+        Get an access token for the requested scopes, served from the cache when possible.
+
+        Args:
+            *scopes: The scopes the token should be valid for
+            claims (str, optional): Additional claims; a claims challenge always bypasses the cache
+            tenant_id (str, optional): Tenant to request the token from
+
+        Returns:
+            AccessToken: The token returned by the underlying credential
+        """
+        key = _token_key(scopes, tenant_id)
+        token = self._cached_token(key, claims)
+        if token is not None:
+            return token
+
+        valid_token = self._valid_token(key, claims)
+        if valid_token is not None:
+            # Another thread is already refreshing; keep serving the current token
+            if not self._lock.acquire(blocking=False):
+                return valid_token
+        else:
+            self._lock.acquire()
+
+        try:
+            # Re-check in case another thread refreshed the token while we waited
+            token = self._cached_token(key, claims)
+            if token is not None:
+                return token
+
+            try:
+                token = self._request_token(scopes, claims, tenant_id, **kwargs)
+            except Exception:
+                token = self._fallback_token(key, claims)
+                if token is not None:
+                    return token
+                raise
+
+            self._tokens[key] = token
+            return token
+        finally:
+            self._lock.release()
+
+    def clear(self):
+        """Drop all cached tokens and forget the active credential."""
+        with self._lock:
+            self._tokens.clear()
+            self._active_index = None
+
+    def close(self):
+        """Close the underlying credentials."""
+        for credential in self.credentials:
+            if hasattr(credential, "close"):
+                credential.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class AsyncCachedTokenCredential(_TokenCacheBase):
+    """
+    Async counterpart of CachedTokenCredential for the azure.identity.aio credentials,
+    used by the asyncio-native tool path.
+    """
+
+    def __init__(self, credentials, refresh_margin=DEFAULT_REFRESH_MARGIN_SECONDS):
+        super().__init__(credentials, refresh_margin)
+        self._lock = asyncio.Lock()
+
+    async def _request_token(self, scopes, claims, tenant_id, **kwargs):
+        """Request a new token, starting with the link that worked last time."""
+        errors = []
+        for index in self._credential_order():
+            credential = self.credentials[index]
+            try:
+                token = await credential.get_token(*scopes, claims=claims, tenant_id=tenant_id, **kwargs)
+            except Exception as e:
+                errors.append(f"{type(credential).__name__}: {str(e)}")
+                logger.debug(f"Credential {type(credential).__name__} failed: {str(e)}")
+                continue
+
+            self._set_active(index)
+            return token
+
+        self._active_index = None
+        raise _authentication_error(errors)
+
+    async def get_token(self, *scopes, claims=None, tenant_id=None, **kwargs):
+        """
+        Get an access token for the requested scopes, served from the cache when possible.
+
+        Args:
+            *scopes: The scopes the token should be valid for
+            claims (str, optional): Additional claims; a claims challenge always bypasses the cache
+            tenant_id (str, optional): Tenant to request the token from
+
+        Returns:
+            AccessToken: The token returned by the underlying credential
+        """
+        key = _token_key(scopes, tenant_id)
+        token = self._cached_token(key, claims)
+        if token is not None:
+            return token
+
+        # Another task is already refreshing; keep serving the current token
+        valid_token = self._valid_token(key, claims)
+        if valid_token is not None and self._lock.locked():
+            return valid_token
+
+        async with self._lock:
+            # Re-check in case another task refreshed the token while we waited
+            token = self._cached_token(key, claims)
+            if token is not None:
+                return token
+
+            try:
+                token = await self._request_token(scopes, claims, tenant_id, **kwargs)
+            except Exception:
+                token = self._fallback_token(key, claims)
+                if token is not None:
+                    return token
+                raise
+
+            self._tokens[key] = token
+            return token
+
+    async def clear(self):
+        """Drop all cached tokens and forget the active credential."""
+        async with self._lock:
+            self._tokens.clear()
+            self._active_index = None
+
+    async def close(self):
+        """Close the underlying credentials."""
+        for credential in self.credentials:
+            if hasattr(credential, "close"):
+                await credential.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
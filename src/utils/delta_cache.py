@@ -0,0 +1,113 @@
+import datetime
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+TIME_COLUMN = "TimeGenerated"
+
+# Records can reach Log Analytics minutes after their TimeGenerated, so each delta query
+# goes back this far before the high-water mark; the overlap is removed when merging
+DEFAULT_OVERLAP = datetime.timedelta(minutes=15)
+
+_TIMESPAN_UNITS = {"d": "days", "h": "hours", "m": "minutes", "s": "seconds"}
+
+
+def parse_timespan(timespan):
+    """
+    Convert a KQL timespan such as '30d', '12h' or '90m' to a timedelta.
+
+    Returns:
+        timedelta: The window length, or None if the timespan is not in that form
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([dhms])\s*", str(timespan or "").lower())
+    if not match:
+        return None
+    return datetime.timedelta(**{_TIMESPAN_UNITS[match.group(2)]: float(match.group(1))})
+
+
+def parse_time(value):
+    """Parse a TimeGenerated value from an encoded result (ISO 8601 string) into an aware datetime."""
+    if isinstance(value, datetime.datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=datetime.UTC)
+
+
+def high_water_mark(columns, rows):
+    """Return the latest TimeGenerated of the rows as an ISO string, or None if there is none."""
+    index = columns.index(TIME_COLUMN)
+    times = [parse_time(row[index]) for row in rows]
+    times = [time for time in times if time is not None]
+    return max(times).isoformat() if times else None
+
+
+def delta_since(high_water, overlap=DEFAULT_OVERLAP):
+    """Lower TimeGenerated bound for the next delta query, as a KQL datetime literal value."""
+    since = parse_time(high_water) - overlap
+    return since.astimezone(datetime.UTC).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _row_key(row, indexes):
+    return tuple(repr(row[index]) for index in indexes)
+
+
+def merge_rows(columns, baseline, new_rows, key_columns=None, timespan=None, order_by=TIME_COLUMN,
+               descending=True, max_rows=None, per_computer=False, now=None):
+    """
+    Merge the rows of a delta query into the cached baseline rows.
+
+    Args:
+        columns (list): Column names shared by both row lists
+        baseline (list): Rows kept from the previous calls
+        new_rows (list): Rows returned by the delta query; they replace baseline rows with the same key
+        key_columns (list, optional): Columns identifying a row; all columns when not given
+        timespan (str, optional): Tool window; rows older than it are dropped like a full query would
+        order_by (str): Column the tool sorts by
+        descending (bool): Sort direction of the tool
+        max_rows (int, optional): Row limit of the tool, applied per computer when per_computer is set
+        per_computer (bool): Whether max_rows applies to each Computer separately
+        now (datetime, optional): Current time, for tests
+
+    Returns:
+        list: The merged rows, in the tool's order and within its limits
+    """
+    indexes = [columns.index(column) for column in (key_columns or columns)]
+    merged = {}
+    for row in baseline:
+        merged[_row_key(row, indexes)] = row
+    for row in new_rows:
+        merged[_row_key(row, indexes)] = row
+    rows = list(merged.values())
+
+    window = parse_timespan(timespan)
+    if window is not None and TIME_COLUMN in columns:
+        oldest = (now or datetime.datetime.now(datetime.UTC)) - window
+        time_index = columns.index(TIME_COLUMN)
+        rows = [row for row in rows if (parse_time(row[time_index]) or oldest) >= oldest]
+
+    sort_index = columns.index(order_by)
+    if order_by == TIME_COLUMN:
+        minimum = datetime.datetime.min.replace(tzinfo=datetime.UTC)
+        rows.sort(key=lambda row: parse_time(row[sort_index]) or minimum, reverse=descending)
+    else:
+        rows.sort(key=lambda row: str(row[sort_index]), reverse=descending)
+
+    if max_rows:
+        if per_computer:
+            computer_index = columns.index("Computer")
+            counts = {}
+            kept = []
+            for row in rows:
+                count = counts.get(row[computer_index], 0)
+                if count < max_rows:
+                    counts[row[computer_index]] = count + 1
+                    kept.append(row)
+            rows = kept
+        else:
+            rows = rows[:max_rows]
+    return rows
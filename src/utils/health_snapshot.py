@@ -0,0 +1,155 @@
+import json
+import logging
+
+from utils.server_filter import matches_server
+
+logger = logging.getLogger(__name__)
+
+# Items listed per section of a server document; the counts always cover every row
+MAX_ITEMS_PER_SECTION = 5
+
+# Resource Graph metadata columns kept in the snapshot (the rest duplicate the document key)
+METADATA_COLUMNS = ("location", "resourceGroup", "OsVersion", "processor", "coreCount", "RamGB", "subnet",
+                    "mssqlDiscovered")
+
+
+def server_key(name):
+    """Lower-case host name without the domain, as Log Analytics often reports the FQDN of an Arc machine."""
+    return str(name).split(".", 1)[0].lower() if name else None
+
+
+def _resource_graph_rows(response):
+    return json.loads(response).get("data", [])
+
+
+def _log_analytics_rows(response):
+    rows = []
+    for table in json.loads(response):
+        if isinstance(table, dict):
+            columns = table["columns"]
+            rows.extend(dict(zip(columns, row)) for row in table["rows"])
+        else:
+            rows.extend(table)
+    return rows
+
+
+def _patch_summary(patches):
+    patches = [patch or {} for patch in patches]
+    return {
+        "missing": len(patches),
+        "critical": sum(1 for patch in patches if patch.get("msrcSeverity") == "Critical"),
+        "security": sum(1 for patch in patches if "Security" in (patch.get("classifications") or [])),
+        "reboot_required": sum(1 for patch in patches if patch.get("rebootBehavior") not in (None, "NeverReboots")),
+        "kb_ids": sorted({patch["kbId"] for patch in patches if patch.get("kbId")})[:MAX_ITEMS_PER_SECTION],
+    }
+
+
+def _best_practice_summary(rows):
+    rows = sorted(rows, key=lambda row: row.get("Weight") or 0, reverse=True)
+    return {
+        "issues": len(rows),
+        "total_weight": round(sum(row.get("Weight") or 0 for row in rows), 2),
+        "top": [
+            {"recommendation": row.get("Recommendation"), "area": row.get("ActionArea"), "weight": row.get("Weight")}
+            for row in rows[:MAX_ITEMS_PER_SECTION]
+        ],
+    }
+
+
+def _anomaly_summary(rows):
+    by_namespace = {}
+    for row in rows:
+        by_namespace[row.get("Namespace")] = by_namespace.get(row.get("Namespace"), 0) + 1
+    peak = max(rows, key=lambda row: row.get("AnomalyScore") or 0)
+    return {
+        "count": len(rows),
+        "by_namespace": by_namespace,
+        "peak": {"namespace": peak.get("Namespace"), "value": peak.get("ActualUsage"),
+                 "expected": peak.get("ExpectedUsage"), "score": peak.get("AnomalyScore"),
+                 "time": peak.get("TimeGenerated")},
+    }
+
+
+def build_health_snapshot(metadata, patching, anomalies, win_bp, server_names=None, anomaly_limit=None):
+    """
+    Join the inventory, patching, anomaly and best practice results into one document per server.
+
+    Args:
+        metadata (str): GetServerMetadata response
+        patching (str): GetPatchingLevel response
+        anomalies (str): GetAnomalies response (records or columnar)
+        win_bp (str): GetWinBpAssessment response (records or columnar)
+        server_names (list, optional): Names or prefixes ending in '*' to keep; all servers by default
+        anomaly_limit (int, optional): The top the anomalies were fetched with
+
+    Returns:
+        dict: {"servers": [...], "server_count", "errors"}. Rows join the inventory row of the same name,
+            or the only inventory row with the same host name; other computers get their own document.
+            A failed source is reported in errors and its section is left out, the other sections are
+            still returned. With anomaly_limit, "anomaly_limit" and "anomalies_truncated" tell whether
+            the highest scores only were kept.
+    """
+    servers = {}
+    errors = {}
+
+    sources = (
+        ("GetServerMetadata", metadata, _resource_graph_rows),
+        ("GetPatchingLevel", patching, _resource_graph_rows),
+        ("GetAnomalies", anomalies, _log_analytics_rows),
+        ("GetWinBpAssessment", win_bp, _log_analytics_rows),
+    )
+    rows_by_source = {}
+    for tool_name, response, parse in sources:
+        try:
+            if not response or response.startswith('{"error"'):
+                errors[tool_name] = json.loads(response)["error"] if response else "No response"
+                continue
+            rows_by_source[tool_name] = parse(response)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.error(f"build_health_snapshot: unexpected {tool_name} response: {str(e)}")
+            errors[tool_name] = f"Unexpected response: {str(e)}"
+
+    # Inventory documents by lower-case name, and the inventory names sharing each host name
+    inventory = {}
+    for row in rows_by_source.get("GetServerMetadata", []):
+        if row.get("name"):
+            document = servers.setdefault(row["name"].lower(), {"name": row["name"]})
+            document.update({column: row.get(column) for column in METADATA_COLUMNS})
+            inventory.setdefault(server_key(row["name"]), set()).add(row["name"].lower())
+
+    def document_key(computer):
+        """The document of a computer: its inventory row, found by host name when that is unambiguous."""
+        key = computer.lower()
+        if key in servers:
+            return key
+        candidates = inventory.get(server_key(computer), ())
+        if len(candidates) == 1:
+            return next(iter(candidates))
+        servers[key] = {"name": computer}
+        return key
+
+    grouped = {"patches": {}, "anomalies": {}, "best_practices": {}}
+    sections = (("patches", "GetPatchingLevel", "ServerName", lambda row: row.get("MissedPatch")),
+                ("anomalies", "GetAnomalies", "Computer", None),
+                ("best_practices", "GetWinBpAssessment", "Computer", None))
+    for section, tool_name, column, item in sections:
+        for row in rows_by_source.get(tool_name, []):
+            if row.get(column):
+                grouped[section].setdefault(document_key(row[column]), []).append(item(row) if item else row)
+
+    summaries = {"patches": _patch_summary, "anomalies": _anomaly_summary, "best_practices": _best_practice_summary}
+    for section, by_document in grouped.items():
+        for key, rows in by_document.items():
+            servers[key][section] = summaries[section](rows)
+
+    documents = [
+        document for document in servers.values()
+        if not server_names or matches_server(document["name"], server_names)
+        or matches_server(server_key(document["name"]), server_names)
+    ]
+    documents.sort(key=lambda document: (server_key(document["name"]), document["name"].lower()))
+    snapshot = {"servers": documents, "server_count": len(documents), "errors": errors}
+    if anomaly_limit:
+        snapshot["anomaly_limit"] = anomaly_limit
+        snapshot["anomalies_truncated"] = len(rows_by_source.get("GetAnomalies", [])) >= anomaly_limit
+    return snapshot
@@ -0,0 +1,87 @@
+import importlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Import cost in seconds per module or startup phase, in the order they were loaded
+_import_times = {}
+_lock = threading.Lock()
+
+
+def _record(name, seconds, phase):
+    with _lock:
+        _import_times[name] = {"seconds": seconds, "phase": phase}
+
+
+class LazyModule:
+    """
+    Module proxy that imports the real module on first attribute access.
+
+    Lets modules declare heavy dependencies (Azure SDKs, pandas) at module level
+    without paying for them until a tool that needs them actually runs.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            start = time.perf_counter()
+            module = importlib.import_module(self._name)
+            elapsed = time.perf_counter() - start
+            if self._module is None:
+                self._module = module
+                _record(self._name, elapsed, "lazy")
+                logger.info(f"Loaded {self._name} on first use in {elapsed * 1000:.1f} ms")
+        return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazy_import(name):
+    """Return a proxy for the module `name` that is imported on first use."""
+    return LazyModule(name)
+
+
+@contextmanager
+def timed_import(label):
+    """Measure the imports done inside the block and record them under label for the startup report."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(label, time.perf_counter() - start, "startup")
+
+
+def get_import_report():
+    """
+    Return the import cost of every startup phase and lazily loaded module so far.
+
+    Returns:
+        list: {"module", "phase", "ms"} entries, most expensive first
+    """
+    with _lock:
+        entries = [
+            {"module": name, "phase": entry["phase"], "ms": round(entry["seconds"] * 1000, 1)}
+            for name, entry in _import_times.items()
+        ]
+    return sorted(entries, key=lambda entry: entry["ms"], reverse=True)
+
+
+def log_import_report(report_logger=None):
+    """Log the import report, one line per module."""
+    report_logger = report_logger or logger
+    report = get_import_report()
+    total = sum(entry["ms"] for entry in report if entry["phase"] == "startup")
+    report_logger.info(f"Startup import cost: {total:.1f} ms")
+    for entry in report:
+        report_logger.info(f"  {entry['module']:<40} {entry['ms']:8.1f} ms ({entry['phase']})")
@@ -1,28 +1,35 @@
 import json
 import logging
 import datetime
-import azure
-import azure.monitor.query
-from azure.monitor.query import LogsQueryStatus
 from utils.logging_decorators import log_method_call
-from dateutil.relativedelta import relativedelta
-from azure.identity import AzureCliCredential
-from azure.core.exceptions import HttpResponseError
-from azure.monitor.query import LogsQueryClient
+from utils.table_encoding import DATAFRAME, OUTPUT_FORMATS, ResultTable, encode_tables
+from utils.lazy_imports import lazy_import
 from datetime import timedelta
 import re
 import time
 
 logger = logging.getLogger(__name__)
 
+# Azure SDK modules are imported on first use to keep cold starts short
+azure_identity = lazy_import("azure.identity")
+azure_exceptions = lazy_import("azure.core.exceptions")
+monitor_query = lazy_import("azure.monitor.query")
+
+# The Log Analytics batch API accepts at most 10 queries per request
+MAX_BATCH_QUERIES = 10
+
 class LogAnalyticsTool:
     """Tool for executing KQL queries on Azure Log Analytics."""
     
-    def __init__(self):
-        # Use AzureCliCredential which supports multiple authentication methods
+    def __init__(self, credential=None, client=None, output_format=None):
+        # Use provided credential or default to AzureCliCredential
         logger.info("Initializing LogAnalyticsTool")
-        self.credential = AzureCliCredential()
-        self.client = LogsQueryClient(self.credential)
+        self.credential = credential if credential else azure_identity.AzureCliCredential()
+        # Reuse a shared client when one is provided to avoid rebuilding the HTTP pipeline
+        self.client = client if client else monitor_query.LogsQueryClient(self.credential)
+        # None returns ResultTable objects, "dataframe" pandas DataFrames,
+        # and "records" or "columnar" encode the tables straight to JSON
+        self.output_format = output_format
         self.start_time = time.time()
     
     @log_method_call  # Applying logging decorator
@@ -64,6 +71,75 @@ class LogAnalyticsTool:
         logging.info(f"Parsed timespan: ({start_time}, {end_time})")
         return start_time, end_time
     
+    def _convert_tables(self, tables):
+        """Convert the tables of a query response into ResultTables, DataFrames or a JSON string, per output_format."""
+        if self.output_format in OUTPUT_FORMATS:
+            return encode_tables(tables, self.output_format)
+
+        result = [ResultTable.from_logs_table(table) for table in tables]
+        if self.output_format == DATAFRAME:
+            return [table.to_dataframe() for table in result]
+        return result
+
+    def _batch_requests(self, queries, workspace_id, timespan):
+        """Split queries into (names, LogsBatchQuery list) chunks the batch API accepts."""
+        parsed_timespan = self._parse_timespan(timespan)
+        names = list(queries)
+        for start in range(0, len(names), MAX_BATCH_QUERIES):
+            chunk = names[start:start + MAX_BATCH_QUERIES]
+            yield chunk, [
+                monitor_query.LogsBatchQuery(workspace_id=workspace_id, query=queries[name], timespan=parsed_timespan)
+                for name in chunk
+            ]
+
+    def _convert_batch_response(self, name, response):
+        """Convert one batch response into tables, partial results or an error."""
+        status = getattr(response, "status", None)
+        if status == monitor_query.LogsQueryStatus.SUCCESS:
+            return self._convert_tables(response.tables)
+        if status == monitor_query.LogsQueryStatus.PARTIAL:
+            logger.warning(f"Batch query {name} returned partial results: {response.partial_error}")
+            return {
+                "tables": self._convert_tables(response.partial_data),
+                "partial_error": str(response.partial_error)
+            }
+        message = getattr(response, "message", None) or str(response)
+        logger.error(f"Batch query {name} failed: {message}")
+        return {"error": message}
+
+    @log_method_call
+    def run_batch(self, queries, workspace_id, timespan=None):
+        """
+        Run several KQL queries against one workspace with the batch API.
+
+        Args:
+            queries (dict): Mapping of a name (e.g. the tool name) to its KQL query
+            workspace_id (str): The Log Analytics workspace ID
+            timespan (str, optional): The timespan applied to every query
+
+        Returns:
+            dict: Mapping of each name to its tables, or to {"error": ...} when that query failed.
+                  Partially successful queries return their tables plus a "partial_error".
+        """
+        results = {}
+
+        for chunk, requests in self._batch_requests(queries, workspace_id, timespan):
+            try:
+                logger.info(f"Submitting batch of {len(requests)} queries to workspace: {workspace_id}")
+                responses = self.client.query_batch(requests)
+            except Exception as e:
+                logger.error(f"Batch query failed: {str(e)}")
+                logger.error("Exception details:", exc_info=True)
+                for name in chunk:
+                    results[name] = {"error": str(e)}
+                continue
+
+            # Responses come back in the same order as the requests
+            for name, response in zip(chunk, responses):
+                results[name] = self._convert_batch_response(name, response)
+
+        return results
+
     @log_method_call
     def run_query(self, query, workspace_id, timespan=None):
         logger.info("Entering method: LogAnalyticsTool.run_query")
@@ -88,12 +164,7 @@ class LogAnalyticsTool:
                 timespan=parsed_timespan
             )
 
-            import pandas as pd
-            tables = []
-            for table in response.tables:
-                df = pd.DataFrame(data=table.rows, columns=table.columns)
-                tables.append(df)
-            return tables
+            return self._convert_tables(response.tables)
             """            
             if response.status == LogsQueryStatus.SUCCESS:
                 tables = []
@@ -125,7 +196,7 @@ class LogAnalyticsTool:
                 return {"error": f"Query failed with status: {response.status}"}
             """
                 
-        except azure.core.exceptions.ResourceNotFoundError as e:
+        except azure_exceptions.ResourceNotFoundError as e:
             logger.error(f"Workspace not found or inaccessible: {workspace_id}")
             logger.error(f"An unexpected error occurred: {str(e)}")
             logger.error(f"Exception details:", exc_info=True)
@@ -136,4 +207,62 @@ class LogAnalyticsTool:
             return {"error": str(e)}
         finally:
             execution_time = time.time() - start_time
-            logger.info(f"Exiting method: LogAnalyticsTool.run_query - Execution time: {execution_time:.4f}s")
\ No newline at end of file
+            logger.info(f"Exiting method: LogAnalyticsTool.run_query - Execution time: {execution_time:.4f}s")
+
+class AsyncLogAnalyticsTool(LogAnalyticsTool):
+    """
+    Asyncio counterpart of LogAnalyticsTool built on the .aio LogsQueryClient,
+    so many tool calls can wait on Log Analytics from a single worker thread.
+    """
+
+    def __init__(self, credential, client=None, output_format=None):
+        logger.info("Initializing AsyncLogAnalyticsTool")
+        self.credential = credential
+        if client is None:
+            from azure.monitor.query.aio import LogsQueryClient as AsyncLogsQueryClient
+            client = AsyncLogsQueryClient(self.credential)
+        self.client = client
+        self.output_format = output_format
+        self.start_time = time.time()
+
+    @log_method_call
+    async def run_batch(self, queries, workspace_id, timespan=None):
+        """Async version of LogAnalyticsTool.run_batch."""
+        results = {}
+
+        for chunk, requests in self._batch_requests(queries, workspace_id, timespan):
+            try:
+                logger.info(f"Submitting batch of {len(requests)} queries to workspace: {workspace_id}")
+                responses = await self.client.query_batch(requests)
+            except Exception as e:
+                logger.error(f"Batch query failed: {str(e)}")
+                logger.error("Exception details:", exc_info=True)
+                for name in chunk:
+                    results[name] = {"error": str(e)}
+                continue
+
+            for name, response in zip(chunk, responses):
+                results[name] = self._convert_batch_response(name, response)
+
+        return results
+
+    @log_method_call
+    async def run_query(self, query, workspace_id, timespan=None):
+        """Async version of LogAnalyticsTool.run_query."""
+        try:
+            logger.info(f"Attempting to query workspace: {workspace_id}")
+            response = await self.client.query_workspace(
+                workspace_id=workspace_id,
+                query=query,
+                timespan=self._parse_timespan(timespan)
+            )
+            return self._convert_tables(response.tables)
+
+        except azure_exceptions.ResourceNotFoundError as e:
+            logger.error(f"Workspace not found or inaccessible: {workspace_id}")
+            logger.error("Exception details:", exc_info=True)
+            return {"error": str(e)}
+        except Exception as e:
+            logger.error(f"An unexpected error occurred: {str(e)}")
+            logger.error("Exception details:", exc_info=True)
+            return {"error": str(e)}
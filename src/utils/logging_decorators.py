@@ -1,4 +1,5 @@
 import functools
+import inspect
 import logging
 import time
 from typing import Callable, Any
@@ -6,6 +7,7 @@ from typing import Callable, Any
 def log_function_call(func: Callable) -> Callable:
     """
     Decorator to log function entry and exit, along with time taken.
+    Works for both regular and async functions.
     
     Args:
         func: The function to be decorated.
@@ -13,6 +15,26 @@ def log_function_call(func: Callable) -> Callable:
     Returns:
         The decorated function.
     """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            logger = logging.getLogger(func.__module__)
+
+            logger.info(f"Entering function: {func.__name__}")
+            start_time = time.time()
+
+            try:
+                result = await func(*args, **kwargs)
+                execution_time = time.time() - start_time
+                logger.info(f"Exiting function: {func.__name__} - Execution time: {execution_time:.4f}s")
+                return result
+            except Exception as e:
+                execution_time = time.time() - start_time
+                logger.error(f"Exception in {func.__name__} after {execution_time:.4f}s: {str(e)}")
+                raise
+
+        return async_wrapper
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         logger = logging.getLogger(func.__module__)
@@ -35,6 +57,7 @@ def log_function_call(func: Callable) -> Callable:
 def log_method_call(method: Callable) -> Callable:
     """
     Decorator specifically for class methods, which handles 'self' correctly.
+    Works for both regular and async methods.
     
     Args:
         method: The class method to be decorated.
@@ -42,6 +65,27 @@ def log_method_call(method: Callable) -> Callable:
     Returns:
         The decorated method.
     """
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(self, *args, **kwargs):
+            logger = logging.getLogger(self.__class__.__module__)
+            method_name = f"{self.__class__.__name__}.{method.__name__}"
+
+            logger.info(f"Entering method: {method_name}")
+            start_time = time.time()
+
+            try:
+                result = await method(self, *args, **kwargs)
+                execution_time = time.time() - start_time
+                logger.info(f"Exiting method: {method_name} - Execution time: {execution_time:.4f}s")
+                return result
+            except Exception as e:
+                execution_time = time.time() - start_time
+                logger.error(f"Exception in {method_name} after {execution_time:.4f}s: {str(e)}")
+                raise
+
+        return async_wrapper
+
     @functools.wraps(method)
     def wrapper(self, *args, **kwargs):
         logger = logging.getLogger(self.__class__.__module__)
@@ -0,0 +1,109 @@
+import logging
+import math
+import re
+
+from utils.metric_rollups import DAY, HOUR
+from utils.server_filter import quote_kql_string
+
+logger = logging.getLogger(__name__)
+
+MINUTE = 60
+
+# Bin sizes GetAnomalies can use, smallest first; all of them divide a day so bins line up with days
+BIN_SIZES = (MINUTE, 5 * MINUTE, 15 * MINUTE, 30 * MINUTE, HOUR, 3 * HOUR, 6 * HOUR, 12 * HOUR, DAY)
+
+# Points per series the bin size is chosen for: a 30-day window gets 3h bins instead of 720 hourly ones
+MAX_POINTS_PER_SERIES = 240
+
+# Metrics analyzed when the caller does not choose
+DEFAULT_METRICS = ("Processor", "LogicalDisk")
+
+# Custom metrics: an InsightsMetrics namespace, optionally followed by /Name to read a single counter
+_METRIC_PATTERN = re.compile(r"^(?P<namespace>[A-Za-z][\w.\-]*)(?:/(?P<name>[A-Za-z][\w.\-]*))?$")
+
+
+class MetricSpec:
+    """An InsightsMetrics series GetAnomalies can score: a namespace, optionally restricted to some counters."""
+
+    __slots__ = ("label", "namespace", "names", "low_is_bad")
+
+    def __init__(self, label, namespace, names=None, low_is_bad=False):
+        self.label = label
+        self.namespace = namespace
+        self.names = tuple(names or ())
+        # For counters such as available memory a drop is the anomaly, not a rise
+        self.low_is_bad = low_is_bad
+
+    def condition(self):
+        """KQL predicate selecting the InsightsMetrics rows of this metric."""
+        condition = f"Namespace == {quote_kql_string(self.namespace)}"
+        if self.names:
+            condition += f" and Name in ({', '.join(quote_kql_string(name) for name in self.names)})"
+        return condition
+
+
+# Metrics known by name; the label is what GetAnomalies reports in its Namespace column
+METRIC_CATALOGUE = {spec.label.lower(): spec for spec in (
+    # CPU utilization in percent
+    MetricSpec("Processor", "Processor", ("UtilizationPercentage",)),
+    # Every logical disk counter, as GetAnomalies always read them
+    MetricSpec("LogicalDisk", "LogicalDisk"),
+    # Available memory in MB
+    MetricSpec("Memory", "Memory", ("AvailableMB",), low_is_bad=True),
+    # Network traffic in bytes per second
+    MetricSpec("Network", "Network", ("ReadBytesPerSecond", "WriteBytesPerSecond")),
+)}
+
+
+def parse_metrics(metrics):
+    """
+    Resolve the metrics argument into metric specs.
+
+    Args:
+        metrics (str or list, optional): Catalogue names (Processor, LogicalDisk, Memory, Network) or custom
+            "Namespace" / "Namespace/Name" entries, as a list or comma-separated string
+
+    Returns:
+        tuple: MetricSpec per metric, in the order given; the defaults when metrics is empty
+
+    Raises:
+        ValueError: If a metric is neither in the catalogue nor a valid namespace
+    """
+    if isinstance(metrics, str):
+        metrics = metrics.split(",")
+    labels = [metric.strip() for metric in (metrics or ()) if metric and metric.strip()] or list(DEFAULT_METRICS)
+
+    specs = []
+    for label in labels:
+        spec = METRIC_CATALOGUE.get(label.lower())
+        if spec is None:
+            match = _METRIC_PATTERN.match(label)
+            if not match:
+                raise ValueError(f"Invalid metric: {label}; use a namespace such as Memory or Namespace/Name")
+            names = (match.group("name"),) if match.group("name") else None
+            spec = MetricSpec(label, match.group("namespace"), names)
+        if spec.label not in (existing.label for existing in specs):
+            specs.append(spec)
+    return tuple(specs)
+
+
+def metric_label_expression(specs):
+    """KQL expression naming the metric of each InsightsMetrics row, empty for rows of no requested metric."""
+    cases = ", ".join(f"{spec.condition()}, {quote_kql_string(spec.label)}" for spec in specs)
+    return f"case({cases}, '')"
+
+
+def choose_bin_seconds(window_seconds, max_points=MAX_POINTS_PER_SERIES):
+    """Smallest bin size that keeps a window within max_points points per series."""
+    for bin_seconds in BIN_SIZES:
+        if math.ceil(window_seconds / bin_seconds) <= max_points:
+            return bin_seconds
+    return BIN_SIZES[-1]
+
+
+def kql_timespan(seconds):
+    """Format a bin size as a KQL timespan literal, e.g. 300 -> '5m'."""
+    for unit, size in (("d", DAY), ("h", HOUR), ("m", MINUTE)):
+        if seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
@@ -0,0 +1,287 @@
+import array
+import datetime
+import json
+import logging
+import math
+import struct
+import sys
+
+from utils.delta_cache import parse_time
+from utils.lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# The newest bins are read again on every call: the current one is still filling up
+# and records can reach Log Analytics after their TimeGenerated
+REFRESH_BINS = 2
+
+# Array type codes of the per-bin sums (float64) and sample counts (uint32)
+SUM_TYPE = "d"
+COUNT_TYPE = "I"
+
+# Binary layout of a serialized store: magic, big-endian arrays, has start, bin seconds, start, length,
+# series count; then per series the UTF-8 lengths of Computer and Namespace (-1 for None), the names,
+# and the raw sum and count arrays
+STORE_MAGIC = b"MRS1"
+STORE_HEADER = struct.Struct("<4s??qqqI")
+NAMES_HEADER = struct.Struct("<ii")
+
+
+def _zeros(typecode, length):
+    return array.array(typecode, bytes(array.array(typecode).itemsize * length))
+
+
+def format_bin_time(epoch):
+    """ISO 8601 UTC timestamp of a bin start, as Log Analytics returns TimeGenerated."""
+    return datetime.datetime.fromtimestamp(epoch, datetime.UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def rollup_window(now, window_seconds, bin_seconds=HOUR):
+    """
+    Align a query window to whole bins.
+
+    Returns:
+        tuple: (first bin start, end of the bin holding now), as epoch seconds
+    """
+    end = (int(now) // bin_seconds + 1) * bin_seconds
+    return end - math.ceil(window_seconds / bin_seconds) * bin_seconds, end
+
+
+def read_rollup_rows(response):
+    """
+    Read (Computer, Namespace, bin start epoch, sum, samples) rows from a rollup query response.
+
+    Accepts records or columnar tables, and partial results ({"tables": ..., "partial_error": ...}).
+    """
+    tables = json.loads(response) if isinstance(response, str) else response
+    if isinstance(tables, dict):
+        tables = tables.get("tables") or []
+    rows = []
+    for table in tables:
+        records = [dict(zip(table["columns"], row)) for row in table["rows"]] if isinstance(table, dict) else table
+        for record in records:
+            bin_time = parse_time(record.get("TimeGenerated"))
+            if bin_time is None:
+                continue
+            rows.append((record.get("Computer"), record.get("Namespace"), int(bin_time.timestamp()),
+                         float(record.get("Total") or 0.0), int(record.get("Samples") or 0)))
+    return rows
+
+
+class MetricRollupStore:
+    """
+    Sum and sample count of a metric per (Computer, Namespace) and bin, on one time axis shared by every series.
+
+    Each series is a pair of flat arrays indexed by bin, so a call only has to fetch the bins after
+    the last one stored and the averages of any window or coarser resolution are read back without
+    going to Log Analytics.
+    """
+
+    def __init__(self, bin_seconds=HOUR):
+        self.bin_seconds = bin_seconds
+        self.start = None
+        self.length = 0
+        self._sums = {}
+        self._counts = {}
+
+    @property
+    def end(self):
+        """End of the last stored bin, as epoch seconds (None when the store is empty)."""
+        return None if self.start is None else self.start + self.length * self.bin_seconds
+
+    def __len__(self):
+        return len(self._sums)
+
+    def clear(self):
+        self.start = None
+        self.length = 0
+        self._sums.clear()
+        self._counts.clear()
+
+    def copy(self):
+        """An independent copy, e.g. to merge a partial result without keeping it."""
+        store = MetricRollupStore(self.bin_seconds)
+        store.start, store.length = self.start, self.length
+        store._sums = {key: array.array(SUM_TYPE, values) for key, values in self._sums.items()}
+        store._counts = {key: array.array(COUNT_TYPE, values) for key, values in self._counts.items()}
+        return store
+
+    def fetch_start(self, window_start):
+        """First bin the next query has to read so the store covers the window up to now."""
+        if self.start is None or self.start > window_start:
+            return window_start
+        return max(window_start, self.end - REFRESH_BINS * self.bin_seconds)
+
+    def _extend(self, start, end):
+        """Grow the time axis so it covers [start, end), padding every series with empty bins."""
+        if self.start is None:
+            self.start, self.length = start, 0
+        if start < self.start:
+            pad = (self.start - start) // self.bin_seconds
+            for key in self._sums:
+                self._sums[key] = _zeros(SUM_TYPE, pad) + self._sums[key]
+                self._counts[key] = _zeros(COUNT_TYPE, pad) + self._counts[key]
+            self.start -= pad * self.bin_seconds
+            self.length += pad
+        if end > self.end:
+            pad = (end - self.end) // self.bin_seconds
+            for key in self._sums:
+                self._sums[key].extend(_zeros(SUM_TYPE, pad))
+                self._counts[key].extend(_zeros(COUNT_TYPE, pad))
+            self.length += pad
+
+    def merge(self, rows, since, until):
+        """
+        Store the bins of a rollup query that read [since, until).
+
+        Bins in that range are replaced, so re-reading the newest bins never counts samples twice.
+
+        Args:
+            rows (list): Rows from read_rollup_rows
+            since (int): Start of the range the query read, aligned to a bin
+            until (int): End of the range, aligned to a bin
+
+        Returns:
+            bool: Whether the store changed, i.e. whether it has to be saved again
+        """
+        axis = (self.start, self.length)
+        self._extend(since, until)
+        first = (since - self.start) // self.bin_seconds
+        # Only the replaced bins can change, so compare those
+        before = {}
+        for key in self._sums:
+            before[key] = (self._sums[key][first:].tobytes(), self._counts[key][first:].tobytes())
+            self._sums[key][first:] = _zeros(SUM_TYPE, self.length - first)
+            self._counts[key][first:] = _zeros(COUNT_TYPE, self.length - first)
+
+        for computer, namespace, bin_start, total, samples in rows:
+            index = (bin_start - self.start) // self.bin_seconds
+            if not first <= index < self.length:
+                continue
+            key = (computer, namespace)
+            if key not in self._sums:
+                self._sums[key] = _zeros(SUM_TYPE, self.length)
+                self._counts[key] = _zeros(COUNT_TYPE, self.length)
+            self._sums[key][index] += total
+            self._counts[key][index] += samples
+
+        return axis != (self.start, self.length) or before.keys() != self._sums.keys() or any(
+            before[key] != (self._sums[key][first:].tobytes(), self._counts[key][first:].tobytes())
+            for key in before
+        )
+
+    def trim(self, oldest):
+        """
+        Drop the bins before oldest and the series left without samples.
+
+        Returns:
+            bool: Whether any bin was dropped
+        """
+        if self.start is None or oldest <= self.start:
+            return False
+        drop = min((oldest - self.start) // self.bin_seconds, self.length)
+        for key in list(self._sums):
+            del self._sums[key][:drop]
+            del self._counts[key][:drop]
+            if not any(self._counts[key]):
+                del self._sums[key]
+                del self._counts[key]
+        self.start += drop * self.bin_seconds
+        self.length -= drop
+        return drop > 0
+
+    def series(self, window_start, window_end, bins_per_point=1):
+        """
+        Average of every series over [window_start, window_end), one value per point.
+
+        Args:
+            window_start (int): First bin start, epoch seconds
+            window_end (int): End of the window, epoch seconds
+            bins_per_point (int): Stored bins averaged into one point, e.g. 24 for daily points
+                from hourly bins
+
+        Returns:
+            list: (Computer, Namespace, times, values) tuples as read by the anomaly detector;
+                values is a float array with NaN for points without samples
+        """
+        step = self.bin_seconds * bins_per_point
+        points = max((window_end - window_start) // step, 0)
+        keys = sorted(self._sums, key=lambda key: tuple(map(str, key)))
+        if not keys or not points:
+            return []
+
+        # Views on the arrays, gathered into one series x bins matrix for the window
+        bins = points * bins_per_point
+        first = (window_start - self.start) // self.bin_seconds
+        low, high = max(first, 0), min(first + bins, self.length)
+        sums = np.zeros((len(keys), bins))
+        counts = np.zeros((len(keys), bins))
+        if low < high:
+            sums[:, low - first:high - first] = np.stack(
+                [np.frombuffer(self._sums[key], dtype=np.float64)[low:high] for key in keys])
+            counts[:, low - first:high - first] = np.stack(
+                [np.frombuffer(self._counts[key], dtype=np.uint32)[low:high] for key in keys])
+
+        sums = sums.reshape(len(keys), points, bins_per_point).sum(axis=2)
+        counts = counts.reshape(len(keys), points, bins_per_point).sum(axis=2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            values = np.where(counts > 0, sums / counts, np.nan)
+
+        times = [format_bin_time(window_start + point * step) for point in range(points)]
+        return [(computer, namespace, times, values[index]) for index, (computer, namespace) in enumerate(keys)]
+
+    def to_bytes(self):
+        """Serialize the store for the disk tier: a small header, then the arrays as raw bytes."""
+        parts = [STORE_HEADER.pack(STORE_MAGIC, sys.byteorder == "big", self.start is not None, self.bin_seconds,
+                                   self.start or 0, self.length, len(self._sums))]
+        for computer, namespace in self._sums:
+            names = [None if name is None else str(name).encode("utf-8") for name in (computer, namespace)]
+            parts.append(NAMES_HEADER.pack(*(-1 if name is None else len(name) for name in names)))
+            parts.extend(name for name in names if name)
+            parts.append(self._sums[(computer, namespace)].tobytes())
+            parts.append(self._counts[(computer, namespace)].tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Rebuild a store written by to_bytes; arrays written on a platform of the other byte order are swapped.
+
+        Raises:
+            ValueError: If the data is not a serialized store
+        """
+        try:
+            magic, big_endian, has_start, bin_seconds, start, length, count = STORE_HEADER.unpack_from(data)
+            if magic != STORE_MAGIC:
+                raise ValueError("not a metric rollup store")
+            store = cls(bin_seconds)
+            store.start, store.length = (start if has_start else None), length
+            view = memoryview(data)
+            offset = STORE_HEADER.size
+            swap = big_endian != (sys.byteorder == "big")
+            for _ in range(count):
+                sizes = NAMES_HEADER.unpack_from(data, offset)
+                offset += NAMES_HEADER.size
+                key = []
+                for size in sizes:
+                    key.append(None if size < 0 else bytes(view[offset:offset + size]).decode("utf-8"))
+                    offset += max(size, 0)
+                key = tuple(key)
+                for values, typecode in ((store._sums, SUM_TYPE), (store._counts, COUNT_TYPE)):
+                    series = array.array(typecode)
+                    end = offset + length * series.itemsize
+                    if end > len(data):
+                        raise ValueError("truncated metric rollup store")
+                    series.frombytes(view[offset:end])
+                    if swap:
+                        series.byteswap()
+                    values[key] = series
+                    offset = end
+        except struct.error as e:
+            raise ValueError(f"truncated metric rollup store: {str(e)}")
+        return store
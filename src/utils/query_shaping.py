@@ -0,0 +1,283 @@
+import logging
+import re
+
+from utils.server_filter import quote_kql_string
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for the top argument; larger results should be paged instead
+MAX_TOP = 10000
+
+# Column names, with dotted paths into dynamic columns (e.g. MissedPatch.kbId)
+_FIELD = r"[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*"
+_FIELD_PATTERN = re.compile(rf"^{_FIELD}$")
+
+# Operators allowed in filter predicates; longer operators first so "==" is not read as "="
+FILTER_OPERATORS = ("==", "!=", ">=", "<=", ">", "<", "=~", "!~", "!contains", "contains", "!has", "has",
+                    "startswith", "endswith")
+_OPERATOR = "|".join(re.escape(operator) for operator in FILTER_OPERATORS)
+_PREDICATE_PATTERN = re.compile(
+    rf"\s*(?P<field>{_FIELD})\s*(?P<operator>{_OPERATOR})\s*"
+    r"(?P<value>'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|[^\s;]+)"
+    r"\s*(?:(?:\band\b|;)\s*|$)",
+    re.IGNORECASE,
+)
+_NUMBER_PATTERN = re.compile(r"^-?\d+(\.\d+)?$")
+
+
+def _split(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [item.strip() for item in value if item and item.strip()]
+
+
+def _check_field(field):
+    if not _FIELD_PATTERN.match(field):
+        raise ValueError(f"Invalid column name: {field}")
+    return field
+
+
+def parse_columns(columns):
+    """
+    Parse the columns argument into (output name, expression) pairs.
+
+    Dotted paths project a field out of a dynamic column under its last name,
+    e.g. "MissedPatch.kbId" becomes "kbId = MissedPatch.kbId".
+    """
+    projection = []
+    names = set()
+    for column in _split(columns):
+        name = _check_field(column).rsplit(".", 1)[-1]
+        if name in names:
+            raise ValueError(f"Duplicate column in columns: {name}")
+        names.add(name)
+        projection.append((name, column))
+    return projection
+
+
+def _kql_value(field, raw):
+    """Return the KQL field expression and literal for a predicate value."""
+    if raw[0] in "'\"":
+        value = raw[1:-1].replace("\\" + raw[0], raw[0])
+        return (f"tostring({field})" if "." in field else field), quote_kql_string(value)
+    if _NUMBER_PATTERN.match(raw):
+        return (f"todouble({field})" if "." in field else field), raw
+    if raw.lower() in ("true", "false"):
+        return (f"tobool({field})" if "." in field else field), raw.lower()
+    return (f"tostring({field})" if "." in field else field), quote_kql_string(raw)
+
+
+def parse_filter(row_filter):
+    """
+    Split the filter argument into (field, operator, raw value) predicates.
+
+    Args:
+        row_filter (str or list): Predicates such as "location == westeurope and coreCount > 4";
+            a string may join them with "and" or ";", a list holds one predicate per item
+
+    Returns:
+        list: The predicates, with lowercase operators and values as written (quotes included)
+    """
+    text = " and ".join(row_filter) if isinstance(row_filter, (list, tuple)) else (row_filter or "")
+    predicates = []
+    position = 0
+    while text.strip() and position < len(text):
+        match = _PREDICATE_PATTERN.match(text, position)
+        if not match or match.end() == position:
+            raise ValueError(f"Invalid filter near: {text[position:].strip()}")
+        predicates.append((match.group("field"), match.group("operator").lower(), match.group("value")))
+        position = match.end()
+    return predicates
+
+
+def build_filter(row_filter):
+    """
+    Compile simple field predicates into a KQL where expression.
+
+    Returns:
+        str: The KQL boolean expression, or None when there is no filter
+    """
+    clauses = []
+    for field, operator, raw in parse_filter(row_filter):
+        field, value = _kql_value(field, raw)
+        clauses.append(f"{field} {operator} {value}")
+    return " and ".join(clauses) or None
+
+
+def parse_order_by(order_by):
+    """Parse "column [asc|desc]" items into KQL sort terms; the default direction is descending like KQL."""
+    terms = []
+    for item in _split(order_by):
+        parts = item.split()
+        if len(parts) > 2 or (len(parts) == 2 and parts[1].lower() not in ("asc", "desc")):
+            raise ValueError(f"Invalid order_by: {item}")
+        direction = parts[1].lower() if len(parts) == 2 else "desc"
+        terms.append(f"{_check_field(parts[0])} {direction}")
+    return terms
+
+
+def parse_top(top):
+    """Validate the top argument, which may arrive as a string from the trigger."""
+    if top is None or top == "":
+        return None
+    try:
+        top = int(top)
+    except (TypeError, ValueError):
+        raise ValueError(f"top must be an integer, got: {top}")
+    if top < 1 or top > MAX_TOP:
+        raise ValueError(f"top must be between 1 and {MAX_TOP}")
+    return top
+
+
+def shape_query(query, columns=None, row_filter=None, top=None, order_by=None, required_columns=()):
+    """
+    Append projection, filtering, ordering and a row limit to a tool's KQL query.
+
+    The filter runs on the tool's result columns before the projection, so it can use
+    columns that are not returned. order_by uses the returned column names.
+
+    Args:
+        query (str): The tool's KQL query
+        columns (str or list, optional): Columns to return, as a list or comma-separated string
+        row_filter (str or list, optional): Field predicates, see build_filter
+        top (int, optional): Maximum rows to return
+        order_by (str or list, optional): "column [asc|desc]" items
+        required_columns (tuple): Columns the tool needs in its result, added to the projection
+
+    Returns:
+        str: The shaped query (the original query when no shaping argument is given)
+    """
+    projection = parse_columns(columns)
+    where = build_filter(row_filter)
+    sort_terms = parse_order_by(order_by)
+    top = parse_top(top)
+
+    if projection:
+        names = {name for name, _ in projection}
+        projection.extend((column, column) for column in required_columns if column not in names)
+        names.update(required_columns)
+        for term in sort_terms:
+            if term.split()[0] not in names:
+                raise ValueError(f"order_by column is not in columns: {term.split()[0]}")
+
+    stages = [query.rstrip()]
+    if where:
+        stages.append(f"where {where}")
+    if projection:
+        stages.append("project " + ", ".join(
+            name if name == expression else f"{name} = {expression}" for name, expression in projection
+        ))
+    if sort_terms and top:
+        stages.append(f"top {top} by {', '.join(sort_terms)}")
+    elif sort_terms:
+        stages.append(f"sort by {', '.join(sort_terms)}")
+    elif top:
+        stages.append(f"take {top}")
+
+    shaped = " | ".join(stages)
+    if len(stages) > 1:
+        logger.debug(f"Shaped query: {shaped}")
+    return shaped
+
+
+# ----------------------------------------------------------
+# The same shaping applied to rows computed locally, for tools whose result columns do not exist in KQL
+
+def _local_value(raw):
+    if raw[0] in "'\"":
+        return raw[1:-1].replace("\\" + raw[0], raw[0])
+    if _NUMBER_PATTERN.match(raw):
+        return float(raw)
+    if raw.lower() in ("true", "false"):
+        return raw.lower() == "true"
+    return raw
+
+
+def _compare(actual, operator, expected):
+    """Evaluate one predicate with KQL semantics: == is case-sensitive, the string operators are not."""
+    if actual is None:
+        return operator in ("!=", "!~", "!contains", "!has")
+    if isinstance(expected, float) and not isinstance(actual, bool):
+        try:
+            actual = float(actual)
+        except (TypeError, ValueError):
+            return operator in ("!=", "!~")
+    elif not isinstance(expected, bool):
+        actual, expected = str(actual), str(expected)
+
+    if operator == "==":
+        return actual == expected
+    if operator == "!=":
+        return actual != expected
+    if operator in (">", ">=", "<", "<="):
+        try:
+            return {">": actual > expected, ">=": actual >= expected,
+                    "<": actual < expected, "<=": actual <= expected}[operator]
+        except TypeError:
+            return False
+
+    actual, expected = str(actual).lower(), str(expected).lower()
+    if operator in ("=~", "!~"):
+        result = actual == expected
+    elif operator in ("contains", "!contains"):
+        result = expected in actual
+    elif operator in ("has", "!has"):
+        result = re.search(rf"(?<![A-Za-z0-9]){re.escape(expected)}(?![A-Za-z0-9])", actual) is not None
+    elif operator == "startswith":
+        result = actual.startswith(expected)
+    else:
+        result = actual.endswith(expected)
+    return not result if operator.startswith("!") else result
+
+
+def _column_index(names, field, argument):
+    if "." in field:
+        raise ValueError(f"Dotted paths are not supported in {argument} for this tool: {field}")
+    if field not in names:
+        raise ValueError(f"Unknown column in {argument}: {field}")
+    return names.index(field)
+
+
+def shape_rows(columns, rows, selected=None, row_filter=None, top=None, order_by=None):
+    """
+    Apply the columns, filter, top and order_by arguments to rows computed by the tool itself.
+
+    Stages run in the same order as shape_query: filter, projection, then sort and row limit.
+
+    Args:
+        columns (list): Column names of the rows
+        rows (list): Row lists
+        selected (str or list, optional): The columns argument
+        row_filter, top, order_by: As for shape_query
+
+    Returns:
+        tuple: (columns, rows) after shaping
+    """
+    names = list(columns)
+    predicates = [
+        (_column_index(names, field, "filter"), operator, _local_value(raw))
+        for field, operator, raw in parse_filter(row_filter)
+    ]
+    projection = parse_columns(selected)
+    sort_terms = parse_order_by(order_by)
+    top = parse_top(top)
+
+    if predicates:
+        rows = [row for row in rows if all(_compare(row[index], operator, value)
+                                           for index, operator, value in predicates)]
+    if projection:
+        indexes = [_column_index(names, expression, "columns") for _, expression in projection]
+        names = [name for name, _ in projection]
+        rows = [[row[index] for index in indexes] for row in rows]
+    if sort_terms:
+        # Stable sorts from the last term to the first give a multi-column sort
+        for term in reversed(sort_terms):
+            field, direction = term.split()
+            index = _column_index(names, field, "order_by")
+            rows = sorted(rows, key=lambda row: (row[index] is not None, row[index] if row[index] is not None else 0),
+                          reverse=direction == "desc")
+    if top:
+        rows = rows[:top]
+    return names, rows
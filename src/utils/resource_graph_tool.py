@@ -1,34 +1,257 @@
+import asyncio
 import json
 import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from utils.logging_decorators import log_method_call
-from azure.identity import AzureCliCredential
-from azure.core.exceptions import HttpResponseError
-from azure.mgmt.resourcegraph import ResourceGraphClient
-from azure.mgmt.resourcegraph.models import QueryRequest, QueryRequestOptions
+from utils.lazy_imports import lazy_import
+
+# Azure SDK modules are imported on first use to keep cold starts short
+azure_identity = lazy_import("azure.identity")
+azure_exceptions = lazy_import("azure.core.exceptions")
+resourcegraph = lazy_import("azure.mgmt.resourcegraph")
+resourcegraph_models = lazy_import("azure.mgmt.resourcegraph.models")
 
 logger = logging.getLogger(__name__)
 
+# Resource Graph returns at most 1000 rows per page
+DEFAULT_PAGE_SIZE = 1000
+
+# Resource Graph accepts at most 1000 subscriptions per request
+MAX_SUBSCRIPTIONS_PER_REQUEST = 1000
+
+# Default number of subscription chunks queried concurrently
+DEFAULT_MAX_WORKERS = 4
+
+# Pages each subscription chunk may buffer ahead of the caller when fanning out
+FANOUT_BUFFER_PAGES = 2
+
+# How often a chunk waiting on a full buffer checks whether the caller stopped reading
+_POLL_SECONDS = 0.05
+
+# Marks the end of a chunk's pages in its buffer
+_END = object()
+
+
+def chunk_subscriptions(subscription_ids, chunk_size=MAX_SUBSCRIPTIONS_PER_REQUEST):
+    """Split a list of subscription IDs into chunks Resource Graph accepts in one request."""
+    iterator = iter(subscription_ids)
+    return [chunk for chunk in iter(lambda: list(islice(iterator, chunk_size)), [])]
+
+
+def _build_request(query, subscription_ids=None, management_groups=None, page_size=None, skip_token=None):
+    """Build the QueryRequest for one page of a Resource Graph query."""
+    options = resourcegraph_models.QueryRequestOptions(
+        result_format="objectArray", top=page_size, skip_token=skip_token
+    )
+    return resourcegraph_models.QueryRequest(
+        query=query,
+        subscriptions=subscription_ids,
+        management_groups=management_groups,
+        options=options
+    )
+
+
+def _trim_rows(rows, rows_returned, max_rows):
+    """Cut a page so that no more than max_rows rows are returned in total."""
+    if max_rows is not None and rows_returned + len(rows) > max_rows:
+        return rows[:max_rows - rows_returned]
+    return rows
+
+
+def _merge_page(page, total_records, rows_returned, max_rows):
+    """
+    Turn a page of one subscription chunk into a page of the fanned-out result.
+    The chunk's skip token is dropped: it would only resume that chunk, not the whole query.
+    """
+    rows = _trim_rows(page["data"], rows_returned, max_rows)
+    return {"data": rows, "count": len(rows), "total_records": total_records, "skip_token": None}
+
+
+def _put_page(pages_queue, item, stop):
+    """Put a page in a chunk's buffer, waiting while it is full; False once the caller stopped reading."""
+    while not stop.is_set():
+        try:
+            pages_queue.put(item, timeout=_POLL_SECONDS)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _error_result(e):
+    """Log a failed query and turn the exception into an error result."""
+    if isinstance(e, azure_exceptions.HttpResponseError):
+        error_msg = f"Query failed: {str(e)}"
+    else:
+        error_msg = f"An unexpected error occurred: {str(e)}"
+    logger.error(error_msg)
+    logger.exception("Exception details:")
+    return {"error": error_msg}
+
 class ResourceGraphTool:
     """Tool for executing KQL queries on Azure Resource Graph."""
     
-    def __init__(self, credential=None):
+    def __init__(self, credential=None, client=None):
         # Use provided credential or default to AzureCliCredential
         logger.info("Initializing ResourceGraphTool")
-        self.credential = credential if credential else AzureCliCredential()
-        self.client = ResourceGraphClient(self.credential)
+        self.credential = credential if credential else azure_identity.AzureCliCredential()
+        # Reuse a shared client when one is provided to avoid rebuilding the HTTP pipeline
+        self.client = client if client else resourcegraph.ResourceGraphClient(self.credential)
+
+    def _fetch_page(self, query, subscription_ids=None, page_size=DEFAULT_PAGE_SIZE, skip_token=None,
+                    management_groups=None):
+        """Fetch a single page of results, continuing from skip_token when given."""
+        request = _build_request(query, subscription_ids, management_groups, page_size, skip_token)
+        return self.client.resources(request)
+
+    def iter_pages(self, query, subscription_ids=None, page_size=DEFAULT_PAGE_SIZE, max_rows=None,
+                   management_groups=None):
+        """
+        Run a KQL query on Azure Resource Graph and yield every page, following skip tokens.
+        The next page is fetched in the background while the caller processes the current one.
+
+        Args:
+            query (str): The KQL query to execute
+            subscription_ids (list): List of subscription IDs to query against (optional)
+            page_size (int): Rows requested per page (at most 1000)
+            max_rows (int, optional): Stop after this many rows in total
+            management_groups (list, optional): Management groups to query instead of subscriptions
+
+        Yields:
+            dict: One page with "data", "count", "total_records" and "skip_token"; skip_token is only set
+                  on the last page when max_rows stopped the results at a page boundary. When max_rows
+                  cut a page mid-way it is None, since resuming from it would skip the trimmed rows
+        """
+        logger.debug(f"Running paginated Resource Graph query: {query}")
+        page_size = min(page_size, DEFAULT_PAGE_SIZE)
+        rows_returned = 0
+        page_number = 0
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            future = executor.submit(self._fetch_page, query, subscription_ids, page_size, None, management_groups)
+            while future is not None:
+                response = future.result()
+                page_number += 1
+                data = response.data or []
+                rows = _trim_rows(data, rows_returned, max_rows)
+                rows_returned += len(rows)
+
+                # Prefetch the next page before handing this one to the caller; the token of a
+                # trimmed page points past the rows that were cut, so it is not returned
+                skip_token = response.skip_token if len(rows) == len(data) else None
+                future = None
+                if skip_token and (max_rows is None or rows_returned < max_rows):
+                    future = executor.submit(
+                        self._fetch_page, query, subscription_ids, page_size, skip_token, management_groups
+                    )
+                    skip_token = None
+
+                logger.debug(f"Resource Graph page {page_number}: {len(rows)} rows ({rows_returned} so far)")
+                yield {
+                    "data": rows,
+                    "count": len(rows),
+                    "total_records": response.total_records,
+                    "skip_token": skip_token
+                }
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def iter_pages_concurrent(self, query, subscription_ids=None, page_size=DEFAULT_PAGE_SIZE, max_rows=None,
+                              management_groups=None, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Run a KQL query across any number of subscriptions and yield every page.
+        Subscriptions are split into chunks of MAX_SUBSCRIPTIONS_PER_REQUEST and the chunks
+        are queried concurrently; pages are yielded in chunk order.
+
+        Each chunk streams its pages through a buffer of FANOUT_BUFFER_PAGES pages, so at most
+        max_workers chunks hold a few pages each instead of their whole result. Once max_rows is
+        reached the remaining chunks are stopped without waiting for them.
+
+        Args:
+            query (str): The KQL query to execute
+            subscription_ids (list): List of subscription IDs to query against (optional)
+            page_size (int): Rows requested per page (at most 1000)
+            max_rows (int, optional): Stop after this many rows in total
+            management_groups (list, optional): Management groups to query instead of subscriptions
+            max_workers (int): Maximum number of chunks queried at the same time
+
+        Yields:
+            dict: One page with "data", "count", "total_records" and "skip_token"
+        """
+        chunks = chunk_subscriptions(subscription_ids) if subscription_ids and not management_groups else []
+        if len(chunks) <= 1:
+            yield from self.iter_pages(query, subscription_ids, page_size, max_rows, management_groups)
+            return
+
+        logger.debug(f"Fanning out query over {len(chunks)} subscription chunks with {max_workers} workers")
+
+        stop = threading.Event()
+        buffers = [queue.Queue(maxsize=FANOUT_BUFFER_PAGES) for _ in chunks]
+
+        def stream_chunk(chunk, pages_queue):
+            pages = self.iter_pages(query, chunk, page_size, max_rows)
+            try:
+                for page in pages:
+                    if not _put_page(pages_queue, page, stop):
+                        return
+                _put_page(pages_queue, _END, stop)
+            except Exception as e:
+                _put_page(pages_queue, e, stop)
+            finally:
+                pages.close()
+
+        rows_returned = 0
+        total_records = 0
+        # Chunks start in order, so the chunk being read is always running or already finished
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            for chunk, pages_queue in zip(chunks, buffers):
+                executor.submit(stream_chunk, chunk, pages_queue)
+            for pages_queue in buffers:
+                first_page = True
+                while (page := pages_queue.get()) is not _END:
+                    if isinstance(page, Exception):
+                        raise page
+                    if first_page:
+                        # Report the running total over all chunks merged so far
+                        total_records += page["total_records"] or 0
+                        first_page = False
+                    page = _merge_page(page, total_records, rows_returned, max_rows)
+                    rows_returned += page["count"]
+                    yield page
+                    if max_rows is not None and rows_returned >= max_rows:
+                        return
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
 
     @log_method_call
-    def run_query(self, query, subscription_ids=None):
+    def run_query(self, query, subscription_ids=None, paginate=False, page_size=DEFAULT_PAGE_SIZE, max_rows=None,
+                  management_groups=None, max_workers=DEFAULT_MAX_WORKERS):
         """
         Run a KQL query on Azure Resource Graph.
         
         Args:
             query (str): The KQL query to execute
             subscription_ids (list): List of subscription IDs to query against (optional)
+            paginate (bool): Follow skip tokens and return all pages instead of the first one
+            page_size (int): Rows requested per page when paginating
+            max_rows (int, optional): Maximum number of rows to return when paginating
+            management_groups (list, optional): Management groups to query instead of subscriptions
+            max_workers (int): Subscription chunks queried concurrently when paginating
             
         Returns:
             dict: Results of the query
         """
+        if paginate:
+            return self._run_paginated_query(
+                query, subscription_ids, page_size, max_rows, management_groups, max_workers
+            )
+
         try:
             # If subscription_ids is not provided, the query will run against all accessible subscriptions
             logger.debug(f"Running Resource Graph query: {query}")
@@ -37,12 +260,7 @@ class ResourceGraphTool:
             else:
                 logger.debug("No subscription IDs provided, querying all accessible subscriptions")
                 
-            options = QueryRequestOptions(result_format="objectArray")
-            request = QueryRequest(
-                query=query,
-                subscriptions=subscription_ids,
-                options=options
-            )
+            request = _build_request(query, subscription_ids, management_groups)
             
             logger.debug("Sending request to Resource Graph API")
             response = self.client.resources(request)
@@ -58,13 +276,189 @@ class ResourceGraphTool:
             logger.debug(f"Query returned {response.count} results out of {response.total_records} total records")
             return result
         
-        except HttpResponseError as e:
-            error_msg = f"Query failed: {str(e)}"
-            logger.error(error_msg)
-            logger.exception("Exception details:")
-            return {"error": error_msg}
         except Exception as e:
-            error_msg = f"An unexpected error occurred: {str(e)}"
-            logger.error(error_msg)
-            logger.exception("Exception details:")
-            return {"error": error_msg}
\ No newline at end of file
+            return _error_result(e)
+
+    def _run_paginated_query(self, query, subscription_ids, page_size, max_rows, management_groups, max_workers):
+        """Collect all pages of a query into a single result."""
+        try:
+            data = []
+            total_records = None
+            skip_token = None
+            pages = self.iter_pages_concurrent(
+                query, subscription_ids, page_size, max_rows, management_groups, max_workers
+            )
+            for page in pages:
+                data.extend(page["data"])
+                total_records = page["total_records"]
+                skip_token = page["skip_token"]
+
+            logger.debug(f"Paginated query returned {len(data)} results out of {total_records} total records")
+            return {
+                "data": data,
+                "count": len(data),
+                "total_records": total_records,
+                "skip_token": skip_token
+            }
+
+        except Exception as e:
+            return _error_result(e)
+
+
+class AsyncResourceGraphTool:
+    """
+    Asyncio counterpart of ResourceGraphTool built on the .aio ResourceGraphClient,
+    so many tool calls can wait on Resource Graph from a single worker thread.
+    """
+
+    def __init__(self, credential, client=None):
+        logger.info("Initializing AsyncResourceGraphTool")
+        self.credential = credential
+        if client is None:
+            from azure.mgmt.resourcegraph.aio import ResourceGraphClient as AsyncResourceGraphClient
+            client = AsyncResourceGraphClient(self.credential)
+        self.client = client
+
+    async def _fetch_page(self, query, subscription_ids=None, page_size=DEFAULT_PAGE_SIZE, skip_token=None,
+                          management_groups=None):
+        """Fetch a single page of results, continuing from skip_token when given."""
+        request = _build_request(query, subscription_ids, management_groups, page_size, skip_token)
+        return await self.client.resources(request)
+
+    async def iter_pages(self, query, subscription_ids=None, page_size=DEFAULT_PAGE_SIZE, max_rows=None,
+                         management_groups=None):
+        """
+        Async version of ResourceGraphTool.iter_pages; the next page is requested
+        in a background task while the caller processes the current one.
+        """
+        logger.debug(f"Running paginated Resource Graph query: {query}")
+        page_size = min(page_size, DEFAULT_PAGE_SIZE)
+        rows_returned = 0
+        page_number = 0
+
+        task = asyncio.ensure_future(
+            self._fetch_page(query, subscription_ids, page_size, None, management_groups)
+        )
+        try:
+            while task is not None:
+                response = await task
+                page_number += 1
+                data = response.data or []
+                rows = _trim_rows(data, rows_returned, max_rows)
+                rows_returned += len(rows)
+
+                # Prefetch the next page before handing this one to the caller; the token of a
+                # trimmed page points past the rows that were cut, so it is not returned
+                skip_token = response.skip_token if len(rows) == len(data) else None
+                task = None
+                if skip_token and (max_rows is None or rows_returned < max_rows):
+                    task = asyncio.ensure_future(
+                        self._fetch_page(query, subscription_ids, page_size, skip_token, management_groups)
+                    )
+                    skip_token = None
+
+                logger.debug(f"Resource Graph page {page_number}: {len(rows)} rows ({rows_returned} so far)")
+                yield {
+                    "data": rows,
+                    "count": len(rows),
+                    "total_records": response.total_records,
+                    "skip_token": skip_token
+                }
+        finally:
+            if task is not None:
+                task.cancel()
+
+    async def iter_pages_concurrent(self, query, subscription_ids=None, page_size=DEFAULT_PAGE_SIZE,
+                                    max_rows=None, management_groups=None, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Async version of ResourceGraphTool.iter_pages_concurrent; at most max_workers
+        subscription chunks are in flight at once, each buffering at most FANOUT_BUFFER_PAGES
+        pages, and pages are yielded in chunk order.
+        """
+        chunks = chunk_subscriptions(subscription_ids) if subscription_ids and not management_groups else []
+        if len(chunks) <= 1:
+            async for page in self.iter_pages(query, subscription_ids, page_size, max_rows, management_groups):
+                yield page
+            return
+
+        logger.debug(f"Fanning out query over {len(chunks)} subscription chunks with {max_workers} tasks")
+        buffers = [asyncio.Queue(maxsize=FANOUT_BUFFER_PAGES) for _ in chunks]
+        # Workers take chunks in order, so the chunk being read is always running or already finished
+        next_chunk = iter(range(len(chunks)))
+
+        async def stream_chunks():
+            for index in next_chunk:
+                pages = self.iter_pages(query, chunks[index], page_size, max_rows)
+                try:
+                    async for page in pages:
+                        await buffers[index].put(page)
+                    await buffers[index].put(_END)
+                except Exception as e:
+                    await buffers[index].put(e)
+                finally:
+                    await pages.aclose()
+
+        rows_returned = 0
+        total_records = 0
+        workers = [asyncio.ensure_future(stream_chunks()) for _ in range(min(max_workers, len(chunks)))]
+        try:
+            for pages_queue in buffers:
+                first_page = True
+                while (page := await pages_queue.get()) is not _END:
+                    if isinstance(page, Exception):
+                        raise page
+                    if first_page:
+                        # Report the running total over all chunks merged so far
+                        total_records += page["total_records"] or 0
+                        first_page = False
+                    page = _merge_page(page, total_records, rows_returned, max_rows)
+                    rows_returned += page["count"]
+                    yield page
+                    if max_rows is not None and rows_returned >= max_rows:
+                        return
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    @log_method_call
+    async def run_query(self, query, subscription_ids=None, paginate=False, page_size=DEFAULT_PAGE_SIZE,
+                        max_rows=None, management_groups=None, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Async version of ResourceGraphTool.run_query.
+
+        Returns:
+            dict: Results of the query
+        """
+        try:
+            if not paginate:
+                logger.debug(f"Running Resource Graph query: {query}")
+                response = await self.client.resources(_build_request(query, subscription_ids, management_groups))
+                logger.debug(f"Query returned {response.count} results out of {response.total_records} total records")
+                return {
+                    "data": response.data,
+                    "count": response.count,
+                    "total_records": response.total_records,
+                    "skip_token": response.skip_token
+                }
+
+            data = []
+            total_records = None
+            skip_token = None
+            pages = self.iter_pages_concurrent(
+                query, subscription_ids, page_size, max_rows, management_groups, max_workers
+            )
+            async for page in pages:
+                data.extend(page["data"])
+                total_records = page["total_records"]
+                skip_token = page["skip_token"]
+
+            logger.debug(f"Paginated query returned {len(data)} results out of {total_records} total records")
+            return {
+                "data": data,
+                "count": len(data),
+                "total_records": total_records,
+                "skip_token": skip_token
+            }
+
+        except Exception as e:
+            return _error_result(e)
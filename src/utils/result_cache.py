@@ -0,0 +1,464 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_MAX_BYTES = 256 * 1024 * 1024
+
+# Temporary files older than this were left by a write that never finished (e.g. a crash) and are removed
+STALE_TEMP_SECONDS = 600
+
+
+def normalize_query(query):
+    """Collapse whitespace so formatting differences do not produce different cache keys."""
+    return re.sub(r"\s+", " ", query or "").strip()
+
+
+def normalize_scope(scope):
+    """Turn a subscription/workspace scope (string or list) into a hashable, order-independent key."""
+    if scope is None:
+        return ()
+    if isinstance(scope, str):
+        scope = scope.split(",")
+    return tuple(sorted(item.strip().lower() for item in scope if item and item.strip()))
+
+
+def normalize_timespan(timespan):
+    """Normalize a timespan argument such as '30d', ' 30D ' or 'P30D' to a single bucket key."""
+    if not timespan:
+        return ""
+    timespan = str(timespan).strip().lower()
+    match = re.fullmatch(r"p(\d+)d", timespan)
+    if match:
+        return f"{match.group(1)}d"
+    return timespan
+
+
+def make_cache_key(tool_name, query, scope=None, timespan=None, **options):
+    """
+    Build the cache key for a tool result.
+
+    Args:
+        tool_name (str): Name of the tool producing the result
+        query (str): The KQL query that was executed
+        scope (str or list, optional): Subscription IDs, management groups or workspace ID
+        timespan (str, optional): The timespan the query covers
+        **options: Any other arguments that change the result (e.g. max_rows)
+
+    Returns:
+        tuple: A hashable cache key
+    """
+    key = (tool_name, normalize_query(query), normalize_scope(scope), normalize_timespan(timespan))
+    if options:
+        key += (tuple(sorted(options.items())),)
+    return key
+
+
+class ResultCache:
+    """
+    Thread-safe in-memory TTL + LRU cache for tool responses.
+
+    Entries expire after their TTL and the least recently used entries are evicted
+    once either the entry count or the total size of the cached strings exceeds its bound.
+    An entry may also be fresh for less than its TTL; get_entry() tells whether it still is.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES,
+                 default_ttl=DEFAULT_TTL_SECONDS):
+        logger.info("Initializing ResultCache")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _size_of(value):
+        return len(value) if isinstance(value, (str, bytes)) else 0
+
+    def get(self, key):
+        """
+        Get a cached value.
+
+        Returns:
+            The cached value, or None when the key is missing or expired
+        """
+        entry = self.get_entry(key)
+        return None if entry is None else entry[0]
+
+    def get_entry(self, key):
+        """
+        Get a cached value and whether it is still fresh.
+
+        Returns:
+            tuple: (value, fresh), or None when the key is missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at, fresh_until = entry
+            now = time.monotonic()
+            if now >= expires_at:
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value, now < fresh_until
+
+    def set(self, key, value, ttl=None, fresh_ttl=None):
+        """
+        Store a value.
+
+        Args:
+            key: Cache key, usually built with make_cache_key()
+            value: The value to cache (tool responses are JSON strings)
+            ttl (float, optional): Time to live in seconds; defaults to default_ttl
+            fresh_ttl (float, optional): Seconds the value is fresh for, when less than its ttl
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        size = self._size_of(value)
+        if ttl <= 0 or size > self.max_bytes:
+            return
+
+        now = time.monotonic()
+        fresh_until = now + (ttl if fresh_ttl is None else min(fresh_ttl, ttl))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, now + ttl, fresh_until)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    async def get_async(self, key):
+        """Async version of get(), for callers that may also use a TieredResultCache."""
+        return self.get(key)
+
+    async def get_entry_async(self, key):
+        """Async version of get_entry(), for callers that may also use a TieredResultCache."""
+        return self.get_entry(key)
+
+    async def set_async(self, key, value, ttl=None, fresh_ttl=None):
+        """Async version of set(), for callers that may also use a TieredResultCache."""
+        self.set(key, value, ttl, fresh_ttl)
+
+    def _remove(self, key):
+        value = self._entries.pop(key)[0]
+        self._bytes -= self._size_of(value)
+
+    def invalidate(self, key=None):
+        """Remove one entry, or every entry when no key is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+            elif key in self._entries:
+                self._remove(key)
+
+    def stats(self):
+        """Return hit/miss counters and current memory usage."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CacheBackend:
+    """
+    Interface for a shared second-tier cache behind the in-memory ResultCache.
+
+    Implementations store string values with an absolute expiry time, so entries written
+    by one Function App instance can be read by another (e.g. a blob container, or a
+    file share mounted on every instance).
+    """
+
+    def get(self, key):
+        """Return (value, expires_at, fresh_until) for a live entry, or None."""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl, fresh_ttl=None):
+        """Store a value for ttl seconds, fresh for fresh_ttl of them (all of them by default)."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Remove an entry if present."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Remove all entries."""
+        raise NotImplementedError
+
+
+class FileCacheBackend(CacheBackend):
+    """
+    Cache backend storing one compact binary file per entry in a local directory.
+
+    Each file holds a fixed header (magic, expiry, end of freshness, payload length) followed by the
+    zlib-compressed UTF-8 value, or the raw payload of get_bytes()/set_bytes(). Expired files
+    are removed on access, and the oldest files are evicted once the directory exceeds max_bytes.
+    Temporary files left by interrupted writes are swept on startup and during eviction.
+    """
+
+    MAGIC = b"MCP2"
+    RAW_MAGIC = b"MCPR"
+    HEADER = struct.Struct("<4sddI")
+    SUFFIX = ".cache"
+    TEMP_SUFFIX = ".tmp"
+
+    def __init__(self, directory, max_bytes=DEFAULT_DISK_MAX_BYTES):
+        logger.info(f"Initializing FileCacheBackend in {directory}")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sweep_temp_files()
+        self._bytes = sum(path.stat().st_size for path in self.directory.glob(f"*{self.SUFFIX}"))
+
+    def _path_for(self, key):
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}{self.SUFFIX}"
+
+    def get(self, key):
+        return self._read(key, self.MAGIC, lambda payload: zlib.decompress(payload).decode("utf-8"))
+
+    def set(self, key, value, ttl, fresh_ttl=None):
+        self._write(key, self.MAGIC, zlib.compress(value.encode("utf-8")), ttl, fresh_ttl)
+
+    def get_bytes(self, key):
+        """Return (payload, expires_at) of a live entry written by set_bytes(), or None."""
+        entry = self._read(key, self.RAW_MAGIC, bytes)
+        return entry and entry[:2]
+
+    def set_bytes(self, key, payload, ttl):
+        """Store a binary payload as is, without compression, for ttl seconds."""
+        self._write(key, self.RAW_MAGIC, payload, ttl)
+
+    def _read(self, key, expected_magic, decode):
+        path = self._path_for(key)
+        try:
+            with open(path, "rb") as handle:
+                magic, expires_at, fresh_until, length = self.HEADER.unpack(handle.read(self.HEADER.size))
+                if magic != expected_magic:
+                    raise ValueError("invalid cache file header")
+                if time.time() >= expires_at:
+                    payload = None
+                else:
+                    payload = decode(handle.read(length))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error, zlib.error) as e:
+            logger.warning(f"Discarding unreadable cache file {path.name}: {str(e)}")
+            self.delete(key)
+            return None
+
+        if payload is None:
+            self.delete(key)
+            return None
+        return payload, expires_at, fresh_until
+
+    def _write(self, key, magic, payload, ttl, fresh_ttl=None):
+        now = time.time()
+        fresh_until = now + (ttl if fresh_ttl is None else min(fresh_ttl, ttl))
+        header = self.HEADER.pack(magic, now + ttl, fresh_until, len(payload))
+        path = self._path_for(key)
+
+        # Write to a temporary file first so readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=self.TEMP_SUFFIX)
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(header)
+                handle.write(payload)
+            with self._lock:
+                old_size = path.stat().st_size if path.exists() else 0
+                os.replace(temp_path, path)
+                self._bytes += len(header) + len(payload) - old_size
+        except OSError as e:
+            logger.warning(f"Failed to write cache file {path.name}: {str(e)}")
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            return
+
+        if self._bytes > self.max_bytes:
+            self._evict()
+
+    def _sweep_temp_files(self):
+        """Remove temporary files of writes that never reached os.replace."""
+        cutoff = time.time() - STALE_TEMP_SECONDS
+        for path in self.directory.glob(f"*{self.TEMP_SUFFIX}"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    logger.info(f"Removed stale cache temp file {path.name}")
+            except OSError:
+                continue
+
+    def _evict(self):
+        """Remove stale temp files and expired files, then the oldest ones, until the directory fits in max_bytes."""
+        with self._lock:
+            self._sweep_temp_files()
+            entries = []
+            now = time.time()
+            total = 0
+            for path in self.directory.glob(f"*{self.SUFFIX}"):
+                try:
+                    stat = path.stat()
+                    with open(path, "rb") as handle:
+                        _, expires_at, _, _ = self.HEADER.unpack(handle.read(self.HEADER.size))
+                except (OSError, struct.error):
+                    continue
+                if expires_at <= now:
+                    self._unlink(path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._unlink(path)
+                total -= size
+            self._bytes = total
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def delete(self, key):
+        path = self._path_for(key)
+        with self._lock:
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                self._bytes -= size
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            for path in self.directory.glob(f"*{self.SUFFIX}"):
+                self._unlink(path)
+            self._bytes = 0
+
+
+class TieredResultCache:
+    """
+    Two-tier result cache: an in-memory ResultCache in front of a shared CacheBackend.
+
+    Memory misses fall through to the backend, and backend hits are promoted into
+    memory for the rest of their TTL and freshness. Writes go to both tiers. get_async() and set_async()
+    do the backend I/O in a worker thread, so the async tools never block the event loop on disk.
+    """
+
+    def __init__(self, memory, backend):
+        logger.info(f"Initializing TieredResultCache with {type(backend).__name__}")
+        self.memory = memory
+        self.backend = backend
+        self.backend_hits = 0
+        self.backend_misses = 0
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return None if entry is None else entry[0]
+
+    async def get_async(self, key):
+        entry = await self.get_entry_async(key)
+        return None if entry is None else entry[0]
+
+    def get_entry(self, key):
+        entry = self.memory.get_entry(key)
+        if entry is not None:
+            return entry
+        return self._read_backend(key)
+
+    async def get_entry_async(self, key):
+        entry = self.memory.get_entry(key)
+        if entry is not None:
+            return entry
+        return await asyncio.to_thread(self._read_backend, key)
+
+    def _read_backend(self, key):
+        """Read a memory miss from the backend and promote it into memory; returns (value, fresh) or None."""
+        try:
+            entry = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Cache backend read failed: {str(e)}")
+            entry = None
+
+        if entry is None:
+            self.backend_misses += 1
+            return None
+
+        self.backend_hits += 1
+        value, expires_at, fresh_until = entry
+        now = time.time()
+        self.memory.set(key, value, ttl=expires_at - now, fresh_ttl=fresh_until - now)
+        return value, now < fresh_until
+
+    def set(self, key, value, ttl=None, fresh_ttl=None):
+        ttl = self.memory.default_ttl if ttl is None else ttl
+        self.memory.set(key, value, ttl=ttl, fresh_ttl=fresh_ttl)
+        if ttl > 0 and isinstance(value, str):
+            self._write_backend(key, value, ttl, fresh_ttl)
+
+    async def set_async(self, key, value, ttl=None, fresh_ttl=None):
+        ttl = self.memory.default_ttl if ttl is None else ttl
+        self.memory.set(key, value, ttl=ttl, fresh_ttl=fresh_ttl)
+        if ttl > 0 and isinstance(value, str):
+            await asyncio.to_thread(self._write_backend, key, value, ttl, fresh_ttl)
+
+    def _write_backend(self, key, value, ttl, fresh_ttl=None):
+        try:
+            self.backend.set(key, value, ttl, fresh_ttl)
+        except Exception as e:
+            logger.warning(f"Cache backend write failed: {str(e)}")
+
+    def invalidate(self, key=None):
+        self.memory.invalidate(key)
+        if key is None:
+            self.backend.clear()
+        else:
+            self.backend.delete(key)
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats["backend_hits"] = self.backend_hits
+        stats["backend_misses"] = self.backend_misses
+        return stats
+
+    def __len__(self):
+        return len(self.memory)
@@ -0,0 +1,158 @@
+import base64
+import binascii
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rows per page when the caller does not choose a page size
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 10000
+
+# Shortest a serialized row can be, with its separator
+MIN_ROW_CHARS = 3
+
+
+def result_token(response):
+    """Identify a full tool response by its content, so repeated results share their cursor entry."""
+    return hashlib.sha256(response.encode("utf-8")).hexdigest()[:32]
+
+
+def encode_cursor(tool_name, token, offset, page_size):
+    """Build the opaque continuation cursor returned with a page."""
+    payload = json.dumps({"t": tool_name, "r": token, "o": offset, "n": page_size}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Decode a continuation cursor.
+
+    Returns:
+        dict: {"tool", "token", "offset", "page_size"}
+
+    Raises:
+        ValueError: If the cursor was not produced by encode_cursor
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        decoded = {"tool": payload["t"], "token": payload["r"], "offset": int(payload["o"]),
+                   "page_size": int(payload["n"])}
+    except (AttributeError, TypeError, KeyError, ValueError, UnicodeError, binascii.Error):
+        raise ValueError("Invalid cursor")
+    if decoded["offset"] < 0 or decoded["page_size"] < 1:
+        raise ValueError("Invalid cursor")
+    return decoded
+
+
+def parse_page_size(page_size, default=DEFAULT_PAGE_SIZE):
+    """Validate the page_size argument; 0 turns paging off."""
+    if page_size is None or page_size == "":
+        return default
+    try:
+        page_size = int(page_size)
+    except (TypeError, ValueError):
+        raise ValueError(f"page_size must be an integer, got: {page_size}")
+    if page_size < 0 or page_size > MAX_PAGE_SIZE:
+        raise ValueError(f"page_size must be between 0 and {MAX_PAGE_SIZE}")
+    return page_size
+
+
+def _row_lists(result):
+    """
+    Return the row lists of a parsed tool response, in order, with a setter for each.
+
+    Supports Resource Graph results ({"data": rows}), Log Analytics tables in records or
+    columnar layout, and multi-server results grouped under "servers".
+    """
+    if isinstance(result, dict) and isinstance(result.get("data"), list):
+        return [(result["data"], lambda rows: result.__setitem__("data", rows))]
+    if isinstance(result, dict) and isinstance(result.get("servers"), dict):
+        servers = result["servers"]
+        return [
+            (group["rows"], lambda rows, group=group: group.__setitem__("rows", rows)) if isinstance(group, dict)
+            else (group, lambda rows, name=name: servers.__setitem__(name, rows))
+            for name, group in servers.items()
+        ]
+    if isinstance(result, list):
+        lists = []
+        for index, table in enumerate(result):
+            if isinstance(table, dict):
+                lists.append((table["rows"], lambda rows, table=table: table.__setitem__("rows", rows)))
+            else:
+                lists.append((table, lambda rows, index=index: result.__setitem__(index, rows)))
+        return lists
+    return None
+
+
+def fits_in_page(response, page_size):
+    """
+    Check without parsing whether a JSON tool response is too short to hold more than page_size rows.
+    Every row takes at least three characters ("{}," or "[],"), so shorter responses never need paging.
+    """
+    return not page_size or len(response) <= MIN_ROW_CHARS * page_size
+
+
+def count_rows(result):
+    """Count the rows of a parsed tool response, or return None if it has no pageable rows."""
+    lists = _row_lists(result)
+    return None if lists is None else sum(len(rows) for rows, _ in lists)
+
+
+def slice_rows(result, offset, limit):
+    """
+    Keep rows offset to offset + limit of a parsed tool response, in place.
+
+    Tables and servers without rows in the page are dropped from multi-table and grouped results.
+
+    Returns:
+        int: Number of rows kept
+    """
+    kept = 0
+    position = 0
+    for rows, set_rows in _row_lists(result):
+        start = max(offset - position, 0)
+        stop = max(min(offset + limit - position, len(rows)), 0)
+        page = rows[start:stop] if start < stop else []
+        position += len(rows)
+        kept += len(page)
+        set_rows(page)
+
+    if isinstance(result, dict) and "servers" in result:
+        result["servers"] = {
+            name: group for name, group in result["servers"].items()
+            if (group["rows"] if isinstance(group, dict) else group)
+        }
+        result["server_count"] = len(result["servers"])
+    if isinstance(result, dict) and "count" in result:
+        result["count"] = kept
+    if isinstance(result, list):
+        result[:] = [table for table in result if (table["rows"] if isinstance(table, dict) else table)] or result[:1]
+    return kept
+
+
+def build_page(result, tool_name, token, offset, page_size):
+    """
+    Cut one page out of a parsed tool response and describe it.
+
+    Dict responses keep their layout and get a "paging" entry; table lists are wrapped
+    as {"tables": [...], "paging": {...}}.
+
+    Returns:
+        dict: The page, with paging {"offset", "count", "total_rows", "next_cursor"}
+    """
+    total_rows = count_rows(result)
+    count = slice_rows(result, offset, page_size)
+    next_offset = offset + count
+    paging = {
+        "offset": offset,
+        "count": count,
+        "total_rows": total_rows,
+        "next_cursor": encode_cursor(tool_name, token, next_offset, page_size) if next_offset < total_rows else None,
+    }
+    if isinstance(result, list):
+        return {"tables": result, "paging": paging}
+    result["paging"] = paging
+    return result
@@ -0,0 +1,173 @@
+import base64
+import datetime
+import decimal
+import json
+import logging
+import os
+import uuid
+from functools import singledispatch
+
+logger = logging.getLogger(__name__)
+
+# JSON encoder used for tool responses: "auto" picks the fastest one installed
+JSON_BACKEND = os.getenv("MCP_JSON_BACKEND", "auto").strip().lower()
+BACKENDS = ("orjson", "msgspec", "json")
+
+
+@singledispatch
+def json_default(obj):
+    """
+    Convert an object json cannot encode into something it can.
+
+    Used as the `default` hook of json.dumps, so it is only called for objects json does
+    not handle natively and the payload is walked once by the C encoder. Converters are
+    looked up by type and cached by singledispatch; register more with
+    @json_default.register.
+    """
+    if _register_pandas(obj):
+        return json_default(obj)
+
+    # numpy arrays and scalars
+    if type(obj).__module__ == "numpy" and hasattr(obj, "tolist"):
+        return obj.tolist()
+    # Azure SDK models (msrest and azure-core) expose as_dict()/to_dict()
+    as_dict = getattr(obj, "as_dict", None) or getattr(obj, "to_dict", None)
+    if callable(as_dict):
+        return as_dict()
+    # Row sequences such as LogsTableRow
+    if hasattr(obj, "__iter__"):
+        return list(obj)
+    if hasattr(obj, "__dict__"):
+        return {key: value for key, value in vars(obj).items() if not key.startswith("_")}
+    return str(obj)
+
+
+@json_default.register(datetime.date)
+@json_default.register(datetime.time)
+def _encode_isoformat(obj):
+    return obj.isoformat()
+
+
+@json_default.register(datetime.timedelta)
+@json_default.register(uuid.UUID)
+def _encode_str(obj):
+    return str(obj)
+
+
+@json_default.register(decimal.Decimal)
+def _encode_decimal(obj):
+    return float(obj)
+
+
+@json_default.register(set)
+@json_default.register(frozenset)
+def _encode_set(obj):
+    return list(obj)
+
+
+@json_default.register(bytes)
+def _encode_bytes(obj):
+    return base64.b64encode(obj).decode("ascii")
+
+
+_pandas_registered = False
+
+
+def _register_pandas(obj):
+    """Register the pandas converters the first time a pandas object shows up, without importing pandas eagerly."""
+    global _pandas_registered
+
+    if _pandas_registered or not type(obj).__module__.startswith("pandas"):
+        return False
+
+    import pandas as pd
+
+    json_default.register(pd.DataFrame, lambda df: df.to_dict(orient="records"))
+    json_default.register(pd.Series, lambda series: series.tolist())
+    json_default.register(pd.Index, lambda index: index.tolist())
+    # Timestamp is a datetime subclass, but NaT is not
+    json_default.register(type(pd.NaT), lambda value: None)
+    _pandas_registered = True
+    logger.debug("Registered pandas JSON converters")
+    return True
+
+
+def _stdlib_dumps(obj, **kwargs):
+    return json.dumps(obj, default=json_default, **kwargs)
+
+
+def _create_encoder(name):
+    """Create the encode function for a backend, or None when its library is not installed."""
+    if name == "orjson":
+        try:
+            import orjson
+        except ImportError:
+            return None
+        # orjson handles datetimes, UUIDs and numpy natively and only calls json_default for the rest
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        return lambda obj: orjson.dumps(obj, default=json_default, option=option).decode("utf-8")
+    if name == "msgspec":
+        try:
+            import msgspec
+        except ImportError:
+            return None
+        encoder = msgspec.json.Encoder(enc_hook=json_default)
+
+        def encode(obj):
+            try:
+                return encoder.encode(obj).decode("utf-8")
+            except msgspec.EncodeError as e:
+                raise TypeError(str(e)) from e
+        return encode
+    if name == "json":
+        return _stdlib_dumps
+    raise ValueError(f"Unknown JSON backend '{name}', expected auto or one of {', '.join(BACKENDS)}")
+
+
+_backend_name = None
+_encode = None
+
+
+def set_backend(name="auto"):
+    """
+    Select the JSON encoder used by dumps().
+
+    Args:
+        name (str): "orjson", "msgspec", "json", or "auto" for the first one installed
+
+    Returns:
+        str: The backend actually in use; falls back to "json" when the requested library is missing
+    """
+    global _backend_name, _encode
+
+    candidates = BACKENDS if name == "auto" else (name, "json")
+    for candidate in candidates:
+        encoder = _create_encoder(candidate)
+        if encoder is not None:
+            if candidate != name and name != "auto":
+                logger.warning(f"JSON backend '{name}' is not installed, using '{candidate}'")
+            _backend_name, _encode = candidate, encoder
+            logger.info(f"Using JSON backend: {candidate}")
+            return candidate
+
+
+def get_backend():
+    """Name of the JSON encoder used by dumps()."""
+    return _backend_name
+
+
+def dumps(obj, **kwargs):
+    """
+    Serialize obj to a JSON string in a single pass, converting non-JSON types on the way.
+    Keyword arguments (e.g. indent) are passed to the stdlib encoder.
+    """
+    if kwargs or _backend_name == "json":
+        return _stdlib_dumps(obj, **kwargs)
+    try:
+        return _encode(obj)
+    except TypeError:
+        # e.g. integers beyond 64 bits, which only the stdlib encoder handles
+        return _stdlib_dumps(obj)
+
+
+set_backend(JSON_BACKEND)
@@ -0,0 +1,87 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Keep each generated Computer filter well below the Log Analytics query size limit
+MAX_SERVERS_PER_QUERY = 200
+MAX_FILTER_LENGTH = 8000
+
+WILDCARD = "*"
+
+
+def quote_kql_string(value):
+    """Quote a value as a KQL string literal."""
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def is_multi_server(server_names):
+    """Check whether a server list asks for more than one exact computer."""
+    return len(server_names) > 1 or any(name.endswith(WILDCARD) for name in server_names)
+
+
+def build_computer_filter(server_names, column="Computer"):
+    """
+    Build a KQL predicate matching the requested computers.
+
+    Args:
+        server_names (list): Exact names and/or prefixes ending in '*' ('*' alone matches every computer)
+        column (str): The column holding the computer name
+
+    Returns:
+        str: A KQL boolean expression, e.g. "Computer in~ ('web-01', 'web-02')"
+    """
+    if WILDCARD in server_names:
+        return f"isnotempty({column})"
+
+    exact = [name for name in server_names if not name.endswith(WILDCARD)]
+    prefixes = [name[:-1] for name in server_names if name.endswith(WILDCARD)]
+
+    clauses = []
+    if len(exact) == 1:
+        # Case-insensitive like in~, so one name matches the same computers as a list of names
+        clauses.append(f"{column} =~ {quote_kql_string(exact[0])}")
+    elif exact:
+        clauses.append(f"{column} in~ ({', '.join(quote_kql_string(name) for name in exact)})")
+    clauses.extend(f"{column} startswith {quote_kql_string(prefix)}" for prefix in prefixes)
+
+    if len(clauses) == 1:
+        return clauses[0]
+    return "(" + " or ".join(clauses) + ")"
+
+
+def chunk_server_names(server_names, max_servers=MAX_SERVERS_PER_QUERY, max_length=MAX_FILTER_LENGTH):
+    """
+    Split a server list into chunks whose Computer filter fits in a single query.
+
+    Returns:
+        list: Lists of server names, in the original order
+    """
+    chunks = []
+    current = []
+    length = 0
+    for name in server_names:
+        size = len(name) + 4  # quotes, comma and space
+        if current and (len(current) >= max_servers or length + size > max_length):
+            chunks.append(current)
+            current = []
+            length = 0
+        current.append(name)
+        length += size
+    if current:
+        chunks.append(current)
+
+    if len(chunks) > 1:
+        logger.info(f"Split {len(server_names)} servers into {len(chunks)} queries")
+    return chunks
+
+
+def matches_server(computer, server_names):
+    """Check in Python whether a computer name matches the requested names, like build_computer_filter does in KQL."""
+    if not computer:
+        return False
+    computer = computer.lower()
+    for name in server_names:
+        name = name.lower()
+        if name == WILDCARD or computer == name or (name.endswith(WILDCARD) and computer.startswith(name[:-1])):
+            return True
+    return False
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import threading
+import weakref
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """One in-flight execution and the callers waiting for it."""
+
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it runs wait for it
+    and receive the same result (or exception). Once the call finishes the key is released,
+    so later calls run again (and normally hit the result cache instead).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        Run function(*args, **kwargs), or wait for the identical call already running.
+
+        Args:
+            key: Hashable key identifying the call, usually the result cache key
+
+        Returns:
+            The function result, shared by every caller of the key
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            if call.waiters:
+                logger.info(f"Shared one execution with {call.waiters} identical concurrent calls")
+            call.done.set()
+
+    def stats(self):
+        """Return execution and coalesced call counters."""
+        with self._lock:
+            return {"executions": self.executions, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """
+    Async version of SingleFlight for coroutine functions.
+
+    The shared execution runs as its own task, so a caller that is cancelled (e.g. by a tool timeout)
+    does not cancel it for the other callers. Calls are only shared within one event loop.
+    """
+
+    def __init__(self):
+        self._calls = weakref.WeakKeyDictionary()
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key, function, *args, **kwargs):
+        """Await function(*args, **kwargs), or the identical call already running on this event loop."""
+        calls = self._calls.setdefault(asyncio.get_running_loop(), {})
+        task = calls.get(key)
+        if task is None:
+            task = calls[key] = asyncio.ensure_future(function(*args, **kwargs))
+            task.add_done_callback(lambda _: calls.pop(key, None))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+            logger.info("Joining an identical call already in flight")
+        return await asyncio.shield(task)
+
+    def stats(self):
+        """Return execution and coalesced call counters."""
+        return {"executions": self.executions, "coalesced": self.coalesced,
+                "in_flight": sum(len(calls) for calls in list(self._calls.values()))}
@@ -0,0 +1,110 @@
+import logging
+
+from utils.serialization import dumps, json_default
+
+logger = logging.getLogger(__name__)
+
+# Output formats for Log Analytics tables
+RECORDS = "records"      # one JSON object per row, as the tools have always returned
+COLUMNAR = "columnar"    # {"name", "columns", "rows"} per table, without repeating column names
+OUTPUT_FORMATS = (RECORDS, COLUMNAR)
+
+# In-memory result types LogAnalyticsTool can return instead of JSON
+TABLES = "tables"         # ResultTable objects (the default)
+DATAFRAME = "dataframe"   # pandas DataFrames, only when pandas is installed
+
+
+def table_columns(table):
+    """Column names of an SDK LogsTable (columns may be names or column objects)."""
+    return [column if isinstance(column, str) else getattr(column, "name", str(column)) for column in table.columns]
+
+
+class ResultTable:
+    """
+    Lightweight, pandas-free result table: a name, the column names and the row sequences.
+
+    Rows are kept as the SDK returned them, so building a ResultTable does not copy the data.
+    """
+
+    __slots__ = ("name", "columns", "rows")
+
+    def __init__(self, name, columns, rows):
+        self.name = name
+        self.columns = columns
+        self.rows = rows
+
+    @classmethod
+    def from_logs_table(cls, table):
+        """Wrap an SDK LogsTable without copying its rows."""
+        return cls(getattr(table, "name", None), table_columns(table), table.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        """Iterate over the rows as {column: value} dicts."""
+        columns = self.columns
+        for row in self.rows:
+            yield dict(zip(columns, row))
+
+    def column(self, name):
+        """Return the values of one column."""
+        index = self.columns.index(name)
+        return [row[index] for row in self.rows]
+
+    def to_records(self):
+        """Return the rows as a list of {column: value} dicts."""
+        return list(self)
+
+    def to_columnar(self):
+        """Return {"name", "columns", "rows"} with the rows as lists."""
+        return {"name": self.name, "columns": self.columns, "rows": [list(row) for row in self.rows]}
+
+    def to_dataframe(self):
+        """Convert to a pandas DataFrame; pandas is only imported here and is not a runtime dependency."""
+        try:
+            import pandas as pd
+        except ImportError as e:
+            raise ImportError("pandas is required for DataFrame output; install it or use ResultTable") from e
+        return pd.DataFrame(data=[list(row) for row in self.rows], columns=self.columns)
+
+    def __repr__(self):
+        return f"ResultTable(name={self.name!r}, columns={len(self.columns)}, rows={len(self.rows)})"
+
+
+# Tables serialize the same way the tools return records
+json_default.register(ResultTable, ResultTable.to_records)
+
+
+def normalize_output_format(output_format):
+    """Validate an output_format argument, defaulting to RECORDS."""
+    output_format = (output_format or RECORDS).strip().lower()
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output_format '{output_format}', expected one of {', '.join(OUTPUT_FORMATS)}")
+    return output_format
+
+
+def encode_tables(tables, output_format=RECORDS):
+    """
+    Encode SDK LogsTable (or ResultTable) objects straight to a JSON string, without building DataFrames.
+
+    Args:
+        tables (list): The tables of a Log Analytics query response
+        output_format (str): RECORDS for a list of row objects per table,
+            COLUMNAR for column names plus row arrays per table
+
+    Returns:
+        str: JSON array with one entry per table
+    """
+    if output_format == COLUMNAR:
+        # Rows are handed to the encoder as they are; only the row objects get converted to arrays
+        payload = [
+            {"name": getattr(table, "name", None), "columns": table_columns(table), "rows": table.rows}
+            for table in tables
+        ]
+    else:
+        payload = []
+        for table in tables:
+            columns = table_columns(table)
+            payload.append([dict(zip(columns, row)) for row in table.rows])
+    return dumps(payload)
@@ -0,0 +1,206 @@
+import inspect
+import json
+import logging
+import re
+import typing
+
+logger = logging.getLogger(__name__)
+
+# JSON schema type for each Python annotation used in the tool signatures
+JSON_TYPES = {str: "string", bool: "boolean", int: "integer", float: "number", list: "array", dict: "object"}
+
+
+class ToolArgumentError(ValueError):
+    """Raised when a tool call has missing or invalid arguments."""
+
+
+def parse_bool(value) -> bool:
+    """Interpret a boolean tool argument that may arrive as a JSON boolean or a string."""
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "1", "yes")
+    return bool(value)
+
+
+def _parse_int(value):
+    if isinstance(value, bool):
+        raise ValueError("expected an integer")
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError("expected an integer")
+    return int(value)
+
+
+def _parse_list(value):
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(",") if item.strip()]
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    raise ValueError("expected a list or a comma-separated string")
+
+
+def _parse_string(value):
+    # Lists are accepted where the tools take comma-separated names (ServerName, columns, ...)
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value]
+    return value if isinstance(value, str) else str(value)
+
+
+_PARSERS = {"string": _parse_string, "boolean": parse_bool, "integer": _parse_int, "number": float,
+            "array": _parse_list, "object": dict}
+
+
+def _resolve_annotation(annotation):
+    """
+    Reduce an annotation to (JSON type, items type, Annotated description).
+
+    Optional[X] and Annotated[X, "description"] are unwrapped; missing annotations are strings.
+    """
+    description = None
+    if typing.get_origin(annotation) is typing.Annotated:
+        description = next((meta for meta in annotation.__metadata__ if isinstance(meta, str)), None)
+        annotation = typing.get_args(annotation)[0]
+    if typing.get_origin(annotation) is typing.Union:
+        members = [member for member in typing.get_args(annotation) if member is not type(None)]
+        annotation = members[0] if len(members) == 1 else str
+    if annotation is inspect.Parameter.empty or annotation is None:
+        return "string", None, description
+
+    origin = typing.get_origin(annotation) or annotation
+    property_type = JSON_TYPES.get(origin, "string")
+    items_type = None
+    if property_type == "array":
+        items = typing.get_args(annotation)
+        items_type = JSON_TYPES.get(items[0], "string") if items else "string"
+    return property_type, items_type, description
+
+
+class ToolArgument:
+    """
+    One tool argument: its MCP property description and the parser applied to incoming values.
+
+    name is the keyword of the tool function; property_name is the MCP property agents send,
+    which differs where the keyword would shadow a builtin (e.g. row_filter is sent as filter).
+    """
+
+    __slots__ = ("name", "property_name", "property_type", "items_type", "description", "required", "parse")
+
+    def __init__(self, name, property_type, description, required=False, items_type=None, property_name=None):
+        self.name = name
+        self.property_name = property_name or name
+        self.property_type = property_type
+        self.items_type = items_type
+        self.description = description
+        self.required = required
+        self.parse = _PARSERS[property_type]
+
+    def to_dict(self):
+        result = {
+            "propertyName": self.property_name,
+            "propertyType": self.property_type,
+            "description": self.description,
+        }
+
+        # For array types, we need to specify the items property
+        if self.property_type == "array" and self.items_type:
+            result["items"] = {"type": self.items_type}
+        return result
+
+
+class ToolSpec:
+    """
+    A tool exposed as an MCP trigger, built once from the signature of the function it calls.
+
+    The toolProperties JSON and the argument parsers are computed when the spec is created,
+    so handling a call is a dictionary lookup and a parse per argument.
+    """
+
+    def __init__(self, name, function, description, arguments):
+        self.name = name
+        self.function = function
+        self.description = description
+        self.arguments = tuple(arguments)
+        self.function_name = re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower() + "_function"
+        self.properties_json = json.dumps([argument.to_dict() for argument in self.arguments])
+        self._by_name = {argument.property_name: argument for argument in self.arguments}
+        self._required = tuple(argument for argument in self.arguments if argument.required)
+
+    def parse_arguments(self, arguments):
+        """
+        Validate and convert the arguments of a tool call into keyword arguments for the function.
+
+        Arguments are looked up by property name and passed by keyword name. Missing and null
+        optional arguments are left out so the function defaults apply; unknown arguments are ignored.
+
+        Raises:
+            ToolArgumentError: If a required argument is missing or a value has the wrong type
+        """
+        if not isinstance(arguments, dict):
+            raise ToolArgumentError("arguments must be an object")
+
+        kwargs = {}
+        for name, value in arguments.items():
+            argument = self._by_name.get(name)
+            if argument is None:
+                logger.debug(f"{self.name}: ignoring unknown argument {name}")
+                continue
+            if value is None:
+                continue
+            try:
+                kwargs[argument.name] = argument.parse(value)
+            except (TypeError, ValueError):
+                raise ToolArgumentError(f"{name} must be of type {argument.property_type}")
+
+        for argument in self._required:
+            if kwargs.get(argument.name) in (None, "", []):
+                raise ToolArgumentError(f"{argument.property_name} is required")
+        return kwargs
+
+    async def handle(self, context):
+        """Run the tool for an MCP trigger context and return its JSON response."""
+        try:
+            content = json.loads(context)
+            kwargs = self.parse_arguments(content.get("arguments") or {})
+        except (ValueError, AttributeError) as e:
+            logger.error(f"{self.name}: invalid call: {str(e)}")
+            return json.dumps({"error": str(e)})
+
+        try:
+            return await self.function(**kwargs)
+        except Exception as e:
+            logger.error(f"Error in {self.function_name}: {str(e)}")
+            return json.dumps({"error": str(e)})
+
+
+def build_tool_spec(name, function, description, argument_descriptions, overrides=None, property_names=None):
+    """
+    Build the spec of a tool from its function signature and type hints.
+
+    Args:
+        name (str): The MCP tool name
+        function (callable): The async tool function the trigger awaits
+        description (str): The tool description shown to agents
+        argument_descriptions (dict): Description of each property name shared by the tools
+        overrides (dict, optional): Descriptions that differ for this tool
+        property_names (dict, optional): MCP property name of each keyword that is not sent under its own name
+
+    Returns:
+        ToolSpec: The spec with its precomputed property JSON and parsers
+    """
+    hints = typing.get_type_hints(inspect.unwrap(function), include_extras=True)
+    overrides = overrides or {}
+    property_names = property_names or {}
+    arguments = []
+    for parameter in inspect.signature(function).parameters.values():
+        if parameter.kind in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD):
+            continue
+        property_name = property_names.get(parameter.name, parameter.name)
+        property_type, items_type, annotated = _resolve_annotation(hints.get(parameter.name, parameter.annotation))
+        argument_description = (overrides.get(property_name) or annotated
+                                or argument_descriptions.get(property_name))
+        if argument_description is None:
+            raise ValueError(f"{name}: no description for argument {property_name}")
+        arguments.append(ToolArgument(
+            parameter.name, property_type, argument_description,
+            required=parameter.default is inspect.Parameter.empty, items_type=items_type,
+            property_name=property_name,
+        ))
+    return ToolSpec(name, function, description, arguments)